@@ -99,7 +99,7 @@ INSTALLED_APPS = [
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "pos.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -127,6 +127,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "pos.middleware.TenantMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -160,6 +161,30 @@ CORS_ALLOW_CREDENTIALS = False
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
 OPENAI_HELP_MODEL = os.environ.get("OPENAI_HELP_MODEL", "gpt-5-mini")
 
+# Help chat AI fallback
+# - one shared client (connection pool) with a strict timeout, no retries by default
+# - OPENAI_BASE_URL can point to a local stub server for tests
+# - answers are cached per (model, role, normalized question); HELP_AI_ASYNC=1 answers
+#   immediately with the local fallback and fetches the AI answer in a background job
+#   (only with a shared cache / REDIS_URL: pending state and answers must be visible
+#   to whichever worker the client polls; otherwise the AI is called synchronously)
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL", "").strip()
+OPENAI_HELP_TIMEOUT = float(os.environ.get("OPENAI_HELP_TIMEOUT", "8"))
+OPENAI_HELP_MAX_RETRIES = int(os.environ.get("OPENAI_HELP_MAX_RETRIES", "0"))
+HELP_AI_ASYNC = os.environ.get("HELP_AI_ASYNC", "1") == "1"
+HELP_AI_CACHE_TIMEOUT = int(os.environ.get("HELP_AI_CACHE_TIMEOUT", str(60 * 60 * 24 * 7)))
+HELP_AI_MAX_QUESTION_CHARS = int(os.environ.get("HELP_AI_MAX_QUESTION_CHARS", "500"))
+HELP_AI_MAX_ANSWER_CHARS = int(os.environ.get("HELP_AI_MAX_ANSWER_CHARS", "4000"))
+
+# Owner / help chat log
+# - logs are buffered per process and bulk inserted every OWNER_CHAT_LOG_BUFFER_SIZE
+#   entries or OWNER_CHAT_LOG_FLUSH_SECONDS, whichever comes first (1 = write each log)
+# - `manage.py compact_owner_chat_logs` (run daily) folds logs older than
+#   OWNER_CHAT_LOG_RETENTION_DAYS into daily intent counts and deletes the raw text
+OWNER_CHAT_LOG_BUFFER_SIZE = int(os.environ.get("OWNER_CHAT_LOG_BUFFER_SIZE", "50"))
+OWNER_CHAT_LOG_FLUSH_SECONDS = float(os.environ.get("OWNER_CHAT_LOG_FLUSH_SECONDS", "5"))
+OWNER_CHAT_LOG_RETENTION_DAYS = int(os.environ.get("OWNER_CHAT_LOG_RETENTION_DAYS", "30"))
+
 # --------------------------------------------------
 # Database
 # Auto-switch:
@@ -185,6 +210,32 @@ else:
         }
     }
 
+# --------------------------------------------------
+# Cache
+# - REDIS_URL: shared Redis cache, every gunicorn worker, management
+#   command and job-runner thread sees the same entries and invalidations
+# - without it: per-process LocMemCache; caches that rely on cross-process
+#   invalidation cap their timeouts (pos.services.shared_cache) and
+#   `manage.py check` warns (pos.W001) when DEBUG is off
+# --------------------------------------------------
+REDIS_URL = os.environ.get("REDIS_URL", "").strip()
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "valdker",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "valdker",
+        }
+    }
+
 # --------------------------------------------------
 # Templates
 # --------------------------------------------------
@@ -255,6 +306,97 @@ else:
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# --------------------------------------------------
+# Backup downloads
+# - "" (default): served by Django with Range support
+# - "x-accel": nginx X-Accel-Redirect (internal location -> BACKUP_ROOT)
+# - "x-sendfile": Apache/lighttpd X-Sendfile
+# --------------------------------------------------
+BACKUP_DOWNLOAD_OFFLOAD = os.environ.get("BACKUP_DOWNLOAD_OFFLOAD", "").strip().lower()
+BACKUP_DOWNLOAD_ACCEL_PREFIX = os.environ.get("BACKUP_DOWNLOAD_ACCEL_PREFIX", "/protected-backups/")
+
+# --------------------------------------------------
+# Background jobs (import, export, label printing)
+# - run on an in-process worker pool
+# - BACKGROUND_JOBS_EAGER=1 runs them inline (debugging / one-off scripts)
+# --------------------------------------------------
+BACKGROUND_JOB_WORKERS = int(os.environ.get("BACKGROUND_JOB_WORKERS", "2"))
+BACKGROUND_JOBS_EAGER = os.environ.get("BACKGROUND_JOBS_EAGER", "0") == "1"
+
+# --------------------------------------------------
+# Master data import
+# - only the first N row errors are stored per validation run;
+#   the rest are counted and summarised per (sheet, field, message)
+# --------------------------------------------------
+IMPORT_MAX_ROW_ERRORS = int(os.environ.get("IMPORT_MAX_ROW_ERRORS", "5000"))
+
+# --------------------------------------------------
+# Exports (sales export, barcode label batches)
+# - files of background exports are written to EXPORT_ROOT
+#   (default: BASE_DIR/exports). Keep it outside MEDIA_ROOT: media is
+#   served without auth, exports only through the authenticated download view
+# - larger sales exports than SALES_EXPORT_SYNC_MAX_ROWS order lines
+#   are moved to a background job automatically
+# - barcode label batches above BARCODE_LABEL_SYNC_MAX_LABELS labels
+#   are rendered in a background job as well
+# --------------------------------------------------
+EXPORT_ROOT = os.environ.get("EXPORT_ROOT", "").strip() or BASE_DIR / "exports"
+SALES_EXPORT_SYNC_MAX_ROWS = int(os.environ.get("SALES_EXPORT_SYNC_MAX_ROWS", "100000"))
+BARCODE_LABEL_SYNC_MAX_LABELS = int(os.environ.get("BARCODE_LABEL_SYNC_MAX_LABELS", "1000"))
+
+# --------------------------------------------------
+# Receipt PDF
+# - "reportlab" (default): drawn directly, no HTML/CSS parsing
+# - "html": legacy pos/order_receipt.html template via xhtml2pdf
+# - rendered PDFs are cached per (order, receipt content) in the default cache
+# --------------------------------------------------
+RECEIPT_PDF_RENDERER = os.environ.get("RECEIPT_PDF_RENDERER", "reportlab").strip().lower()
+RECEIPT_PDF_CACHE_TIMEOUT = int(os.environ.get("RECEIPT_PDF_CACHE_TIMEOUT", str(60 * 60 * 24)))
+
+# --------------------------------------------------
+# Report cache (daily-profit, monthly-pl, net-income, finance summary)
+# - results are cached per (shop, date range, data version)
+# - closed days stay cached until a backdated write / restore bumps
+#   the shop's history version, at most REPORT_CACHE_HISTORY_TIMEOUT
+#   seconds (capped to REPORT_CACHE_TODAY_TIMEOUT without a shared cache)
+# - today's bucket is recomputed on every sales/expense write and at
+#   least every REPORT_CACHE_TODAY_TIMEOUT seconds
+# --------------------------------------------------
+REPORT_CACHE_TODAY_TIMEOUT = int(os.environ.get("REPORT_CACHE_TODAY_TIMEOUT", "300"))
+REPORT_CACHE_HISTORY_TIMEOUT = int(os.environ.get("REPORT_CACHE_HISTORY_TIMEOUT", str(60 * 60 * 24)))
+# owner chat answers for past ranges use the same versions, bounded by this
+OWNER_CHAT_ANSWER_CACHE_TIMEOUT = int(os.environ.get("OWNER_CHAT_ANSWER_CACHE_TIMEOUT", str(60 * 60)))
+
+# --------------------------------------------------
+# Tenant context (request.tenant, pos.middleware.TenantMiddleware)
+# - shop, role and feature permissions are resolved once per request
+# - the Shop row (+ ShopFeature) is cached in the default cache and
+#   invalidated when either is saved or deleted
+# - invalidation only reaches other workers through a shared cache (REDIS_URL);
+#   with the per-process LocMemCache entries live at most
+#   TENANT_SHOP_LOCAL_CACHE_SECONDS and Shop.is_active is re-read from the
+#   database on login / shop resolution
+# --------------------------------------------------
+TENANT_SHOP_CACHE_TIMEOUT = int(os.environ.get("TENANT_SHOP_CACHE_TIMEOUT", "300"))
+TENANT_SHOP_LOCAL_CACHE_SECONDS = int(os.environ.get("TENANT_SHOP_LOCAL_CACHE_SECONDS", "10"))
+
+# --------------------------------------------------
+# API tokens (pos.authentication.CachedTokenAuthentication)
+# - tokens expire API_TOKEN_TTL_HOURS after login (0 = never); login rotates
+#   the token unless it is younger than API_TOKEN_REUSE_HOURS (0 = always)
+# - token -> user (id, shop, role, is_active) is cached per process for
+#   API_TOKEN_LOCAL_CACHE_SECONDS and, when the default cache is shared
+#   (REDIS_URL), there for API_TOKEN_CACHE_SECONDS; logout / user save /
+#   token delete clear this process and the shared cache, so other workers
+#   keep a revoked token for at most API_TOKEN_LOCAL_CACHE_SECONDS
+# - with the per-process LocMemCache the shared layer is skipped (it could
+#   not be invalidated from other workers)
+# --------------------------------------------------
+API_TOKEN_TTL_HOURS = float(os.environ.get("API_TOKEN_TTL_HOURS", str(24 * 7)))
+API_TOKEN_REUSE_HOURS = float(os.environ.get("API_TOKEN_REUSE_HOURS", "1"))
+API_TOKEN_CACHE_SECONDS = int(os.environ.get("API_TOKEN_CACHE_SECONDS", "300"))
+API_TOKEN_LOCAL_CACHE_SECONDS = float(os.environ.get("API_TOKEN_LOCAL_CACHE_SECONDS", "10"))
+
 # --------------------------------------------------
 # Jazzmin configuration (FULL - unchanged)
 # --------------------------------------------------
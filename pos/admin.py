@@ -1,21 +1,23 @@
 from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
 from django.db import transaction
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import FileResponse
 from django.utils.http import urlencode
 from django.urls import reverse
 from django.utils.html import format_html
 from django import forms
 from django.contrib.auth.forms import ReadOnlyPasswordHashField
 
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.graphics.barcode import code128
-
 from pos.models_shift import Shift
 from pos.forms import ShopAdminForm
 from pos.services import ShopProvisionService
+from pos.services.barcode_label_service import (
+    DEFAULT_LABEL_LAYOUT,
+    LABEL_PRODUCT_FIELDS,
+    label_pdf_temp_file,
+    label_sync_max_labels,
+)
+from pos.services.export_service import PDF_CONTENT_TYPE, queue_export
 
 from .models import (
     Banner, PlatformUser, ShopStaffUser, TokenProxy,
@@ -100,102 +102,47 @@ class PurchaseAdmin(admin.ModelAdmin):
 # PDF BARCODE
 # ==========================================================
 
-def _barcode_pdf_response(filename="barcodes.pdf"):
-
-    resp = HttpResponse(content_type="application/pdf")
-
-    resp["Content-Disposition"] = f'inline; filename="{filename}"'
-
-    return resp
-
-
 def print_barcodes_pdf(modeladmin,request,queryset):
 
-    resp = _barcode_pdf_response("product_barcodes.pdf")
-
-    c = canvas.Canvas(resp,pagesize=A4)
-
-    width,height = A4
-
-    label_w = 70*mm
-    label_h = 35*mm
-
-    margin_x = 10*mm
-    margin_y = 10*mm
-
-    gap_x = 5*mm
-    gap_y = 5*mm
-
-    cols = int((width-2*margin_x+gap_x)//(label_w+gap_x))
-
-    if cols < 1:
-        cols = 1
-
-    x = margin_x
-    y = height-margin_y-label_h
-
-    def draw_label(prod,x0,y0):
-
-        c.roundRect(x0,y0,label_w,label_h,6)
-
-        name = (prod.name or "")[:26]
-
-        sku = (getattr(prod,"sku","") or "")[:22]
-
-        price = f"${prod.sell_price}"
-
-        c.setFont("Helvetica-Bold",9)
+    products = queryset.only(*LABEL_PRODUCT_FIELDS).order_by("name","id")
 
-        c.drawString(x0+4*mm,y0+label_h-7*mm,name)
+    count = products.count()
 
-        c.setFont("Helvetica",8)
+    max_labels = label_sync_max_labels()
 
-        if sku:
-            c.drawString(x0+4*mm,y0+label_h-12*mm,f"SKU: {sku}")
+    if max_labels and count > max_labels:
 
-        c.drawString(x0+4*mm,y0+label_h-17*mm,f"Price: {price}")
+        # batch besar -> background job, link status/download lewat message
 
-        value = (prod.code or "").strip()
+        shop = None if request.user.is_superuser else getattr(request.user,"shop",None)
 
-        if value:
-
-            bc = code128.Code128(
-                value,
-                barHeight=12*mm,
-                humanReadable=True
-            )
-
-            bc.drawOn(c,x0+4*mm,y0+4*mm)
-
-    items=list(queryset.order_by("name"))
-
-    for i,prod in enumerate(items):
-
-        if y<margin_y:
-
-            c.showPage()
-
-            y=height-margin_y-label_h
-
-            x=margin_x
-
-        draw_label(prod,x,y)
-
-        if (i+1)%cols==0:
-
-            x=margin_x
-
-            y-=(label_h+gap_y)
-
-        else:
-
-            x+=(label_w+gap_x)
+        export_job = queue_export(
+            kind="barcode_labels",
+            shop=shop,
+            params={
+                "ids":list(queryset.values_list("id",flat=True)),
+                "layout":DEFAULT_LABEL_LAYOUT,
+            },
+            requested_by=request.user,
+        )
 
-    c.showPage()
+        modeladmin.message_user(
+            request,
+            format_html(
+                'Label barcode untuk {} produk sedang dibuat di background. <a href="{}">Status / download</a>',
+                count,
+                reverse("export_job_detail",args=[export_job.id]),
+            ),
+            level=messages.INFO,
+        )
 
-    c.save()
+        return None
 
-    return resp
+    return FileResponse(
+        label_pdf_temp_file(products),
+        filename="product_barcodes.pdf",
+        content_type=PDF_CONTENT_TYPE,
+    )
 
 
 print_barcodes_pdf.short_description="Print Barcodes"
@@ -261,14 +208,11 @@ class ProductAdmin(admin.ModelAdmin):
 
     def action_print_barcodes_pdf(self,request,queryset):
 
-        ids=",".join(
-            str(x)
-            for x in queryset.values_list("id",flat=True)
-        )
+        # langsung pakai queryset (bukan redirect ?ids=... yang bisa terlalu panjang)
 
-        url=f"/admin/print-barcodes/?ids={ids}"
+        return print_barcodes_pdf(self,request,queryset)
 
-        return HttpResponseRedirect(url)
+    action_print_barcodes_pdf.short_description="Print Barcodes"
 
 
 # ==========================================================
@@ -2,15 +2,17 @@
 from decimal import Decimal
 
 from django.utils import timezone
-from django.db.models import Sum, Value, DecimalField
+from django.db.models import Count, Sum, Value, DecimalField
 from django.core.exceptions import FieldDoesNotExist
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from pos.models import Order, Shop
+from pos.models import Order
 from pos.services.finance_service import get_opening_cash_today
+from pos.services.report_cache import cached_today
+from pos.tenant import resolve_request_shop_id
 
 DEC0 = Value(Decimal("0.00"), output_field=DecimalField(max_digits=18, decimal_places=2))
 
@@ -29,26 +31,10 @@ def list_model_fields(model):
 
 def resolve_shop_id(request) -> int | None:
     """
-    ✅ Fix utama:
-    - Prioritas: query param shop_id (optional)
-    - Lalu: request.user.shop_id jika ada
-    - Fallback: Shop pertama di DB
+    - tenant user: shop user (request.tenant)
+    - platform admin: query param shop_id
     """
-    # 0) optional override
-    q = request.query_params.get("shop_id")
-    if q:
-        try:
-            return int(q)
-        except ValueError:
-            pass
-
-    # 1) user.shop_id (kalau kamu punya multi-tenant nanti)
-    if hasattr(request.user, "shop_id") and request.user.shop_id:
-        return request.user.shop_id
-
-    # 2) fallback: shop pertama
-    shop = Shop.objects.order_by("id").first()
-    return shop.id if shop else None
+    return resolve_request_shop_id(request)
 
 
 def apply_shop_filter(qs, shop_id):
@@ -93,7 +79,7 @@ class FinanceSummaryAPIView(APIView):
         shop_id = resolve_shop_id(request)
         if not shop_id:
             return Response({
-                "detail": "Shop belum ada di database. Buat 1 Shop dulu."
+                "detail": "shop_id tidak ditemukan."
             }, status=400)
 
         today = timezone.localdate()
@@ -108,8 +94,6 @@ class FinanceSummaryAPIView(APIView):
                 "order_fields": list_model_fields(Order),
             }, status=500)
 
-        qs = qs.filter(**{f"{date_field}__date": today})
-
         total_field = pick_total_field()
         if not total_field:
             return Response({
@@ -117,8 +101,15 @@ class FinanceSummaryAPIView(APIView):
                 "order_fields": list_model_fields(Order),
             }, status=500)
 
-        total_sales = qs.aggregate(s=Sum(total_field, default=DEC0))["s"] or Decimal("0.00")
-        order_count = qs.count()
+        def compute(day):
+            day_qs = qs.filter(**{f"{date_field}__date": day})
+            agg = day_qs.aggregate(s=Sum(total_field, default=DEC0), n=Count("id"))
+            return {"total_sales": agg["s"] or Decimal("0.00"), "order_count": agg["n"]}
+
+        # total + jumlah order di-cache per versi data shop; opening cash (shift) selalu fresh
+        summary = cached_today(dataset="finance_summary_orders", shop_id=shop_id, compute=compute)
+        total_sales = summary["total_sales"]
+        order_count = summary["order_count"]
 
         opening_cash, shift_id = get_opening_cash_today(shop_id)
 
@@ -4,57 +4,34 @@ from typing import Optional
 
 from django.utils import timezone
 
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from pos.authentication import CachedTokenAuthentication
 from pos.models_shift import Shift, ShiftStatus
 from pos.api.serializers_shift import ShiftSerializer
-from pos.services.shift_service import recompute_shift_totals
-
-# ✅ ganti kalau field total order beda: total_amount / grand_total / net_total
-ORDER_TOTAL_FIELD = "total"
+from pos.services.shift_service import (
+    can_use_shop_shift,
+    close_shift,
+    find_open_shift,
+    resolve_open_shift,
+    shift_report,
+)
+from pos.tenant import resolve_request_shop_id
 
 
 def resolve_shop_id(request) -> Optional[int]:
     """
-    Sumber shop_id:
-    1) query ?shop_id=1
-    2) request.user.shop_id (kalau ada)
-    3) fallback: Shop pertama
+    Sumber shop_id (request.tenant):
+    1) shop user (tenant)
+    2) platform admin: query ?shop_id=1
     """
-    q = request.query_params.get("shop_id")
-    if q:
-        try:
-            return int(q)
-        except ValueError:
-            pass
-
-    if hasattr(request.user, "shop_id") and getattr(request.user, "shop_id", None):
-        try:
-            return int(request.user.shop_id)
-        except Exception:
-            pass
-
-    # ✅ lazy import biar kalau Shop model beda file, errornya jelas di runtime
-    from pos.models import Shop
-
-    shop = Shop.objects.order_by("id").first()
-    return int(shop.id) if shop else None
-
-
-def find_open_shift(shop_id: int):
-    return (
-        Shift.objects
-        .filter(shop_id=shop_id, status=ShiftStatus.OPEN, closed_at__isnull=True)
-        .order_by("-opened_at", "-id")
-        .first()
-    )
+    return resolve_request_shop_id(request)
 
 
 class ShiftCurrentView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -62,27 +39,20 @@ class ShiftCurrentView(APIView):
         if not shop_id:
             return Response({"detail": "shop_id tidak ditemukan."}, status=400)
 
-        shift = find_open_shift(shop_id)
+        # kasir hanya melihat laci sendiri; owner / manager fallback ke shift OPEN terbaru di shop
+        if can_use_shop_shift(request.user):
+            shift = resolve_open_shift(shop_id, request.user)
+        else:
+            shift = find_open_shift(shop_id, cashier=request.user)
         if not shift:
             return Response({"open": False, "shift": None, "shop_id": shop_id}, status=200)
 
-        # ✅ lazy import Order juga (menghindari import crash)
-        from pos.models import Order
-
-        try:
-            recompute_shift_totals(shift, OrderModel=Order, order_total_field=ORDER_TOTAL_FIELD)
-        except Exception as e:
-            # biar kalau field total salah, kamu dapat error JSON bukan HTML
-            return Response(
-                {"detail": "Error recompute_shift_totals", "error": str(e), "shop_id": shop_id},
-                status=500
-            )
-
+        # ✅ total sudah di-maintain incremental (checkout / retur / expense) -> cukup baca row
         return Response({"open": True, "shift": ShiftSerializer(shift).data, "shop_id": shop_id}, status=200)
 
 
 class ShiftOpenView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -98,7 +68,8 @@ class ShiftOpenView(APIView):
         except Exception:
             return Response({"detail": "opening_cash tidak valid."}, status=400)
 
-        existing = find_open_shift(shop_id)
+        # satu laci (shift OPEN) per kasir; kasir lain di shop yang sama boleh buka shift sendiri
+        existing = find_open_shift(shop_id, cashier=request.user)
         if existing:
             return Response(
                 {"detail": "Shift masih OPEN.", "shift": ShiftSerializer(existing).data, "shop_id": shop_id},
@@ -113,20 +84,15 @@ class ShiftOpenView(APIView):
             closed_at=None,            
             closing_cash=None,         
             opening_cash=opening_cash,
+            expected_cash=opening_cash,
             note=note,
         )
 
-        from pos.models import Order
-        try:
-            recompute_shift_totals(shift, OrderModel=Order, order_total_field=ORDER_TOTAL_FIELD)
-        except Exception as e:
-            return Response({"detail": "Error recompute_shift_totals", "error": str(e)}, status=500)
-
         return Response({"detail": "Shift opened.", "shift": ShiftSerializer(shift).data, "shop_id": shop_id}, status=201)
 
 
 class ShiftCloseView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -145,28 +111,19 @@ class ShiftCloseView(APIView):
         except Exception:
             return Response({"detail": "closing_cash tidak valid."}, status=400)
 
-        shift = find_open_shift(shop_id)
+        # hanya laci sendiri yang boleh ditutup (tanpa fallback ke shift kasir lain)
+        shift = find_open_shift(shop_id, cashier=request.user)
         if not shift:
             return Response({"detail": "Tidak ada shift OPEN.", "shop_id": shop_id}, status=404)
 
-        shift.status = ShiftStatus.CLOSED
-        shift.closed_at = timezone.now()
-        shift.closing_cash = closing_cash
-        if note:
-            shift.note = note
-        shift.save(update_fields=["status", "closed_at", "closing_cash", "note"])
-
-        from pos.models import Order
-        try:
-            recompute_shift_totals(shift, OrderModel=Order, order_total_field=ORDER_TOTAL_FIELD)
-        except Exception as e:
-            return Response({"detail": "Error recompute_shift_totals", "error": str(e)}, status=500)
+        # counter diverifikasi sekali di sini (reconcile) lalu cash_difference dihitung
+        shift = close_shift(shift, closing_cash=closing_cash, note=note)
 
         return Response({"detail": "Shift closed.", "shift": ShiftSerializer(shift).data, "shop_id": shop_id}, status=200)
 
 
 class ShiftListView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -184,7 +141,7 @@ class ShiftListView(APIView):
 
 
 class ShiftReportView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
@@ -192,14 +149,12 @@ class ShiftReportView(APIView):
         if not shop_id:
             return Response({"detail": "shop_id tidak ditemukan."}, status=400)
 
-        shift = Shift.objects.filter(shop_id=shop_id, pk=pk).first()
+        shift = Shift.objects.select_related("cashier").filter(shop_id=shop_id, pk=pk).first()
         if not shift:
             return Response({"detail": "Shift tidak ditemukan."}, status=404)
 
-        from pos.models import Order
-        try:
-            recompute_shift_totals(shift, OrderModel=Order, order_total_field=ORDER_TOTAL_FIELD)
-        except Exception as e:
-            return Response({"detail": "Error recompute_shift_totals", "error": str(e)}, status=500)
-
-        return Response({"shift": ShiftSerializer(shift).data, "shop_id": shop_id}, status=200)
\ No newline at end of file
+        # X (OPEN) / Z (CLOSED) report: total dari row + pembayaran per metode via index shift
+        return Response(
+            {"shift": ShiftSerializer(shift).data, "report": shift_report(shift), "shop_id": shop_id},
+            status=200
+        )
\ No newline at end of file
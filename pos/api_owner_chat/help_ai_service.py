@@ -1,7 +1,14 @@
+import hashlib
 import logging
+from functools import lru_cache
 from typing import Optional, Dict
 
 from django.conf import settings
+from django.core.cache import cache
+
+from pos.services.job_runner import submit_job
+from pos.services.shared_cache import cache_is_shared
+from .help_responses import normalize_text
 
 try:
     from openai import OpenAI
@@ -27,23 +34,24 @@ Aturan:
 """
 
 
-def _build_user_prompt(message: str, user=None) -> str:
-    username = getattr(user, "username", "") or "-"
-    role = getattr(user, "role", "") or "-"
-    shop_name = "-"
-    shop_code = "-"
+HELP_AI_SUGGESTIONS = [
+    "cara tambah produk",
+    "cara cetak struk",
+    "cara stok opname",
+    "cara lihat laporan",
+]
+
+# status jawaban di cache (selain dict jawaban itu sendiri)
+PENDING = "pending"
+FAILED = "failed"
 
-    shop = getattr(user, "shop", None)
-    if shop:
-        shop_name = getattr(shop, "name", "-") or "-"
-        shop_code = getattr(shop, "code", "-") or "-"
 
+def _build_user_prompt(message: str, role: str = "") -> str:
+    # hanya role: jawaban di-cache dan dipakai bersama user/shop lain,
+    # jadi prompt tidak boleh membawa username / nama shop
     return f"""
 Context User:
-- username: {username}
-- role: {role}
-- shop_name: {shop_name}
-- shop_code: {shop_code}
+- role: {role or "-"}
 
 Pertanyaan user:
 {message}
@@ -55,30 +63,97 @@ Format jawaban:
 """
 
 
-def ask_help_ai(message: str, user=None) -> Optional[Dict]:
-    api_key = getattr(settings, "OPENAI_API_KEY", None)
-    model = getattr(settings, "OPENAI_HELP_MODEL", "gpt-5-mini")
+# =========================================================
+# SETTINGS / CLIENT
+# =========================================================
+def _setting(name, default):
+    return getattr(settings, name, default)
 
-    if not api_key:
-        logger.info("OPENAI_API_KEY not configured, skipping AI fallback.")
-        return None
 
+def help_ai_model() -> str:
+    return _setting("OPENAI_HELP_MODEL", "gpt-5-mini")
+
+
+def help_ai_enabled() -> bool:
+    if not _setting("OPENAI_API_KEY", None):
+        return False
     if OpenAI is None:
         logger.warning("openai package is not installed.")
-        return None
+        return False
+    return True
+
+
+@lru_cache(maxsize=4)
+def _client_for(api_key: str, base_url: str, timeout: float, max_retries: int):
+    # satu client per konfigurasi -> connection pool httpx dipakai ulang antar request
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url or None,
+        timeout=timeout,
+        max_retries=max_retries,
+    )
+
+
+def get_help_ai_client():
+    """
+    Client bersama dengan timeout ketat. OPENAI_BASE_URL bisa diarahkan ke
+    server stub lokal untuk test.
+    """
+    return _client_for(
+        _setting("OPENAI_API_KEY", ""),
+        _setting("OPENAI_BASE_URL", "") or "",
+        float(_setting("OPENAI_HELP_TIMEOUT", 8.0)),
+        int(_setting("OPENAI_HELP_MAX_RETRIES", 0)),
+    )
+
+
+# =========================================================
+# CACHE
+# =========================================================
+def help_answer_token(message: str, role: str = "") -> str:
+    """Token jawaban = hash (model, role, pertanyaan yang sudah dinormalisasi)."""
+    raw = f"{help_ai_model()}|{role or ''}|{normalize_text(message)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_key(token: str) -> str:
+    return f"help-ai:{token}"
+
+
+def get_help_answer(token: str):
+    """dict jawaban, PENDING, FAILED, atau None (tidak ada / expired)."""
+    return cache.get(_cache_key(token))
 
-    try:
-        client = OpenAI(api_key=api_key)
 
-        response = client.responses.create(
-            model=model,
+def _store_answer(token: str, answer: Optional[Dict]):
+    if answer:
+        cache.set(_cache_key(token), answer, int(_setting("HELP_AI_CACHE_TIMEOUT", 60 * 60 * 24 * 7)))
+    else:
+        # gagal: jangan langsung tanya ulang LLM untuk pertanyaan yang sama
+        cache.set(_cache_key(token), FAILED, int(_setting("HELP_AI_FAILURE_TIMEOUT", 60)))
+
+
+def _user_role(user) -> str:
+    return getattr(user, "role", "") or ""
+
+
+# =========================================================
+# LLM CALL
+# =========================================================
+def _fetch_help_answer(message: str, role: str = "") -> Optional[Dict]:
+    max_question = int(_setting("HELP_AI_MAX_QUESTION_CHARS", 500))
+    max_answer = int(_setting("HELP_AI_MAX_ANSWER_CHARS", 4000))
+
+    try:
+        response = get_help_ai_client().responses.create(
+            model=help_ai_model(),
             input=[
                 {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": _build_user_prompt(message, user=user)},
+                {"role": "user", "content": _build_user_prompt(message[:max_question], role=role)},
             ],
         )
 
-        text = (getattr(response, "output_text", "") or "").strip()
+        text = (getattr(response, "output_text", "") or "").strip()[:max_answer]
         if not text:
             return None
 
@@ -92,14 +167,76 @@ def ask_help_ai(message: str, user=None) -> Optional[Dict]:
             "text": text,
             "source": "ai",
             "confidence": 0.70,
-            "suggestions": [
-                "cara tambah produk",
-                "cara cetak struk",
-                "cara stok opname",
-                "cara lihat laporan",
-            ],
+            "suggestions": list(HELP_AI_SUGGESTIONS),
         }
 
     except Exception as exc:
         logger.exception("AI fallback failed: %s", exc)
-        return None
\ No newline at end of file
+        return None
+
+
+def refresh_help_answer(token: str, message: str, role: str = ""):
+    """Background job: tanya LLM lalu simpan hasilnya di bawah token."""
+    _store_answer(token, _fetch_help_answer(message, role=role))
+
+
+# =========================================================
+# PUBLIC
+# =========================================================
+def ask_help_ai(message: str, user=None) -> Optional[Dict]:
+    """Jalur sinkron (dengan cache + timeout): jawaban AI atau None."""
+    if not help_ai_enabled():
+        logger.info("OPENAI_API_KEY not configured, skipping AI fallback.")
+        return None
+
+    role = _user_role(user)
+    token = help_answer_token(message, role)
+    cached = get_help_answer(token)
+    if isinstance(cached, dict):
+        return cached
+    if cached == FAILED:
+        return None
+
+    answer = _fetch_help_answer(message, role=role)
+    _store_answer(token, answer)
+    return answer
+
+
+def help_ai_async_enabled() -> bool:
+    """
+    Mode async butuh shared cache: marker PENDING + jawaban ditulis job di satu
+    worker, polling bisa masuk ke worker lain. Dengan LocMem per proses
+    polling akan "expired", jadi fallback ke jalur sinkron.
+    """
+    return bool(_setting("HELP_AI_ASYNC", True)) and cache_is_shared()
+
+
+def request_help_ai(message: str, user=None):
+    """
+    Jalur async: return (answer, token).
+    - cache hit      -> (dict jawaban, token)
+    - belum ada      -> (None, token), LLM dipanggil di background; client polling token
+    - AI tidak aktif -> (None, None)
+    Pertanyaan yang sama dari banyak user hanya memicu satu panggilan LLM.
+    """
+    if not help_ai_enabled():
+        return None, None
+
+    if not help_ai_async_enabled():
+        return ask_help_ai(message, user=user), None
+
+    role = _user_role(user)
+    token = help_answer_token(message, role)
+    cached = get_help_answer(token)
+    if isinstance(cached, dict):
+        return cached, token
+    if cached == FAILED:
+        return None, None
+
+    # cache.add atomik: hanya request pertama yang menjadwalkan job
+    timeout = float(_setting("OPENAI_HELP_TIMEOUT", 8.0))
+    pending_timeout = int(timeout * (int(_setting("OPENAI_HELP_MAX_RETRIES", 0)) + 1)) + 30
+    if cache.add(_cache_key(token), PENDING, pending_timeout):
+        submit_job(refresh_help_answer, token, message, role)
+
+    return None, token
@@ -1,4 +1,5 @@
 import re
+from collections import Counter
 from difflib import SequenceMatcher
 from typing import Dict, List, Optional
 
@@ -304,10 +305,16 @@ SYNONYMS = {
 }
 
 
+HELP_MIN_SCORE = 0.62
+
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+_SPACES_RE = re.compile(r"\s+")
+
+
 def normalize_text(text: str) -> str:
     text = (text or "").lower().strip()
-    text = re.sub(r"[^\w\s]", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
+    text = _NON_WORD_RE.sub(" ", text)
+    text = _SPACES_RE.sub(" ", text).strip()
 
     parts = []
     for token in text.split():
@@ -319,6 +326,19 @@ def similarity(a: str, b: str) -> float:
     return SequenceMatcher(None, a, b).ratio()
 
 
+def _compile_help_variants():
+    """Keyword topic sudah dinormalisasi + token set + hitungan karakter, dibuat sekali saat import."""
+    variants = []
+    for topic_key, topic in HELP_TOPICS.items():
+        for variant in topic.get("keywords", []):
+            v = normalize_text(variant)
+            variants.append((topic_key, v, frozenset(v.split()), tuple(Counter(v).items())))
+    return variants
+
+
+HELP_VARIANTS = _compile_help_variants()
+
+
 def get_topic_suggestions(current_key: Optional[str] = None, limit: int = 4) -> List[str]:
     suggestions = []
 
@@ -354,35 +374,39 @@ def match_local_help(message: str) -> Optional[Dict]:
     if not text:
         return None
 
+    text_words = set(text.split())
+    text_chars = Counter(text)
+
     best_key = None
     best_score = 0.0
 
-    for topic_key, topic in HELP_TOPICS.items():
-        variants = topic.get("keywords", [])
-        for variant in variants:
-            v = normalize_text(variant)
-
-            if v in text:
-                score = 0.98
-            elif text in v:
-                score = 0.95
-            else:
-                score = similarity(text, v)
+    for topic_key, v, variant_words, variant_chars in HELP_VARIANTS:
+        if v in text:
+            score = 0.98
+        elif text in v:
+            score = 0.95
+        else:
+            overlap = len(text_words & variant_words)
+            score = min(0.90, 0.45 + (0.15 * overlap)) if overlap else 0.0
 
-                text_words = set(text.split())
-                variant_words = set(v.split())
-                overlap = len(text_words & variant_words)
-                if overlap:
-                    score = max(score, min(0.90, 0.45 + (0.15 * overlap)))
+            # SequenceMatcher.ratio() tidak pernah lebih dari batas atas panjang
+            # (real_quick_ratio) dan karakter yang sama (quick_ratio); ratio hanya
+            # dihitung kalau hasilnya masih bisa mengubah jawaban
+            floor = max(score, best_score, HELP_MIN_SCORE - 1e-9)
+            total = len(text) + len(v)
+            if 2.0 * min(len(text), len(v)) / total > floor:
+                common = sum(min(text_chars.get(ch, 0), n) for ch, n in variant_chars)
+                if 2.0 * common / total > floor:
+                    score = max(score, similarity(text, v))
 
-            if score > best_score:
-                best_score = score
-                best_key = topic_key
+        if score > best_score:
+            best_score = score
+            best_key = topic_key
 
     if not best_key:
         return None
 
-    if best_score < 0.62:
+    if best_score < HELP_MIN_SCORE:
         return None
 
     topic = HELP_TOPICS[best_key]
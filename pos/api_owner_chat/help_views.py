@@ -1,15 +1,29 @@
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
-from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
+from django.urls import reverse
+
 from .help_responses import match_local_help, get_fallback_help_payload
-from .help_ai_service import ask_help_ai
+from .help_ai_service import PENDING, get_help_answer, request_help_ai
+from pos.authentication import CachedTokenAuthentication
+from pos.services.owner_chat_log_service import log_chat
+
+
+def _log_help(request, message, data):
+    log_chat(
+        user=request.user,
+        message=message,
+        response=data.get("text") or "",
+        source=f"help_{data.get('source') or 'local'}",
+        intent=data.get("topic_key") or "",
+    )
 
 
 @api_view(["POST"])
-@authentication_classes([TokenAuthentication, SessionAuthentication])
+@authentication_classes([CachedTokenAuthentication, SessionAuthentication])
 @permission_classes([IsAuthenticated])
 def help_chat_api(request):
     message = (request.data.get("message") or "").strip()
@@ -24,6 +38,7 @@ def help_chat_api(request):
 
     local_result = match_local_help(message)
     if local_result:
+        _log_help(request, message, local_result)
         return Response(
             {
                 "success": True,
@@ -32,8 +47,10 @@ def help_chat_api(request):
             status=status.HTTP_200_OK,
         )
 
-    ai_result = ask_help_ai(message, user=request.user)
+    # jawaban AI dari cache, atau dijadwalkan di background (tidak menahan worker)
+    ai_result, token = request_help_ai(message, user=request.user)
     if ai_result:
+        _log_help(request, message, ai_result)
         return Response(
             {
                 "success": True,
@@ -42,10 +59,43 @@ def help_chat_api(request):
             status=status.HTTP_200_OK,
         )
 
+    data = get_fallback_help_payload()
+    _log_help(request, message, data)
+    if token:
+        data = {
+            **data,
+            "pending": True,
+            "answer_token": token,
+            "poll_url": reverse("help-chat-answer-api", args=[token]),
+        }
+
+    return Response(
+        {
+            "success": True,
+            "data": data,
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+@api_view(["GET"])
+@authentication_classes([CachedTokenAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def help_answer_api(request, token):
+    """Polling jawaban AI: status ready / pending / failed / expired."""
+    answer = get_help_answer(token)
+
+    if isinstance(answer, dict):
+        return Response({"success": True, "status": "ready", "data": answer}, status=status.HTTP_200_OK)
+
+    if answer == PENDING:
+        return Response({"success": True, "status": "pending"}, status=status.HTTP_202_ACCEPTED)
+
     return Response(
         {
             "success": True,
+            "status": "failed" if answer else "expired",
             "data": get_fallback_help_payload(),
         },
         status=status.HTTP_200_OK,
-    )
\ No newline at end of file
+    )
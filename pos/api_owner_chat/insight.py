@@ -27,6 +27,9 @@ def compare_period(dr, queries):
     """
     prev_dr = previous_period(dr)
 
+    # dua periode dihitung bareng: satu query per tabel, sisanya dari memo
+    queries.prefetch(dr, prev_dr)
+
     this_sales = queries.sales_summary(dr)
     this_profit = queries.profit_summary(dr)
     this_margin = queries.margin_summary(dr)
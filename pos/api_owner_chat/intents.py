@@ -1,9 +1,8 @@
-from dataclasses import dataclass
-
-
 import re
 from dataclasses import dataclass
 
+from pos.api_owner_chat.matcher import PhraseMatcher, Replacer
+
 
 @dataclass
 class IntentResult:
@@ -14,58 +13,62 @@ class IntentResult:
     number: int | None = None
 
 
+# =========================================================
+# NORMALIZATION (dikompilasi sekali saat import)
+# =========================================================
+NORMALIZE_REPLACEMENTS = {
+    # tetun / typo / indo / english normalization
+    "oinsá": "oinsa",
+    "ne'ebé": "ne'ebe",
+    "fa'an": "faan",
+    "ki'ik": "kiik",
+    "menipis": "kiik",
+    "stok menipis": "stok kiik",
+    "produk": "produtu",
+    "barang": "produtu",
+    "sales": "vendas",
+    "income": "reseita",
+    "revenue": "reseita",
+    "profit": "lukru",
+    "laba": "lukru",
+    "untung": "lukru",
+    "expense": "despeza",
+    "pengeluaran": "despeza",
+    "diskon": "diskuentu",
+    "discount": "diskuentu",
+    "report": "relatoriu",
+    "laporan": "relatoriu",
+    "stok habis": "stok hotu ona",
+    "produk habis": "produtu hotu ona",
+    "out of stock": "stok hotu ona",
+    "stock alert": "stok kiik",
+    "stock movement": "movement stok",
+    "inventory movement": "movement inventariu",
+    "pergerakan stok": "movement stok",
+    "mutasi stok": "movement stok",
+    "stock adjustment": "adjustment stok",
+    "take away": "takeaway",
+    "take-away": "takeaway",
+    "pick up": "pickup",
+    "dinein": "dine in",
+    "qris": "qris",
+}
+
+_NON_WORD_RE = re.compile(r"[^\w\s<>/=.-]")
+_SPACES_RE = re.compile(r"\s+")
+_NUMBER_RE = re.compile(r"(\d+)")
+_normalize_replacements = Replacer(NORMALIZE_REPLACEMENTS)
+
+
 def _normalize_text(text: str) -> str:
     text = (text or "").lower().strip()
-
-    replacements = {
-        # tetun / typo / indo / english normalization
-        "oinsá": "oinsa",
-        "ne'ebé": "ne'ebe",
-        "fa'an": "faan",
-        "ki'ik": "kiik",
-        "menipis": "kiik",
-        "stok menipis": "stok kiik",
-        "produk": "produtu",
-        "barang": "produtu",
-        "sales": "vendas",
-        "income": "reseita",
-        "revenue": "reseita",
-        "profit": "lukru",
-        "laba": "lukru",
-        "untung": "lukru",
-        "expense": "despeza",
-        "pengeluaran": "despeza",
-        "diskon": "diskuentu",
-        "discount": "diskuentu",
-        "report": "relatoriu",
-        "laporan": "relatoriu",
-        "stok habis": "stok hotu ona",
-        "produk habis": "produtu hotu ona",
-        "out of stock": "stok hotu ona",
-        "stock alert": "stok kiik",
-        "stock movement": "movement stok",
-        "inventory movement": "movement inventariu",
-        "pergerakan stok": "movement stok",
-        "mutasi stok": "movement stok",
-        "stock adjustment": "adjustment stok",
-        "take away": "takeaway",
-        "take-away": "takeaway",
-        "pick up": "pickup",
-        "dinein": "dine in",
-        "qris": "qris",
-    }
-
-    text = re.sub(r"[^\w\s<>/=.-]", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
-
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-
-    return text
+    text = _NON_WORD_RE.sub(" ", text)
+    text = _SPACES_RE.sub(" ", text).strip()
+    return _normalize_replacements(text)
 
 
 def _extract_number(text: str) -> int | None:
-    match = re.search(r"(\d+)", text)
+    match = _NUMBER_RE.search(text)
     if match:
         try:
             return int(match.group(1))
@@ -74,98 +77,50 @@ def _extract_number(text: str) -> int | None:
     return None
 
 
-def _token_set(text: str) -> set[str]:
-    return set((text or "").split())
-
-
-def _fuzzy_contains(text: str, phrase: str, min_overlap_ratio: float = 0.72) -> bool:
-    """
-    Lightweight fuzzy matcher.
-    Cocok untuk typo ringan dan susunan kata yang sedikit beda.
-    """
-    if not text or not phrase:
-        return False
-
-    if phrase in text:
-        return True
-
-    t_words = _token_set(text)
-    p_words = _token_set(phrase)
+STOCK_ENTITY_PATTERNS = [
+    re.compile(r"^stok\s+(.+)$"),
+    re.compile(r"^stok produtu\s+(.+)$"),
+    re.compile(r"^stok produk\s+(.+)$"),
+    re.compile(r"^stock\s+(.+)$"),
+]
 
-    if not p_words:
-        return False
-
-    overlap = len(t_words & p_words)
-    ratio = overlap / max(1, len(p_words))
-
-    return ratio >= min_overlap_ratio
-
-
-def _contains_any(text: str, keywords: list[str], fuzzy: bool = True) -> bool:
-    for k in keywords:
-        if k in text:
-            return True
-        if fuzzy and _fuzzy_contains(text, k):
-            return True
-    return False
+STOCK_ENTITY_BLOCKED = {
+    "kiik", "hotu ona", "minimum", "menus husi", "less than",
+    "below", "alert", "movement", "inventariu", "stok"
+}
 
 
 def _extract_stock_entity(text: str) -> str | None:
-    candidates = [
-        r"^stok\s+(.+)$",
-        r"^stok produtu\s+(.+)$",
-        r"^stok produk\s+(.+)$",
-        r"^stock\s+(.+)$",
-    ]
-
-    blocked = {
-        "kiik", "hotu ona", "minimum", "menus husi", "less than",
-        "below", "alert", "movement", "inventariu", "stok"
-    }
-
-    for pattern in candidates:
-        m = re.match(pattern, text)
+    for pattern in STOCK_ENTITY_PATTERNS:
+        m = pattern.match(text)
         if m:
             entity = m.group(1).strip()
-            if entity and entity not in blocked and len(entity) >= 2:
+            if entity and entity not in STOCK_ENTITY_BLOCKED and len(entity) >= 2:
                 return entity
     return None
 
 
-def _detect_order_type(text: str) -> str | None:
-    mapping = {
-        "DINE_IN": [
-            "dine in", "makan di tempat", "haan iha fatin", "eat in"
-        ],
-        "DELIVERY": [
-            "delivery", "antar", "delivery order", "kirim"
-        ],
-        "TAKEAWAY": [
-            "takeaway", "take away", "bungkus", "take out", "takeout"
-        ],
-        "PICKUP": [
-            "pickup", "pick up", "ambil sendiri", "self pickup"
-        ],
-    }
-
-    for slot, aliases in mapping.items():
-        if _contains_any(text, aliases, fuzzy=True):
-            return slot
-    return None
-
-
-def detect_intent(message: str) -> IntentResult:
-    t = _normalize_text(message)
-
-    if not t:
-        return IntentResult("fallback", 0.10)
-
-    number = _extract_number(t)
-
-    # =========================================================
-    # HELP
-    # =========================================================
-    if _contains_any(t, [
+# =========================================================
+# KEYWORDS PER INTENT
+# =========================================================
+# Urutan dict = urutan order type yang dicek; urutan intent ada di detect_intent().
+ORDER_TYPE_KEYWORDS = {
+    "DINE_IN": [
+        "dine in", "makan di tempat", "haan iha fatin", "eat in"
+    ],
+    "DELIVERY": [
+        "delivery", "antar", "delivery order", "kirim"
+    ],
+    "TAKEAWAY": [
+        "takeaway", "take away", "bungkus", "take out", "takeout"
+    ],
+    "PICKUP": [
+        "pickup", "pick up", "ambil sendiri", "self pickup"
+    ],
+}
+
+INTENT_KEYWORDS = {
+    "help": [
         "cara",
         "bagaimana",
         "gimana",
@@ -176,13 +131,8 @@ def detect_intent(message: str) -> IntentResult:
         "ajuda",
         "hatudu hau",
         "ajuda hau",
-    ]):
-        return IntentResult("help", 0.92)
-
-    # =========================================================
-    # WHY PROFIT DOWN
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "why_profit_down": [
         "tanba sa lukru tun",
         "kenapa lukru tun",
         "mengapa lukru tun",
@@ -190,13 +140,8 @@ def detect_intent(message: str) -> IntentResult:
         "lukru tun",
         "profit turun",
         "kenapa profit turun",
-    ]):
-        return IntentResult("why_profit_down", 0.96)
-
-    # =========================================================
-    # PROMO RECOMMENDATION
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "promo_recommendation": [
         "rekomendasaun promo",
         "rekomendasi promo",
         "saran promo",
@@ -204,13 +149,8 @@ def detect_intent(message: str) -> IntentResult:
         "promo saida",
         "promo untuk produtu lambat",
         "promo buat produk lambat",
-    ]):
-        return IntentResult("promo_recommendation", 0.95)
-
-    # =========================================================
-    # COMPARE PERIOD
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "compare_period": [
         "kompara",
         "bandingkan",
         "compare",
@@ -219,39 +159,24 @@ def detect_intent(message: str) -> IntentResult:
         "bulan ini dengan bulan lalu",
         "kompara semana ida ne e ho semana kotuk",
         "kompara fulan ida ne e ho fulan kotuk",
-    ]):
-        return IntentResult("compare_period", 0.94)
-
-    # =========================================================
-    # PAYMENT METHOD TOP
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "payment_method_top": [
         "metodu pagamentu neebe barak liu",
         "metode pembayaran paling banyak",
         "payment method paling banyak",
         "top payment method",
         "metode bayar terbanyak",
         "cara bayar paling banyak",
-    ]):
-        return IntentResult("payment_method_top", 0.95)
-
-    # =========================================================
-    # CASH VS TRANSFER
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "cash_vs_transfer": [
         "cash vs transfer",
         "cash ho transfer",
         "cash vs non cash",
         "cash vs qris",
         "cash lawan transfer",
         "selu cash ho transfer",
-    ]):
-        return IntentResult("cash_vs_transfer", 0.95)
-
-    # =========================================================
-    # BUSIEST HOURS
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "busiest_hours": [
         "oras neebe movimentu liu",
         "jam paling ramai",
         "jam ramai",
@@ -259,75 +184,37 @@ def detect_intent(message: str) -> IntentResult:
         "busiest hours",
         "peak hour",
         "jam tersibuk",
-    ]):
-        return IntentResult("busiest_hours", 0.95)
-
-    # =========================================================
-    # DELIVERY FEE
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "delivery_fee_summary": [
         "taxa delivery",
         "delivery fee",
         "ongkir",
         "ongkos kirim",
         "biaya delivery",
         "fee delivery",
-    ]):
-        return IntentResult("delivery_fee_summary", 0.95)
-
-    # =========================================================
-    # DISCOUNT
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "discount_summary": [
         "diskuentu",
         "potongan harga",
         "discount",
         "diskon",
-    ]):
-        return IntentResult("discount_summary", 0.93)
-
-    # =========================================================
-    # SALES BY TYPE
-    # =========================================================
-    order_type = _detect_order_type(t)
-    if order_type:
-        sales_words = [
-            "reseita", "vendas", "sales", "income", "penjualan", "omzet",
-            "net sales", "revenue", "total"
-        ]
-        if _contains_any(t, sales_words, fuzzy=True) or order_type:
-            return IntentResult("sales_by_type", 0.94, slot=order_type)
-
-    # =========================================================
-    # STOCK ALERT
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "stock_alert": [
         "stok kiik",
         "stok minimum",
         "min stock",
         "low stock",
         "alert stok",
-        "stok minimum",
-    ]):
-        return IntentResult("stock_alert", 0.96)
-
-    # =========================================================
-    # STOCK OUT
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "stock_out": [
         "produtu hotu ona",
         "stok hotu ona",
         "stok kosong",
         "produk habis",
         "stok habis",
         "out of stock",
-    ]):
-        return IntentResult("stock_out", 0.96)
-
-    # =========================================================
-    # STOCK THRESHOLD
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "stock_threshold": [
         "stok menus husi",
         "stok kurang dari",
         "stok kurang",
@@ -336,45 +223,23 @@ def detect_intent(message: str) -> IntentResult:
         "stock less than",
         "stok <=",
         "stock <=",
-    ]):
-        return IntentResult("stock_threshold", 0.93, number=number)
-
-    # =========================================================
-    # INVENTORY MOVEMENT
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "inventory_movement": [
         "movement inventariu",
         "movement stok",
         "inventory movement",
         "pergerakan stok",
         "mutasi",
         "stock movement",
-    ]):
-        return IntentResult("inventory_movement", 0.94)
-
-    # =========================================================
-    # MOVEMENT ADJUSTMENT
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "movement_adjustment": [
         "movement adjustment",
         "adjustment movement",
         "adjustment stok",
         "stock adjustment",
         "koreksi stok",
-    ]):
-        return IntentResult("movement_adjustment", 0.94)
-
-    # =========================================================
-    # STOCK ITEM
-    # =========================================================
-    entity = _extract_stock_entity(t)
-    if entity:
-        return IntentResult("stock_item", 0.89, entity=entity)
-
-    # =========================================================
-    # TOP PRODUCTS
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "top_products": [
         "top produtu",
         "produtu neebe faan barak liu",
         "produk paling laku",
@@ -382,50 +247,29 @@ def detect_intent(message: str) -> IntentResult:
         "bestseller",
         "top products",
         "produk terlaris",
-    ]):
-        return IntentResult("top_products", 0.95)
-
-    # =========================================================
-    # MARGIN
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "margin_summary": [
         "margem",
         "margin",
         "gross margin",
         "profit margin",
-    ]):
-        return IntentResult("margin_summary", 0.94)
-
-    # =========================================================
-    # PROFIT
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "profit_summary": [
         "lukru",
         "profit",
         "laba",
         "rugi",
         "untung",
-    ]):
-        return IntentResult("profit_summary", 0.94)
-
-    # =========================================================
-    # EXPENSE
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "expense": [
         "despeza",
         "expense",
         "pengeluaran",
         "biaya",
         "beban",
-    ]):
-        if _contains_any(t, ["top", "terbesar", "aas liu"], fuzzy=False):
-            return IntentResult("expense_top", 0.92)
-        return IntentResult("expense_summary", 0.94)
-
-    # =========================================================
-    # ORDERS / AOV
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "expense_top": ["top", "terbesar", "aas liu"],
+    "orders_kpi": [
         "total tranzasaun",
         "jumlah transaksi",
         "order count",
@@ -438,13 +282,8 @@ def detect_intent(message: str) -> IntentResult:
         "media order",
         "hira tranzasaun",
         "total pedido",
-    ]):
-        return IntentResult("orders_kpi", 0.90)
-
-    # =========================================================
-    # SALES / INCOME
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "sales_summary": [
         "reseita",
         "vendas",
         "income",
@@ -454,27 +293,130 @@ def detect_intent(message: str) -> IntentResult:
         "net sales",
         "pendapatan",
         "revenue",
-    ]):
-        return IntentResult("sales_summary", 0.94)
-
-    # =========================================================
-    # CUSTOMER
-    # =========================================================
-    if _contains_any(t, [
+    ],
+    "top_customers": [
         "top customer",
         "pelanggan terbaik",
         "customer terbaik",
         "kliente diak liu",
-    ]):
-        return IntentResult("top_customers", 0.82)
-
-    if _contains_any(t, [
+    ],
+    "customer_points": [
         "member points",
         "poin customer",
         "points customer",
         "pontus customer",
         "pontus member",
-    ]):
-        return IntentResult("customer_points", 0.82)
+    ],
+}
+
+INTENT_CONFIDENCE = {
+    "help": 0.92,
+    "why_profit_down": 0.96,
+    "promo_recommendation": 0.95,
+    "compare_period": 0.94,
+    "payment_method_top": 0.95,
+    "cash_vs_transfer": 0.95,
+    "busiest_hours": 0.95,
+    "delivery_fee_summary": 0.95,
+    "discount_summary": 0.93,
+    "stock_alert": 0.96,
+    "stock_out": 0.96,
+    "inventory_movement": 0.94,
+    "movement_adjustment": 0.94,
+    "top_products": 0.95,
+    "margin_summary": 0.94,
+    "profit_summary": 0.94,
+    "orders_kpi": 0.90,
+    "sales_summary": 0.94,
+    "top_customers": 0.82,
+    "customer_points": 0.82,
+}
+
+# intent sederhana (cukup keyword match), dicek berurutan sebelum / sesudah kasus khusus
+_LEADING_INTENTS = (
+    "help",
+    "why_profit_down",
+    "promo_recommendation",
+    "compare_period",
+    "payment_method_top",
+    "cash_vs_transfer",
+    "busiest_hours",
+    "delivery_fee_summary",
+    "discount_summary",
+)
+_STOCK_INTENTS = ("stock_alert", "stock_out")
+_MOVEMENT_INTENTS = ("inventory_movement", "movement_adjustment")
+_REPORT_INTENTS = ("top_products", "margin_summary", "profit_summary")
+_TRAILING_INTENTS = ("orders_kpi", "sales_summary", "top_customers", "customer_points")
+
+INTENT_MATCHER = PhraseMatcher(
+    {
+        **INTENT_KEYWORDS,
+        **{f"order_type:{slot}": aliases for slot, aliases in ORDER_TYPE_KEYWORDS.items()},
+    },
+    exact=("expense_top",),
+)
+
+
+def _first_intent(hits, names) -> IntentResult | None:
+    for name in names:
+        if name in hits:
+            return IntentResult(name, INTENT_CONFIDENCE[name])
+    return None
+
+
+def _detect_order_type(hits) -> str | None:
+    for slot in ORDER_TYPE_KEYWORDS:
+        if f"order_type:{slot}" in hits:
+            return slot
+    return None
+
+
+def detect_intent(message: str) -> IntentResult:
+    t = _normalize_text(message)
+
+    if not t:
+        return IntentResult("fallback", 0.10)
+
+    number = _extract_number(t)
+    hits = INTENT_MATCHER.match(t)
+
+    # help, insight, payment, delivery fee, discount
+    result = _first_intent(hits, _LEADING_INTENTS)
+    if result:
+        return result
+
+    # sales by type (dine in / delivery / takeaway / pickup)
+    order_type = _detect_order_type(hits)
+    if order_type:
+        return IntentResult("sales_by_type", 0.94, slot=order_type)
+
+    result = _first_intent(hits, _STOCK_INTENTS)
+    if result:
+        return result
+
+    if "stock_threshold" in hits:
+        return IntentResult("stock_threshold", 0.93, number=number)
+
+    result = _first_intent(hits, _MOVEMENT_INTENTS)
+    if result:
+        return result
+
+    entity = _extract_stock_entity(t)
+    if entity:
+        return IntentResult("stock_item", 0.89, entity=entity)
+
+    result = _first_intent(hits, _REPORT_INTENTS)
+    if result:
+        return result
+
+    if "expense" in hits:
+        if "expense_top" in hits:
+            return IntentResult("expense_top", 0.92)
+        return IntentResult("expense_summary", 0.94)
+
+    result = _first_intent(hits, _TRAILING_INTENTS)
+    if result:
+        return result
 
-    return IntentResult("fallback", 0.30)
\ No newline at end of file
+    return IntentResult("fallback", 0.30)
@@ -0,0 +1,136 @@
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+
+from pos.models import Expense, Order, OrderItem
+
+
+MONEY = DecimalField(max_digits=18, decimal_places=2)
+
+REVENUE_EXPR = ExpressionWrapper(F("quantity") * F("price"), output_field=MONEY)
+COST_EXPR = ExpressionWrapper(F("quantity") * F("product__buy_price"), output_field=MONEY)
+
+# (nama metric, aggregate, expression)
+ORDER_METRICS = (
+    ("orders", Count, "id"),
+    ("net_sales", Sum, "total"),
+    ("subtotal", Sum, "subtotal"),
+    ("tax", Sum, "tax"),
+    ("discount", Sum, "discount"),
+    ("delivery_fee", Sum, "delivery_fee"),
+)
+ITEM_METRICS = (
+    ("revenue", Sum, REVENUE_EXPR),
+    ("cost", Sum, COST_EXPR),
+    ("qty", Sum, "quantity"),
+)
+EXPENSE_METRICS = (
+    ("expense", Sum, "amount"),
+)
+INT_METRICS = {"orders", "qty"}
+
+
+def _range_key(dr):
+    return (dr.start, dr.end)
+
+
+def _order_q(start, end):
+    return Q(created_at__gte=start, created_at__lt=end)
+
+
+def _item_q(start, end):
+    return Q(order__created_at__gte=start, order__created_at__lt=end)
+
+
+def _expense_q(start, end):
+    # sama dengan expense_summary: tanggal lokal, end exclusive
+    return Q(date__gte=start.date(), date__lt=end.date())
+
+
+class KpiEngine:
+    """
+    Semua KPI owner-chat untuk N periode sekaligus.
+
+    Satu query per tabel (Order, OrderItem, Expense): WHERE dibatasi ke
+    gabungan semua periode, lalu tiap periode jadi Sum/Count(..., filter=Q(...)).
+    Hasil disimpan per (start, end) selama object hidup (satu request chat),
+    jadi compare_period + why_profit_down tidak query ulang.
+    """
+
+    def __init__(self, shop=None):
+        self.shop = shop
+        self._orders = {}
+        self._items = {}
+        self._expenses = {}
+
+    # ---------------------------------------------------------
+    # per tabel
+    # ---------------------------------------------------------
+    def _order_qs(self):
+        qs = Order.objects.filter(is_paid=True)
+        return qs.filter(shop=self.shop) if self.shop is not None else qs
+
+    def _item_qs(self):
+        qs = OrderItem.objects.filter(order__is_paid=True)
+        return qs.filter(order__shop=self.shop) if self.shop is not None else qs
+
+    def _expense_qs(self):
+        qs = Expense.objects.all()
+        return qs.filter(shop=self.shop) if self.shop is not None else qs
+
+    def _tables(self):
+        return (
+            (self._orders, self._order_qs, _order_q, ORDER_METRICS),
+            (self._items, self._item_qs, _item_q, ITEM_METRICS),
+            (self._expenses, self._expense_qs, _expense_q, EXPENSE_METRICS),
+        )
+
+    def _load(self, memo, base_qs, range_q, metrics, ranges):
+        missing = []
+        for dr in ranges:
+            key = _range_key(dr)
+            if key not in memo and key not in missing:
+                missing.append(key)
+        if not missing:
+            return
+
+        span_start = min(start for start, _ in missing)
+        span_end = max(end for _, end in missing)
+
+        aggregates = {}
+        for i, (start, end) in enumerate(missing):
+            q = range_q(start, end)
+            for name, func, expr in metrics:
+                aggregates[f"{name}__{i}"] = func(expr, filter=q)
+
+        row = base_qs().filter(range_q(span_start, span_end)).aggregate(**aggregates)
+
+        for i, key in enumerate(missing):
+            values = {}
+            for name, _func, _expr in metrics:
+                value = row[f"{name}__{i}"]
+                if name in INT_METRICS:
+                    values[name] = int(value or 0)
+                else:
+                    values[name] = Decimal(str(value)) if value is not None else Decimal("0.00")
+            memo[key] = values
+
+    # ---------------------------------------------------------
+    # public
+    # ---------------------------------------------------------
+    def prefetch(self, *ranges):
+        """Hitung semua tabel untuk semua periode (maks. 3 query)."""
+        for memo, base_qs, range_q, metrics in self._tables():
+            self._load(memo, base_qs, range_q, metrics, ranges)
+
+    def orders(self, dr) -> dict:
+        self._load(self._orders, self._order_qs, _order_q, ORDER_METRICS, [dr])
+        return self._orders[_range_key(dr)]
+
+    def items(self, dr) -> dict:
+        self._load(self._items, self._item_qs, _item_q, ITEM_METRICS, [dr])
+        return self._items[_range_key(dr)]
+
+    def expenses(self, dr) -> dict:
+        self._load(self._expenses, self._expense_qs, _expense_q, EXPENSE_METRICS, [dr])
+        return self._expenses[_range_key(dr)]
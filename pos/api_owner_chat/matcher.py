@@ -0,0 +1,94 @@
+import re
+from collections import defaultdict
+
+
+class Replacer:
+    """
+    Semua replacement dalam satu regex alternation (satu pass, dikompilasi sekali).
+    Key paling panjang menang di posisi yang sama, jadi "produk habis" tidak
+    terpotong dulu oleh "produk".
+    """
+
+    def __init__(self, mapping: dict):
+        self._mapping = dict(mapping)
+        keys = sorted((k for k in self._mapping if k), key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(k) for k in keys)) if keys else None
+
+    def __call__(self, text: str) -> str:
+        if self._pattern is None or not text:
+            return text
+        return self._pattern.sub(lambda m: self._mapping[m.group(0)], text)
+
+
+class PhraseMatcher:
+    """
+    Keyword list per grup (intent), dikompilasi sekali saat import:
+    - substring: satu regex alternation per grup
+    - fuzzy: inverted index token -> phrase, jadi overlap token semua phrase
+      dihitung dalam satu pass atas token pesan (bukan set() baru per keyword)
+
+    Fuzzy = sebagian besar token phrase (>= min_overlap_ratio) ada di pesan.
+    Grup di `exact` hanya dicocokkan substring.
+    """
+
+    def __init__(self, groups: dict, *, exact=(), min_overlap_ratio: float = 0.72):
+        self.min_overlap_ratio = min_overlap_ratio
+        self._substring = {}
+        self._token_index = defaultdict(list)
+        self._phrase_size = []
+        self._phrase_group = []
+
+        for name, phrases in groups.items():
+            phrases = [p for p in phrases if p]
+            if phrases:
+                ordered = sorted(set(phrases), key=len, reverse=True)
+                self._substring[name] = re.compile("|".join(re.escape(p) for p in ordered))
+            else:
+                self._substring[name] = None
+
+            if name in exact:
+                continue
+
+            for phrase in phrases:
+                words = set(phrase.split())
+                if not words:
+                    continue
+                phrase_id = len(self._phrase_size)
+                self._phrase_size.append(len(words))
+                self._phrase_group.append(name)
+                for word in words:
+                    self._token_index[word].append(phrase_id)
+
+    def match(self, text: str) -> "PhraseHits":
+        return PhraseHits(self, text or "")
+
+    def _fuzzy_groups(self, text: str) -> set:
+        counts = defaultdict(int)
+        for word in set(text.split()):
+            for phrase_id in self._token_index.get(word, ()):
+                counts[phrase_id] += 1
+
+        groups = set()
+        for phrase_id, overlap in counts.items():
+            if overlap / self._phrase_size[phrase_id] >= self.min_overlap_ratio:
+                groups.add(self._phrase_group[phrase_id])
+        return groups
+
+
+class PhraseHits:
+    """Hasil match satu pesan; `"help" in hits` -> grup "help" cocok (substring atau fuzzy)."""
+
+    __slots__ = ("_matcher", "_text", "_fuzzy")
+
+    def __init__(self, matcher: PhraseMatcher, text: str):
+        self._matcher = matcher
+        self._text = text
+        self._fuzzy = matcher._fuzzy_groups(text) if text else set()
+
+    def __contains__(self, name) -> bool:
+        if not self._text:
+            return False
+        if name in self._fuzzy:
+            return True
+        pattern = self._matcher._substring[name]
+        return pattern is not None and pattern.search(self._text) is not None
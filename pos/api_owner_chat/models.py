@@ -1,25 +1,2 @@
-from django.db import models
-from django.conf import settings
-
-
-class OwnerChatLog(models.Model):
-
-    user = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
-    )
-
-    message = models.TextField()
-
-    response = models.TextField()
-
-    source = models.CharField(
-        max_length=20
-    )
-
-    created_at = models.DateTimeField(
-        auto_now_add=True
-    )
-
-    def __str__(self):
-        return f"{self.user} | {self.source}"
\ No newline at end of file
+# Model owner chat ada di app "pos" (pos/models_owner_chat.py); modul ini hanya re-export.
+from pos.models_owner_chat import OwnerChatIntentDaily, OwnerChatLog  # noqa: F401
@@ -1,10 +1,17 @@
+from datetime import datetime, time
 from decimal import Decimal
+from django.conf import settings
 from django.db.models import (
     Sum, Count, F, DecimalField, ExpressionWrapper, Value, IntegerField
 )
 from django.db.models.functions import Coalesce, ExtractHour
+from django.utils import timezone
 
-from pos.models import Order, OrderItem, Expense, Product, StockMovement
+from pos.models import (
+    Order, OrderItem, Expense, Product, StockMovement, PaymentMethod, SalePayment
+)
+from pos.api_owner_chat.kpi import KpiEngine
+from pos.services.report_cache import cached_range
 
 
 DEC0 = Value(Decimal("0.00"), output_field=DecimalField(max_digits=18, decimal_places=2))
@@ -40,33 +47,53 @@ def _paid_orders_qs(dr, shop=None):
     return _filter_shop(qs, shop)
 
 
-def sales_summary(dr, shop=None):
-    qs = _paid_orders_qs(dr, shop=shop)
-
-    agg = qs.aggregate(
-        orders=Count("id"),
-        net_sales=Coalesce(Sum("total"), DEC0),
-        subtotal=Coalesce(Sum("subtotal"), DEC0),
-        tax=Coalesce(Sum("tax"), DEC0),
-        discount=Coalesce(Sum("discount"), DEC0),
-        delivery_fee=Coalesce(Sum("delivery_fee"), DEC0),
-    )
-
-    orders = int(agg.get("orders") or 0)
-    net_sales = _to_decimal(agg.get("net_sales"))
+def _sales_result(k: dict) -> dict:
+    orders = k["orders"]
+    net_sales = k["net_sales"]
     aov = (net_sales / Decimal(str(orders))) if orders > 0 else Decimal("0.00")
 
     return {
         "orders": orders,
         "net_sales": net_sales,
         "aov": aov,
-        "subtotal": _to_decimal(agg.get("subtotal")),
-        "tax": _to_decimal(agg.get("tax")),
-        "discount": _to_decimal(agg.get("discount")),
-        "delivery_fee": _to_decimal(agg.get("delivery_fee")),
+        "subtotal": k["subtotal"],
+        "tax": k["tax"],
+        "discount": k["discount"],
+        "delivery_fee": k["delivery_fee"],
+    }
+
+
+def _profit_result(order_k: dict, expense_k: dict) -> dict:
+    s = _sales_result(order_k)
+    expense = expense_k["expense"]
+
+    return {
+        "net_sales": s["net_sales"],
+        "expense": expense,
+        "profit": s["net_sales"] - expense,
+        "orders": s["orders"],
+        "aov": s["aov"],
+    }
+
+
+def _margin_result(k: dict) -> dict:
+    revenue = k["revenue"]
+    cost = k["cost"]
+    gross_profit = revenue - cost
+    margin_pct = (gross_profit / revenue * Decimal("100")) if revenue > 0 else Decimal("0.00")
+
+    return {
+        "revenue": revenue,
+        "cost": cost,
+        "gross_profit": gross_profit,
+        "margin_pct": margin_pct
     }
 
 
+def sales_summary(dr, shop=None):
+    return _sales_result(KpiEngine(shop).orders(dr))
+
+
 def orders_kpi(dr, shop=None):
     return sales_summary(dr, shop=shop)
 
@@ -93,20 +120,8 @@ def expense_summary(dr, shop=None):
 
 
 def profit_summary(dr, shop=None):
-    s = sales_summary(dr, shop=shop)
-    e = expense_summary(dr, shop=shop)
-
-    net_sales = _to_decimal(s.get("net_sales"))
-    expense = _to_decimal(e.get("total"))
-    profit = net_sales - expense
-
-    return {
-        "net_sales": net_sales,
-        "expense": expense,
-        "profit": profit,
-        "orders": int(s.get("orders") or 0),
-        "aov": _to_decimal(s.get("aov")),
-    }
+    kpi = KpiEngine(shop)
+    return _profit_result(kpi.orders(dr), kpi.expenses(dr))
 
 
 def top_products(dr, shop=None):
@@ -206,62 +221,214 @@ def inventory_movement(dr, shop=None):
 
 
 def margin_summary(dr, shop=None):
-    revenue_expr = ExpressionWrapper(
-        F("quantity") * F("price"),
-        output_field=DecimalField(max_digits=18, decimal_places=2)
-    )
-    cost_expr = ExpressionWrapper(
-        F("quantity") * F("product__buy_price"),
-        output_field=DecimalField(max_digits=18, decimal_places=2)
+    return _margin_result(KpiEngine(shop).items(dr))
+
+
+def high_stock_products(limit=5, shop=None):
+    qs = Product.objects.all()
+    qs = _filter_shop(qs, shop)
+    qs = qs.order_by("-stock", "name")[:limit]
+    return [{"id": p.id, "name": p.name, "stock": int(p.stock or 0)} for p in qs]
+
+
+# =========================================================
+# SALES BREAKDOWN / PAYMENT / BUSY HOURS
+# =========================================================
+# slot dari intent -> Order.OrderType (takeaway & pickup = take-out)
+ORDER_TYPE_SLOTS = {
+    "GENERAL": (Order.OrderType.GENERAL,),
+    "DINE_IN": (Order.OrderType.DINE_IN,),
+    "DELIVERY": (Order.OrderType.DELIVERY,),
+    "TAKEAWAY": (Order.OrderType.TAKE_OUT,),
+    "PICKUP": (Order.OrderType.TAKE_OUT,),
+}
+
+# PaymentMethod.payment_type -> kolom cash vs transfer (CARD dll. masuk OTHER)
+PAYMENT_TYPE_BUCKETS = {
+    PaymentMethod.PaymentType.CASH: "CASH",
+    PaymentMethod.PaymentType.BANK: "TRANSFER",
+    PaymentMethod.PaymentType.QRIS: "QRIS",
+}
+PAYMENT_BUCKETS = ("CASH", "TRANSFER", "QRIS", "OTHER")
+
+
+def _cached_answer(name, dr, shop, compute):
+    """
+    Jawaban per (shop, range) disimpan di report cache dan ikut versi data shop:
+    pertanyaan yang sama tidak query ulang sampai ada order/payment/expense baru.
+    Range yang sudah lewat paling lama OWNER_CHAT_ANSWER_CACHE_TIMEOUT detik
+    (retur / expense backdate di worker lain tetap terlihat).
+    """
+    tz = timezone.get_current_timezone()
+    today_start = timezone.make_aware(datetime.combine(timezone.localdate(), time.min), tz)
+
+    return cached_range(
+        dataset=f"owner_chat:{name}",
+        shop_id=getattr(shop, "id", None),
+        start=dr.start,
+        end=dr.end,
+        closed=dr.end <= today_start,
+        compute=compute,
+        history_timeout=getattr(settings, "OWNER_CHAT_ANSWER_CACHE_TIMEOUT", 60 * 60),
     )
 
-    qs = OrderItem.objects.filter(
+
+def _paid_payments_qs(dr, shop=None):
+    qs = SalePayment.objects.filter(
         order__created_at__gte=dr.start,
         order__created_at__lt=dr.end,
-        order__is_paid=True
+        order__is_paid=True,
     )
-
     if shop is not None:
         qs = qs.filter(order__shop=shop)
+    return qs
 
-    agg = qs.aggregate(
-        revenue=Coalesce(Sum(revenue_expr), DEC0),
-        cost=Coalesce(Sum(cost_expr), DEC0),
-        qty=Coalesce(Sum("quantity"), INT0),
-    )
 
-    revenue = _to_decimal(agg["revenue"])
-    cost = _to_decimal(agg["cost"])
-    gross_profit = revenue - cost
-    margin_pct = (gross_profit / revenue * Decimal("100")) if revenue > 0 else Decimal("0.00")
+def _order_kpis(dr, shop=None) -> dict:
+    return _cached_answer("order_kpis", dr, shop, lambda: KpiEngine(shop).orders(dr))
 
-    return {
-        "revenue": revenue,
-        "cost": cost,
-        "gross_profit": gross_profit,
-        "margin_pct": margin_pct
-    }
 
+def sales_by_type(dr, order_type: str = "GENERAL", shop=None):
+    order_type = (order_type or "GENERAL").upper()
+    types = ORDER_TYPE_SLOTS.get(order_type, (order_type,))
 
-def high_stock_products(limit=5, shop=None):
-    qs = Product.objects.all()
+    def compute():
+        agg = (
+            _paid_orders_qs(dr, shop=shop)
+            .filter(default_order_type__in=types)
+            .aggregate(
+                orders=Count("id"),
+                total=Coalesce(Sum("total"), DEC0),
+                discount=Coalesce(Sum("discount"), DEC0),
+                delivery_fee=Coalesce(Sum("delivery_fee"), DEC0),
+            )
+        )
+        return {
+            "order_type": order_type,
+            "orders": int(agg["orders"] or 0),
+            "total": _to_decimal(agg["total"]),
+            "discount": _to_decimal(agg["discount"]),
+            "delivery_fee": _to_decimal(agg["delivery_fee"]),
+        }
+
+    return _cached_answer(f"sales_by_type:{order_type}", dr, shop, compute)
+
+
+def delivery_fee_summary(dr, shop=None):
+    k = _order_kpis(dr, shop=shop)
+    return {"delivery_fee": k["delivery_fee"], "orders": k["orders"]}
+
+
+def discount_summary(dr, shop=None):
+    k = _order_kpis(dr, shop=shop)
+    return {"discount": k["discount"], "orders": k["orders"]}
+
+
+def payment_method_top(dr, limit: int = 5, shop=None):
+    def compute():
+        rows = (
+            _paid_payments_qs(dr, shop=shop)
+            .values("payment_method__name")
+            .annotate(
+                orders=Count("order_id", distinct=True),
+                total=Coalesce(Sum("amount"), DEC0),
+            )
+            .order_by("-orders", "-total", "payment_method__name")[:limit]
+        )
+        return [
+            {
+                "method": x["payment_method__name"],
+                "orders": int(x["orders"] or 0),
+                "total": _to_decimal(x["total"]),
+            }
+            for x in rows
+        ]
+
+    return _cached_answer(f"payment_method_top:{limit}", dr, shop, compute)
+
+
+def cash_vs_transfer(dr, shop=None):
+    def compute():
+        result = {bucket: {"orders": 0, "total": Decimal("0.00")} for bucket in PAYMENT_BUCKETS}
+        rows = (
+            _paid_payments_qs(dr, shop=shop)
+            .values("payment_method__payment_type")
+            .annotate(
+                orders=Count("order_id", distinct=True),
+                total=Coalesce(Sum("amount"), DEC0),
+            )
+            .order_by()
+        )
+        for x in rows:
+            bucket = result[PAYMENT_TYPE_BUCKETS.get(x["payment_method__payment_type"], "OTHER")]
+            bucket["orders"] += int(x["orders"] or 0)
+            bucket["total"] += _to_decimal(x["total"])
+        return result
+
+    return _cached_answer("cash_vs_transfer", dr, shop, compute)
+
+
+def busiest_hours(dr, limit: int = 5, shop=None):
+    def compute():
+        # jam lokal shop (TIME_ZONE), bukan jam UTC di database
+        rows = (
+            _paid_orders_qs(dr, shop=shop)
+            .annotate(hour=ExtractHour("created_at", tzinfo=timezone.get_current_timezone()))
+            .values("hour")
+            .annotate(orders=Count("id"), total=Coalesce(Sum("total"), DEC0))
+            .order_by("-orders", "-total", "hour")[:limit]
+        )
+        return [
+            {"hour": int(x["hour"]), "orders": int(x["orders"] or 0), "total": _to_decimal(x["total"])}
+            for x in rows
+        ]
+
+    return _cached_answer(f"busiest_hours:{limit}", dr, shop, compute)
+
+
+def movement_by_type(dr, movement_type: str, limit: int = 10, shop=None):
+    qs = StockMovement.objects.filter(
+        created_at__gte=dr.start,
+        created_at__lt=dr.end,
+        movement_type=movement_type,
+    )
     qs = _filter_shop(qs, shop)
-    qs = qs.order_by("-stock", "name")[:limit]
-    return [{"id": p.id, "name": p.name, "stock": int(p.stock or 0)} for p in qs]
+    qs = qs.select_related("product").order_by("-created_at")[:limit]
+
+    return [
+        {
+            "id": m.id,
+            "at": m.created_at,
+            "type": m.movement_type,
+            "product": getattr(m.product, "name", ""),
+            "delta": int(m.quantity_delta or 0),
+            "note": m.note or "",
+        }
+        for m in qs
+    ]
 
 
 class QueryService:
+    """
+    Query per shop untuk insight. KPI (sales/profit/margin) lewat satu KpiEngine
+    yang di-memo selama object ini hidup (satu request chat).
+    """
+
     def __init__(self, shop):
         self.shop = shop
+        self.kpi = KpiEngine(shop)
+
+    def prefetch(self, *ranges):
+        self.kpi.prefetch(*ranges)
 
     def sales_summary(self, dr):
-        return sales_summary(dr, shop=self.shop)
+        return _sales_result(self.kpi.orders(dr))
 
     def profit_summary(self, dr):
-        return profit_summary(dr, shop=self.shop)
+        return _profit_result(self.kpi.orders(dr), self.kpi.expenses(dr))
 
     def margin_summary(self, dr):
-        return margin_summary(dr, shop=self.shop)
+        return _margin_result(self.kpi.items(dr))
 
     def top_products(self, dr):
         return top_products(dr, shop=self.shop)
@@ -1,6 +1,7 @@
 from django.urls import path
-from .help_views import help_chat_api
+from .help_views import help_answer_api, help_chat_api
 
 urlpatterns = [
     path("api/help/chat/", help_chat_api, name="help-chat-api"),
-]
\ No newline at end of file
+    path("api/help/chat/answer/<str:token>/", help_answer_api, name="help-chat-answer-api"),
+]
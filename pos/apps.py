@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class PosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pos'
+
+    def ready(self):
+        from django.core import checks
+
+        from pos.authentication import connect_token_cache_signals
+        from pos.services.report_cache import connect_report_cache_signals
+        from pos.services.shared_cache import check_shared_cache
+        from pos.services.shop_cache import connect_shop_cache_signals
+
+        checks.register(check_shared_cache, checks.Tags.caches)
+        connect_report_cache_signals()
+        connect_shop_cache_signals()
+        connect_token_cache_signals()
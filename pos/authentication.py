@@ -0,0 +1,258 @@
+# pos/authentication.py
+
+import hashlib
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from pos.services.shared_cache import cache_is_shared
+
+# field user yang disimpan di cache auth; field lain di-load lazy (deferred) kalau dipakai
+USER_CACHE_FIELDS = (
+    "id",
+    "username",
+    "shop_id",
+    "role",
+    "is_active",
+    "is_superuser",
+    "is_staff",
+    "first_name",
+    "last_name",
+)
+TOKEN_KEY = "auth:token:{digest}"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def token_ttl():
+    """Umur token (API_TOKEN_TTL_HOURS, 0 = tidak expire)."""
+    hours = float(_setting("API_TOKEN_TTL_HOURS", 24 * 7) or 0)
+    return timedelta(hours=hours) if hours > 0 else None
+
+
+def token_expires_at(created):
+    ttl = token_ttl()
+    return created + ttl if ttl and created else None
+
+
+def _cache_key(key: str) -> str:
+    # token mentah tidak dipakai sebagai cache key
+    return TOKEN_KEY.format(digest=hashlib.sha256(key.encode()).hexdigest()[:40])
+
+
+def _shared_token_cache():
+    """
+    Layer shared cache (Redis) atau None. LocMemCache juga per proses:
+    invalidation tidak sampai ke worker lain, jadi cukup cache lokal (TTL pendek).
+    """
+    return cache if cache_is_shared() else None
+
+
+def _remember_entry(cache_key, entry, shared):
+    if shared is not None:
+        shared.set(cache_key, entry, int(_setting("API_TOKEN_CACHE_SECONDS", 300)))
+    local_token_cache.set(cache_key, entry, float(_setting("API_TOKEN_LOCAL_CACHE_SECONDS", 10)))
+
+
+# =========================================================
+# IN-PROCESS CACHE
+# =========================================================
+class _LocalTokenCache:
+    """
+    Cache kecil per proses (TTL pendek). Invalidation hanya menghapus entry di
+    proses ini + shared cache, jadi proses lain paling lama telat
+    API_TOKEN_LOCAL_CACHE_SECONDS (tanpa shared cache layer itu dilewati).
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, entry = item
+        if expires < time.monotonic():
+            self.delete(key)
+            return None
+        return entry
+
+    def set(self, key, entry, seconds: float):
+        if seconds <= 0:
+            return
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                # buang entry paling lama (urutan insert dict)
+                self._data.pop(next(iter(self._data)), None)
+            self._data[key] = (time.monotonic() + seconds, entry)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_token_cache = _LocalTokenCache()
+
+
+def invalidate_token(key):
+    if not key:
+        return
+    cache_key = _cache_key(key)
+    local_token_cache.delete(cache_key)
+    cache.delete(cache_key)
+
+
+def invalidate_user_tokens(user_id):
+    """Hapus cache auth semua token user (logout, nonaktif, ganti role / shop / password)."""
+    for key in Token.objects.filter(user_id=user_id).values_list("key", flat=True):
+        invalidate_token(key)
+        # request lain bisa mengisi ulang cache sebelum transaksi ini commit
+        transaction.on_commit(lambda key=key: invalidate_token(key))
+
+
+# =========================================================
+# ISSUE / REVOKE
+# =========================================================
+def token_reuse_window():
+    """Token yang lebih muda dari API_TOKEN_REUSE_HOURS dipakai ulang saat login (0 = selalu rotasi)."""
+    hours = float(_setting("API_TOKEN_REUSE_HOURS", 1) or 0)
+    return timedelta(hours=hours) if hours > 0 else None
+
+
+def _remember(token, user):
+    """Isi cache auth untuk token baru: request pertama setelah login tidak query."""
+    Token.user.field.set_cached_value(token, user)
+    _remember_entry(_cache_key(token.key), _entry_for(token), _shared_token_cache())
+    return token
+
+
+def issue_token(user):
+    """
+    Token untuk login, paling banyak satu SELECT + satu write:
+    - token masih muda (API_TOKEN_REUSE_HOURS) -> dipakai ulang (login ulang saat buka shift)
+    - selain itu rotasi di tempat: key + created diganti dengan satu UPDATE,
+      cache token lama dibuang
+    - belum punya token -> INSERT
+    """
+    now = timezone.now()
+    current = Token.objects.filter(user_id=user.pk).only("key", "created").first()
+
+    if current is not None:
+        reuse = token_reuse_window()
+        if reuse and current.created and current.created > now - reuse:
+            return _remember(current, user)
+
+        new_key = Token.generate_key()
+        if Token.objects.filter(pk=current.pk).update(key=new_key, created=now):
+            invalidate_token(current.key)
+            return _remember(Token(key=new_key, user_id=user.pk, created=now), user)
+
+    try:
+        with transaction.atomic():
+            token = Token.objects.create(user=user)
+    except IntegrityError:
+        # login paralel user yang sama sudah membuat token
+        token = Token.objects.get(user_id=user.pk)
+    return _remember(token, user)
+
+
+def revoke_token(key):
+    invalidate_token(key)
+    Token.objects.filter(key=key).delete()
+
+
+# =========================================================
+# AUTHENTICATION
+# =========================================================
+def _entry_for(token) -> dict:
+    user = token.user
+    return {
+        "user": {name: getattr(user, name) for name in USER_CACHE_FIELDS},
+        "created": token.created,
+    }
+
+
+def _build(key, entry):
+    from pos.models import CustomUser
+
+    fields = entry["user"]
+    # instance "dari DB" dengan field lain deferred (di-load kalau diakses);
+    # from_db() butuh value urut sesuai concrete_fields model
+    names = [f.attname for f in CustomUser._meta.concrete_fields if f.attname in fields]
+    user = CustomUser.from_db("default", names, [fields[name] for name in names])
+    token = Token.from_db("default", ["key", "user_id", "created"], [key, user.pk, entry["created"]])
+    Token.user.field.set_cached_value(token, user)
+    return user, token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication DRF + cache `token -> (user_id, shop_id, role, is_active, ...)`:
+    - in-process (API_TOKEN_LOCAL_CACHE_SECONDS) lalu shared cache (API_TOKEN_CACHE_SECONDS,
+      hanya kalau cache default dipakai bersama semua proses)
+    - miss -> query Token + user seperti biasa
+    - token expire setelah API_TOKEN_TTL_HOURS sejak dibuat (login ulang = token baru)
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+        entry = local_token_cache.get(cache_key)
+        if entry is None:
+            shared = _shared_token_cache()
+            entry = shared.get(cache_key) if shared is not None else None
+            if entry is None:
+                try:
+                    token = Token.objects.select_related("user").get(key=key)
+                except Token.DoesNotExist:
+                    raise exceptions.AuthenticationFailed("Invalid token.")
+                entry = _entry_for(token)
+                _remember_entry(cache_key, entry, shared)
+            else:
+                local_token_cache.set(cache_key, entry, float(_setting("API_TOKEN_LOCAL_CACHE_SECONDS", 10)))
+
+        expires_at = token_expires_at(entry["created"])
+        if expires_at and expires_at <= timezone.now():
+            revoke_token(key)
+            raise exceptions.AuthenticationFailed("Token has expired.")
+
+        if not entry["user"]["is_active"]:
+            raise exceptions.AuthenticationFailed("User inactive or deleted.")
+
+        return _build(key, entry)
+
+
+# =========================================================
+# SIGNALS
+# =========================================================
+def _user_written(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.pk)
+
+
+def _token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+def connect_token_cache_signals():
+    from pos.models import CustomUser, PlatformUser, ShopStaffUser
+
+    # proxy model (admin) kirim signal dengan sender proxy-nya sendiri
+    for model in (CustomUser, PlatformUser, ShopStaffUser):
+        post_save.connect(_user_written, sender=model, dispatch_uid=f"token-cache-{model.__name__}-save")
+    post_delete.connect(_token_deleted, sender=Token, dispatch_uid="token-cache-token-delete")
@@ -0,0 +1,116 @@
+# pos/management/commands/benchmark_owner_chat.py
+
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from pos.api_owner_chat.help_responses import match_local_help
+from pos.api_owner_chat.intents import detect_intent
+
+
+# Pertanyaan nyata owner / kasir (Tetun, Indonesia, English), termasuk typo ringan.
+QUERY_CORPUS = (
+    "reseita ohin",
+    "vendas dine in ohin",
+    "vendas delivery semana ida ne'e",
+    "taxa delivery semana ida ne'e",
+    "diskuentu fulan ida ne'e",
+    "métodu pagamentu ne'ebé barak liu",
+    "cash vs transfer ohin",
+    "oras ne'ebé movimentu liu",
+    "margem fulan ida ne'e",
+    "despeza fulan ida ne'e",
+    "despeza aas liu fulan ida ne'e",
+    "lukru ohin",
+    "produtu sira ne'ebé fa'an barak liu fulan ida ne'e",
+    "stok ki'ik hela",
+    "stok hotu ona",
+    "stok menus husi 3",
+    "stok pizza",
+    "movement adjustment ohin",
+    "inventory movement ohin",
+    "kompara semana ida ne'e ho semana kotuk",
+    "tanba sa lukru tun",
+    "rekomendasaun promo",
+    "oinsá aumenta produtu",
+    "oinsá halo retur barang",
+    "oinsá imprime resibu",
+    "oinsá halo stok opname",
+    "penjualan hari ini",
+    "omzet bulan ini",
+    "berapa transaksi hari ini",
+    "rata rata transaksi minggu ini",
+    "pengeluaran terbesar bulan ini",
+    "laba kemarin",
+    "kenapa profit turun",
+    "produk terlaris 7 hari terakhir",
+    "stok menipis",
+    "produk habis",
+    "stok kurang dari 5",
+    "mutasi stok hari ini",
+    "ongkir bulan ini",
+    "jam paling ramai",
+    "metode pembayaran paling banyak",
+    "bandingkan bulan ini dengan bulan lalu",
+    "saran promo untuk produk lambat",
+    "pelanggan terbaik",
+    "cara tambah produk",
+    "cara cetak struk",
+    "gimana buka shift kasir",
+    "sales today",
+    "net sales this month",
+    "top products last 7 days",
+    "low stock",
+    "out of stock items",
+    "busiest hours yesterday",
+    "top payment method this month",
+    "profit margin this month",
+    "expense 2026-02-01 to 2026-02-10",
+    "compare this week vs last week",
+    "why profit down",
+    "how to print receipt",
+    "takeaway sales today",
+    "pick up orders today",
+    "member points",
+    "stock coca cola",
+    "halo",
+    "",
+)
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark owner-chat intent detection and local help matching over a real query corpus."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--show", action="store_true", help="Print the detected intent per query.")
+
+    def handle(self, *args, **options):
+        iterations = max(1, options["iterations"])
+        corpus = QUERY_CORPUS
+
+        if options["show"]:
+            for message in corpus:
+                res = detect_intent(message)
+                help_res = match_local_help(message)
+                help_key = help_res["topic_key"] if help_res else "-"
+                self.stdout.write(f"{message!r:<55} {res.intent:<22} help={help_key}")
+
+        intents = Counter(detect_intent(m).intent for m in corpus)
+        self.stdout.write(
+            f"{len(corpus)} queries, {iterations} iteration(s), "
+            f"{len(intents)} distinct intents ({intents['fallback']} fallback)"
+        )
+
+        for name, func in (("detect_intent", detect_intent), ("match_local_help", match_local_help)):
+            func(corpus[0])  # warm-up
+            started = time.perf_counter()
+            for _ in range(iterations):
+                for message in corpus:
+                    func(message)
+            elapsed = time.perf_counter() - started
+            calls = iterations * len(corpus)
+            self.stdout.write(
+                f"{name:<18} {elapsed / calls * 1_000_000:8.1f} us/query  {calls / elapsed:10.0f} queries/s"
+            )
@@ -0,0 +1,50 @@
+# pos/management/commands/benchmark_receipts.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pos.services.receipt_service import (
+    PDF_RENDERERS,
+    build_receipt,
+    receipt_order_queryset,
+    receipt_pdf_bytes,
+)
+
+
+class Command(BaseCommand):
+    help = "Compare receipt PDF throughput: xhtml2pdf template vs reportlab drawing vs cached reprint."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--order-id", type=int, help="Order to render (default: latest order).")
+        parser.add_argument("--iterations", type=int, default=50)
+
+    def handle(self, *args, **options):
+        iterations = max(1, options["iterations"])
+        qs = receipt_order_queryset()
+        order = qs.filter(pk=options["order_id"]).first() if options.get("order_id") else qs.first()
+        if order is None:
+            raise CommandError("No order to render.")
+
+        receipt = build_receipt(order)
+        self.stdout.write(f"Order #{order.pk}: {len(receipt['items'])} item(s), {iterations} iteration(s)")
+
+        results = []
+        for name, render in PDF_RENDERERS.items():
+            render(order, receipt)  # warm-up (font/template loading)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                size = len(render(order, receipt))
+            results.append((name, time.perf_counter() - started, size))
+
+        receipt_pdf_bytes(order)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            size = len(receipt_pdf_bytes(order))
+        results.append(("cached", time.perf_counter() - started, size))
+
+        for name, elapsed, size in results:
+            per_receipt = elapsed / iterations * 1000
+            self.stdout.write(
+                f"{name:<10} {per_receipt:8.2f} ms/receipt  {iterations / elapsed:9.1f} receipts/s  {size:>7} bytes"
+            )
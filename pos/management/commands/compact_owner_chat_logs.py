@@ -0,0 +1,23 @@
+# pos/management/commands/compact_owner_chat_logs.py
+
+from django.core.management.base import BaseCommand
+
+from pos.services.owner_chat_log_service import compact_owner_chat_logs, owner_chat_log_retention_days
+
+
+class Command(BaseCommand):
+    help = "Compact owner chat logs older than the retention window into daily intent counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help=f"Keep raw logs for this many days (default: OWNER_CHAT_LOG_RETENTION_DAYS={owner_chat_log_retention_days()}).",
+        )
+
+    def handle(self, *args, **options):
+        result = compact_owner_chat_logs(options.get("days"))
+        self.stdout.write(
+            f"Compacted {result['compacted']} log(s) older than {result['cutoff']:%Y-%m-%d} "
+            f"in {result['seconds']}s."
+        )
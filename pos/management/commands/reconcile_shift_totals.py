@@ -0,0 +1,59 @@
+# pos/management/commands/reconcile_shift_totals.py
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from pos.models_shift import Shift, ShiftStatus
+from pos.services.shift_service import backfill_shift_attribution, reconcile_shift
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify incrementally maintained shift totals against a full recompute "
+        "from orders, returns and expenses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shift", type=int, action="append", help="Shift id (repeatable).")
+        parser.add_argument("--shop", type=int, help="Only shifts of this shop.")
+        parser.add_argument("--days", type=int, default=1, help="Shifts closed in the last N days (default: 1).")
+        parser.add_argument("--open", action="store_true", help="Also check shifts that are still open.")
+        parser.add_argument("--fix", action="store_true", help="Overwrite drifted totals with the recomputed values.")
+        parser.add_argument(
+            "--backfill",
+            action="store_true",
+            help="First stamp orders, payments, returns and expenses without a shift that fall in the shift window.",
+        )
+
+    def handle(self, *args, **options):
+        qs = Shift.objects.order_by("opened_at", "id")
+        if options.get("shift"):
+            qs = qs.filter(pk__in=options["shift"])
+        else:
+            since = timezone.now() - timedelta(days=max(0, options["days"]))
+            statuses = [ShiftStatus.CLOSED, ShiftStatus.OPEN] if options["open"] else [ShiftStatus.CLOSED]
+            qs = qs.filter(status__in=statuses).exclude(closed_at__lt=since)
+        if options.get("shop"):
+            qs = qs.filter(shop_id=options["shop"])
+
+        checked = drifted = 0
+        for shift in qs.iterator():
+            checked += 1
+            if options["backfill"]:
+                stamped = backfill_shift_attribution(shift)
+                if any(stamped.values()):
+                    counts = ", ".join(f"{n} {name}" for name, n in stamped.items())
+                    self.stdout.write(f"Shift #{shift.pk}: stamped {counts}")
+
+            drift = reconcile_shift(shift, fix=options["fix"])
+            if not drift:
+                continue
+
+            drifted += 1
+            details = ", ".join(f"{field} {stored} -> {expected}" for field, (stored, expected) in drift.items())
+            self.stdout.write(self.style.WARNING(f"Shift #{shift.pk} (shop {shift.shop_id}): {details}"))
+
+        action = "fixed" if options["fix"] else "found"
+        self.stdout.write(f"Checked {checked} shift(s), {action} drift in {drifted}.")
@@ -0,0 +1,26 @@
+# pos/management/commands/resume_import_jobs.py
+
+from django.core.management.base import BaseCommand
+
+from pos.services.import_service import resumable_import_jobs, run_import_job
+
+
+class Command(BaseCommand):
+    help = "Resume import jobs left queued or importing (e.g. after a worker restart)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--job-id", type=int, help="Resume only this import job.")
+
+    def handle(self, *args, **options):
+        qs = resumable_import_jobs()
+        if options.get("job_id"):
+            qs = qs.filter(pk=options["job_id"])
+
+        job_ids = list(qs.values_list("id", flat=True))
+        if not job_ids:
+            self.stdout.write("No import jobs to resume.")
+            return
+
+        for job_id in job_ids:
+            job = run_import_job(job_id, resume=True)
+            self.stdout.write(f"Import job #{job_id}: {job.get_status_display() if job else 'missing'}")
@@ -0,0 +1,18 @@
+# pos/middleware.py
+
+from pos.tenant import TenantContext
+
+
+class TenantMiddleware:
+    """
+    Pasang request.tenant (shop, role, permissions) untuk semua view.
+    Nilainya di-resolve lazy saat pertama dipakai, setelah autentikasi
+    (session di sini, token di dalam view DRF).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.tenant = TenantContext(request)
+        return self.get_response(request)
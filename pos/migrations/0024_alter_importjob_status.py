@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0023_alter_stockmovement_movement_type_stocktransfer_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importjob',
+            name='status',
+            field=models.CharField(choices=[('uploaded', 'Uploaded'), ('validated', 'Validated'), ('queued', 'Queued'), ('importing', 'Importing'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], db_index=True, default='uploaded', max_length=20),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:53
+
+import django.db.models.deletion
+import pos.models_export
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0024_alter_importjob_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sales', 'Sales Export')], db_index=True, max_length=30)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='queued', max_length=20)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('file_name', models.CharField(blank=True, default='', max_length=255)),
+                ('file_path', models.CharField(blank=True, default='', max_length=500)),
+                ('content_type', models.CharField(blank=True, default='', max_length=100)),
+                ('file_size_bytes', models.BigIntegerField(default=0)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+                ('shop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to='pos.shop')),
+            ],
+            options={
+                'verbose_name': 'Export Job',
+                'verbose_name_plural': 'Export Jobs',
+                'ordering': ('-created_at', '-id'),
+                'indexes': [models.Index(fields=['shop', 'kind'], name='pos_exportj_shop_id_370e47_idx'), models.Index(fields=['shop', 'created_at'], name='pos_exportj_shop_id_14944a_idx')],
+            },
+            bases=(pos.models_export.CleanSaveMixin, models.Model),
+        ),
+    ]
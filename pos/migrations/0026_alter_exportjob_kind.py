@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0025_exportjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='kind',
+            field=models.CharField(choices=[('sales', 'Sales Export'), ('barcode_labels', 'Barcode Labels')], db_index=True, max_length=30),
+        ),
+    ]
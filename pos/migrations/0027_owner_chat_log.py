@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0026_alter_exportjob_kind'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnerChatIntentDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('source', models.CharField(max_length=20)),
+                ('intent', models.CharField(blank=True, default='', max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('shop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='owner_chat_intent_days', to='pos.shop')),
+            ],
+            options={
+                'verbose_name': 'Owner Chat Intent (daily)',
+                'verbose_name_plural': 'Owner Chat Intents (daily)',
+                'ordering': ('-date', 'shop_id', 'intent'),
+                'indexes': [models.Index(fields=['shop', 'date'], name='pos_ownerch_shop_id_30bf1e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('shop', 'date', 'source', 'intent'), name='unique_owner_chat_intent_per_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OwnerChatLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField()),
+                ('response', models.TextField()),
+                ('source', models.CharField(max_length=20)),
+                ('intent', models.CharField(blank=True, default='', max_length=50)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('shop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='owner_chat_logs', to='pos.shop')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='owner_chat_logs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Owner Chat Log',
+                'verbose_name_plural': 'Owner Chat Logs',
+                'ordering': ('-created_at', '-id'),
+                'indexes': [models.Index(fields=['shop', 'created_at'], name='pos_ownerch_shop_id_8438a6_idx'), models.Index(fields=['created_at'], name='pos_ownerch_created_654f1f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0027_owner_chat_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='shift',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='expenses', to='pos.shift'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='shift',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='pos.shift'),
+        ),
+        migrations.AddField(
+            model_name='productreturn',
+            name='shift',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='product_returns', to='pos.shift'),
+        ),
+        migrations.AddField(
+            model_name='salepayment',
+            name='shift',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sale_payments', to='pos.shift'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['shift', 'is_paid'], name='pos_order_shift_i_eb5ef5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salepayment',
+            index=models.Index(fields=['shift', 'payment_method'], name='pos_salepay_shift_i_8f1c16_idx'),
+        ),
+    ]
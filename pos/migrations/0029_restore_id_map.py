@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0028_shift_attribution'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestoreIdMap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(max_length=50)),
+                ('backup_id', models.BigIntegerField()),
+                ('target_id', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='restore_id_maps', to='pos.shop')),
+            ],
+            options={
+                'verbose_name': 'Restore Id Map',
+                'verbose_name_plural': 'Restore Id Maps',
+                'constraints': [models.UniqueConstraint(fields=('shop', 'section', 'backup_id'), name='uniq_restore_id_map_backup_id')],
+            },
+        ),
+    ]
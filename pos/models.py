@@ -7,8 +7,10 @@ from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractUser
 from rest_framework.authtoken.models import Token
-from .models_backup import BackupSetting, BackupHistory, RestoreHistory
+from .models_backup import BackupSetting, BackupHistory, RestoreHistory, RestoreIdMap
 from .models_import import ImportJob, ImportRowError
+from .models_export import ExportJob
+from .models_owner_chat import OwnerChatLog, OwnerChatIntentDaily
 from .models_shift import Shift, ShiftStatus
 
 
@@ -110,51 +112,53 @@ class CustomUser(CleanSaveMixin, AbstractUser):
             if not self.shop_id:
                 raise ValidationError({"shop": "Non-platform user must belong to a shop."})
 
+    # permission per role dihitung sekali saat import (frozenset, dipakai bersama semua user)
+    ROLE_FEATURE_PERMISSIONS = {
+        ROLE_OWNER: frozenset([
+            "pos.view_reports",
+            "pos.view_income",
+            "pos.manage_products",
+            "pos.manage_users",
+            "pos.manage_expenses",
+            "pos.create_orders",
+            "pos.refunds",
+            "pos.stock_adjust",
+            "pos.export_data",
+            "pos.manage_settings",
+            "pos.manage_suppliers",
+            "pos.manage_customers",
+            "pos.manage_purchases",
+            "pos.manage_payment_methods",
+            "pos.manage_bank_accounts",
+            "pos.manage_inventory_counts",
+            "pos.view_stock_movements",
+        ]),
+        ROLE_MANAGER: frozenset([
+            "pos.view_reports",
+            "pos.view_income",
+            "pos.manage_products",
+            "pos.manage_expenses",
+            "pos.create_orders",
+            "pos.refunds",
+            "pos.stock_adjust",
+            "pos.export_data",
+            "pos.manage_suppliers",
+            "pos.manage_customers",
+            "pos.manage_purchases",
+            "pos.manage_inventory_counts",
+            "pos.view_stock_movements",
+        ]),
+        ROLE_CASHIER: frozenset([
+            "pos.create_orders",
+            "pos.refunds",
+            "pos.manage_customers",
+            "pos.reprint_receipt",
+            "pos.shift_open_close",
+        ]),
+    }
+
     def get_feature_permissions(self):
-        ROLE_PERMISSIONS = {
-            self.ROLE_OWNER: [
-                "pos.view_reports",
-                "pos.view_income",
-                "pos.manage_products",
-                "pos.manage_users",
-                "pos.manage_expenses",
-                "pos.create_orders",
-                "pos.refunds",
-                "pos.stock_adjust",
-                "pos.export_data",
-                "pos.manage_settings",
-                "pos.manage_suppliers",
-                "pos.manage_customers",
-                "pos.manage_purchases",
-                "pos.manage_payment_methods",
-                "pos.manage_bank_accounts",
-                "pos.manage_inventory_counts",
-                "pos.view_stock_movements",
-            ],
-            self.ROLE_MANAGER: [
-                "pos.view_reports",
-                "pos.view_income",
-                "pos.manage_products",
-                "pos.manage_expenses",
-                "pos.create_orders",
-                "pos.refunds",
-                "pos.stock_adjust",
-                "pos.export_data",
-                "pos.manage_suppliers",
-                "pos.manage_customers",
-                "pos.manage_purchases",
-                "pos.manage_inventory_counts",
-                "pos.view_stock_movements",
-            ],
-            self.ROLE_CASHIER: [
-                "pos.create_orders",
-                "pos.refunds",
-                "pos.manage_customers",
-                "pos.reprint_receipt",
-                "pos.shift_open_close",
-            ],
-        }
-        return ROLE_PERMISSIONS.get(self.role, [])
+        return self.ROLE_FEATURE_PERMISSIONS.get(self.role, frozenset())
 
     def has_feature(self, feature_code: str) -> bool:
         return self.is_superuser or feature_code in self.get_feature_permissions()
@@ -1119,12 +1123,22 @@ class Order(CleanSaveMixin, models.Model):
         related_name="orders"
     )
 
+    # shift (laci kasir) yang OPEN saat transaksi dicatat
+    shift = models.ForeignKey(
+        "Shift",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="orders"
+    )
+
     class Meta:
         ordering = ("-created_at", "-id")
         indexes = [
             models.Index(fields=["shop", "created_at"]),
             models.Index(fields=["shop", "is_paid"]),
             models.Index(fields=["shop", "default_order_type"]),
+            models.Index(fields=["shift", "is_paid"]),
         ]
 
     def generate_invoice_number(self) -> str:
@@ -1261,6 +1275,15 @@ class Expense(CleanSaveMixin, models.Model):
     date = models.DateField()
     time = models.TimeField()
 
+    # shift (laci kasir) yang OPEN saat transaksi dicatat
+    shift = models.ForeignKey(
+        "Shift",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="expenses"
+    )
+
     class Meta:
         indexes = [
             models.Index(fields=["shop", "date"]),
@@ -1445,10 +1468,20 @@ class SalePayment(CleanSaveMixin, models.Model):
         related_name="created_sale_payments"
     )
 
+    # shift (laci kasir) yang OPEN saat transaksi dicatat
+    shift = models.ForeignKey(
+        "Shift",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="sale_payments"
+    )
+
     class Meta:
         ordering = ("paid_at", "id")
         indexes = [
             models.Index(fields=["order", "paid_at"]),
+            models.Index(fields=["shift", "payment_method"]),
         ]
 
     def clean(self):
@@ -1906,6 +1939,15 @@ class ProductReturn(CleanSaveMixin, models.Model):
         related_name="product_returns"
     )
 
+    # shift (laci kasir) yang OPEN saat transaksi dicatat
+    shift = models.ForeignKey(
+        "Shift",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="product_returns"
+    )
+
     class Meta:
         ordering = ("-returned_at", "-id")
         indexes = [
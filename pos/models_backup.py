@@ -465,4 +465,38 @@ class RestoreHistory(CleanSaveMixin, models.Model):
         self.save()
 
     def __str__(self):
-        return f"{self.shop.code} - {self.get_restore_mode_display()} - {self.started_at:%Y-%m-%d %H:%M}"
\ No newline at end of file
+        return f"{self.shop.code} - {self.get_restore_mode_display()} - {self.started_at:%Y-%m-%d %H:%M}"
+
+# ==========================================================
+# RESTORE ID MAP
+# ==========================================================
+class RestoreIdMap(models.Model):
+    """
+    Id backup -> id row hasil restore, hanya untuk row yang id-nya berubah
+    (pk bentrok dengan tenant lain / cocok lewat natural key).
+    Disimpan per shop supaya restore ulang (setelah gagal di tengah)
+    meng-update row yang sama, bukan insert lagi.
+    """
+
+    shop = models.ForeignKey(
+        "Shop",
+        on_delete=models.CASCADE,
+        related_name="restore_id_maps"
+    )
+    section = models.CharField(max_length=50)
+    backup_id = models.BigIntegerField()
+    target_id = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Restore Id Map"
+        verbose_name_plural = "Restore Id Maps"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["shop", "section", "backup_id"],
+                name="uniq_restore_id_map_backup_id",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.section}:{self.backup_id} -> {self.target_id}"
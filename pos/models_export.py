@@ -0,0 +1,125 @@
+# pos/models_export.py
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.utils import timezone
+
+
+# ==========================================================
+# BASE MIXIN
+# ==========================================================
+class CleanSaveMixin:
+    """
+    Production-safe save:
+    - run model validation before save
+    """
+    def save(self, *args, **kwargs):
+        self.full_clean()
+        return super().save(*args, **kwargs)
+
+
+# ==========================================================
+# EXPORT JOB
+# ==========================================================
+class ExportJob(CleanSaveMixin, models.Model):
+    """
+    File besar (export penjualan, label barcode) yang dibuat di background.
+    File hasil disimpan di EXPORT_ROOT dan diunduh lewat endpoint download.
+    """
+
+    class Kind(models.TextChoices):
+        SALES = "sales", "Sales Export"
+        BARCODE_LABELS = "barcode_labels", "Barcode Labels"
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    shop = models.ForeignKey(
+        "Shop",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="export_jobs"
+    )
+
+    kind = models.CharField(max_length=30, choices=Kind.choices, db_index=True)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.QUEUED,
+        db_index=True
+    )
+    params = models.JSONField(default=dict, blank=True)
+
+    file_name = models.CharField(max_length=255, blank=True, default="")
+    file_path = models.CharField(max_length=500, blank=True, default="")
+    content_type = models.CharField(max_length=100, blank=True, default="")
+    file_size_bytes = models.BigIntegerField(default=0)
+    row_count = models.PositiveIntegerField(default=0)
+
+    error_message = models.TextField(blank=True, default="")
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="export_jobs"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Export Job"
+        verbose_name_plural = "Export Jobs"
+        ordering = ("-created_at", "-id")
+        indexes = [
+            models.Index(fields=["shop", "kind"]),
+            models.Index(fields=["shop", "created_at"]),
+        ]
+
+    def clean(self):
+        self.file_name = (self.file_name or "").strip()
+        self.error_message = (self.error_message or "").strip()
+
+        if self.file_size_bytes < 0:
+            raise ValidationError({"file_size_bytes": "File size cannot be negative."})
+
+    @property
+    def status_label(self):
+        return self.get_status_display()
+
+    @property
+    def is_ready(self):
+        return self.status == self.Status.COMPLETED and bool(self.file_path)
+
+    def mark_running(self):
+        self.status = self.Status.RUNNING
+        self.started_at = timezone.now()
+        self.error_message = ""
+        self.save(update_fields=["status", "started_at", "error_message"])
+
+    def mark_completed(self, *, file_name: str, file_path: str, content_type: str, file_size_bytes=0, row_count=0):
+        self.status = self.Status.COMPLETED
+        self.file_name = file_name
+        self.file_path = file_path
+        self.content_type = content_type
+        self.file_size_bytes = int(file_size_bytes or 0)
+        self.row_count = int(row_count or 0)
+        self.completed_at = timezone.now()
+        self.save()
+
+    def mark_failed(self, error_message: str):
+        self.status = self.Status.FAILED
+        self.completed_at = timezone.now()
+        self.error_message = (error_message or "").strip()
+        self.save()
+
+    def __str__(self):
+        return f"Export #{self.id} - {self.get_kind_display()} - {self.get_status_display()}"
@@ -40,9 +40,11 @@ class ImportJob(CleanSaveMixin, models.Model):
     class Status(models.TextChoices):
         UPLOADED = "uploaded", "Uploaded"
         VALIDATED = "validated", "Validated"
+        QUEUED = "queued", "Queued"
         IMPORTING = "importing", "Importing"
         COMPLETED = "completed", "Completed"
         FAILED = "failed", "Failed"
+        CANCELLED = "cancelled", "Cancelled"
 
     shop = models.ForeignKey(
         "Shop",
@@ -138,29 +140,61 @@ class ImportJob(CleanSaveMixin, models.Model):
             self.metadata = metadata
         self.save()
 
-    def mark_importing(self):
-        self.status = self.Status.IMPORTING
-        self.error_message = ""
-        self.save(update_fields=["status", "error_message"])
-
-    def mark_completed(self, *, imported_rows=0, skipped_rows=0, note="", metadata=None):
-        self.status = self.Status.COMPLETED
-        self.imported_rows = int(imported_rows or 0)
-        self.skipped_rows = int(skipped_rows or 0)
-        self.completed_at = timezone.now()
-        self.note = (note or self.note or "").strip()
+    def mark_queued(self, *, metadata=None):
+        self.status = self.Status.QUEUED
+        self.completed_at = None
         self.error_message = ""
         if metadata is not None:
             self.metadata = metadata
-        self.save()
+        self.save(update_fields=["status", "completed_at", "error_message", "metadata"])
+
+    def _transition(self, *, from_statuses=None, **fields) -> bool:
+        """
+        Ganti status lewat UPDATE bersyarat supaya tidak menimpa status yang
+        di-set request lain di antaranya (mis. cancel_import). Import yang
+        sudah CANCELLED tidak pernah ditimpa. Return False kalau tidak berlaku;
+        instance di-refresh dari DB.
+        """
+        qs = type(self).objects.filter(pk=self.pk).exclude(status=self.Status.CANCELLED)
+        if from_statuses:
+            qs = qs.filter(status__in=from_statuses)
+
+        if not qs.update(**fields):
+            self.refresh_from_db()
+            return False
+
+        for name, value in fields.items():
+            setattr(self, name, value)
+        return True
+
+    def mark_importing(self):
+        return self._transition(status=self.Status.IMPORTING, error_message="")
+
+    def mark_completed(self, *, imported_rows=0, skipped_rows=0, note="", metadata=None):
+        return self._transition(
+            from_statuses=[self.Status.IMPORTING],
+            status=self.Status.COMPLETED,
+            imported_rows=int(imported_rows or 0),
+            skipped_rows=int(skipped_rows or 0),
+            completed_at=timezone.now(),
+            note=(note or self.note or "").strip(),
+            error_message="",
+            metadata=self.metadata if metadata is None else metadata,
+        )
 
     def mark_failed(self, error_message: str, *, note=""):
-        self.status = self.Status.FAILED
-        self.completed_at = timezone.now()
-        self.error_message = (error_message or "").strip()
+        fields = {
+            "status": self.Status.FAILED,
+            "completed_at": timezone.now(),
+            "error_message": (error_message or "").strip(),
+        }
         if note:
-            self.note = (note or "").strip()
-        self.save()
+            fields["note"] = (note or "").strip()
+        return self._transition(**fields)
+
+    @property
+    def is_running(self):
+        return self.status in {self.Status.QUEUED, self.Status.IMPORTING}
 
     def __str__(self):
         return f"{self.shop.code} - Import #{self.id} - {self.get_status_display()}"
@@ -0,0 +1,82 @@
+# pos/models_owner_chat.py
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+# ==========================================================
+# OWNER CHAT LOG
+# ==========================================================
+class OwnerChatLog(models.Model):
+    """
+    Satu pertanyaan + jawaban owner chat / help chat.
+    Ditulis lewat buffer (bulk insert), lalu dipadatkan ke OwnerChatIntentDaily
+    setelah OWNER_CHAT_LOG_RETENTION_DAYS.
+    """
+
+    shop = models.ForeignKey(
+        "Shop",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="owner_chat_logs"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="owner_chat_logs"
+    )
+
+    message = models.TextField()
+    response = models.TextField()
+    source = models.CharField(max_length=20)
+    intent = models.CharField(max_length=50, blank=True, default="")
+
+    # diisi saat pesan masuk, bukan saat buffer di-flush
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Owner Chat Log"
+        verbose_name_plural = "Owner Chat Logs"
+        ordering = ("-created_at", "-id")
+        indexes = [
+            models.Index(fields=["shop", "created_at"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} | {self.source}"
+
+
+class OwnerChatIntentDaily(models.Model):
+    """Jumlah pertanyaan per shop / hari / intent dari log yang sudah dipadatkan."""
+
+    shop = models.ForeignKey(
+        "Shop",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="owner_chat_intent_days"
+    )
+    date = models.DateField()
+    source = models.CharField(max_length=20)
+    intent = models.CharField(max_length=50, blank=True, default="")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Owner Chat Intent (daily)"
+        verbose_name_plural = "Owner Chat Intents (daily)"
+        ordering = ("-date", "shop_id", "intent")
+        indexes = [
+            models.Index(fields=["shop", "date"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["shop", "date", "source", "intent"],
+                name="unique_owner_chat_intent_per_day"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.shop_id} | {self.date} | {self.intent or self.source}: {self.count}"
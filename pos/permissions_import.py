@@ -66,7 +66,7 @@ class ImportJobPermission(BasePermission):
     Upload/list/detail/validate:
     owner, manager, platform admin
 
-    confirm import:
+    confirm / cancel import:
     owner, platform admin
     """
     message = "You do not have permission to access import jobs."
@@ -81,7 +81,7 @@ class ImportJobPermission(BasePermission):
 
         action_name = getattr(view, "action_name", "")
 
-        if action_name == "confirm":
+        if action_name in {"confirm", "cancel"}:
             return _is_tenant_owner(user)
 
         return bool(_is_tenant_owner(user) or _is_tenant_manager(user))
@@ -97,7 +97,7 @@ class ImportJobPermission(BasePermission):
 
         action_name = getattr(view, "action_name", "")
 
-        if action_name == "confirm":
+        if action_name in {"confirm", "cancel"}:
             return _is_tenant_owner(user)
 
         return bool(_is_tenant_owner(user) or _is_tenant_manager(user))
\ No newline at end of file
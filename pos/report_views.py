@@ -1,17 +1,113 @@
-import io
 import json
-import openpyxl
 
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
 from django.shortcuts import render, get_object_or_404
-from django.template.loader import render_to_string, get_template
 from django.db.models import Sum, F
 from django.db.models.functions import TruncMonth, TruncDate
-from django.utils import timezone
-
-from xhtml2pdf import pisa
+from django.utils.http import urlencode
 
+from .decorators import role_required
 from .models import Order, OrderItem, Expense, Shop
+from .services.export_service import (
+    CSV_CONTENT_TYPE,
+    PDF_CONTENT_TYPE,
+    XLSX_CONTENT_TYPE,
+    iter_csv,
+    queue_export,
+    xlsx_temp_file,
+)
+from .services.receipt_service import receipt_order_queryset, receipt_pdf_bytes
+from .services.sales_export_service import (
+    iter_sales_export_rows,
+    parse_sales_export_params,
+    sales_export_queryset,
+    sales_export_sync_max_rows,
+)
+from .services.sales_report_service import (
+    SALES_REPORT_PAGE_SIZE,
+    iter_sales_report_rows,
+    period_label,
+    sales_report_pdf_temp_file,
+    sales_report_queryset,
+    sales_report_row,
+    sales_report_totals,
+    sales_report_values,
+)
+from .tenant import get_request_tenant
+from .views_export import export_job_payload
+
+
+def _export_shop(request):
+    """
+    Tenant user: selalu shop miliknya.
+    Superuser: ?shop_id= opsional (kosong = semua shop).
+    """
+    user = request.user
+    if user.is_superuser:
+        shop_id = (request.GET.get("shop_id") or "").strip()
+        if not shop_id:
+            return None
+        try:
+            return Shop.objects.get(pk=int(shop_id))
+        except (Shop.DoesNotExist, TypeError, ValueError):
+            raise ValueError("Invalid shop_id.")
+
+    shop = get_request_tenant(request).shop
+    if not shop:
+        raise ValueError("User tidak memiliki shop.")
+    return shop
+
+
+def _sales_export_response(request, layout_name: str):
+    """
+    Export order lines tanpa membangun Workbook di memory:
+    - ?file_format=csv  -> StreamingHttpResponse
+    - ?file_format=xlsx -> workbook write-only (default)
+    - ?start=&end= / ?month= untuk range, ?background=1 atau range besar
+      (> SALES_EXPORT_SYNC_MAX_ROWS) -> ExportJob di background (202)
+    """
+    try:
+        shop = _export_shop(request)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+
+    file_format = (request.GET.get("file_format") or "xlsx").strip().lower()
+    if file_format not in {"csv", "xlsx"}:
+        return HttpResponse("file_format must be csv or xlsx.", status=400)
+
+    params = parse_sales_export_params(request.GET)
+    qs = sales_export_queryset(shop_id=shop.id if shop else None, **params)
+
+    background = (request.GET.get("background") or "").strip().lower() in {"1", "true", "yes"}
+    max_rows = sales_export_sync_max_rows()
+    if not background and max_rows and qs.count() > max_rows:
+        background = True
+
+    if background:
+        export_job = queue_export(
+            kind="sales",
+            shop=shop,
+            params={**params, "layout": layout_name, "file_format": file_format},
+            requested_by=request.user,
+        )
+        return JsonResponse(export_job_payload(request, export_job), status=202)
+
+    rows = iter_sales_export_rows(layout_name, qs)
+    filename = f"sales_report.{file_format}"
+
+    if file_format == "csv":
+        response = StreamingHttpResponse(iter_csv(rows), content_type=CSV_CONTENT_TYPE)
+        response["Content-Disposition"] = f"attachment; filename={filename}"
+        return response
+
+    return FileResponse(
+        xlsx_temp_file(rows, sheet_title="Sales Report"),
+        as_attachment=True,
+        filename=filename,
+        content_type=XLSX_CONTENT_TYPE,
+    )
 
 
 def expense_chart_view(request):
@@ -71,167 +167,99 @@ def sales_chart_view(request):
     })
 
 
-def sales_report_view(request):
-    month = request.GET.get("month")
-    rows = []
-
-    orders = Order.objects.prefetch_related("items__product", "items__weight_unit", "customer").order_by("-created_at")
-
-    if month:
-        try:
-            year, month_number = map(int, month.split("-"))
-            orders = orders.filter(created_at__year=year, created_at__month=month_number)
-        except ValueError:
-            pass
+def sales_report_context(request, *, paginate: bool = True) -> dict:
+    """
+    Data sales report (paid order lines), di-scope per shop:
+    - ?month=YYYY-MM atau ?start=&end=
+    - paginate=True -> ?page= (SALES_REPORT_PAGE_SIZE baris), paginate=False -> generator semua baris
+    - totals dihitung di DB (satu aggregate)
+    Raise ValueError kalau shop tidak valid.
+    """
+    shop = _export_shop(request)
+    params = parse_sales_export_params(request.GET)
+    qs = sales_report_queryset(shop_id=shop.id if shop else None, **params)
+    totals = sales_report_totals(qs)
+
+    filters = {key: request.GET[key] for key in ("month", "start", "end", "shop_id") if request.GET.get(key)}
+    context = {
+        "totals": totals,
+        "period": period_label(**params),
+        "filter_query": urlencode(filters),
+    }
+
+    if not paginate:
+        context["rows"] = iter_sales_report_rows(qs)
+        return context
+
+    paginator = Paginator(sales_report_values(qs), SALES_REPORT_PAGE_SIZE)
+    paginator.count = totals["line_count"]  # sudah dihitung di aggregate, tidak perlu COUNT lagi
+    page_obj = paginator.get_page(request.GET.get("page"))
+    context.update({
+        "rows": [sales_report_row(record) for record in page_obj.object_list],
+        "page_obj": page_obj,
+        "paginator": paginator,
+    })
+    return context
 
-    for order in orders:
-        for item in order.items.all():
-            rows.append({
-                "product_name": item.product.name if item.product else "-",
-                "invoice_id": f"INV{order.id:015d}",
-                "qty": item.quantity,
-                "weight": item.weight_unit.name if item.weight_unit else "-",
-                "total_price": (item.quantity or 0) * (item.price or 0),
-                "order_date": timezone.localtime(order.created_at).strftime("%d %B, %Y"),
-            })
 
-    return render(request, "pos/sales_report.html", {"rows": rows})
+@role_required(["owner", "manager"])
+def sales_report_view(request):
+    try:
+        context = sales_report_context(request)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+    return render(request, "pos/sales_report.html", context)
 
 
+@role_required(["owner", "manager"])
 def sales_export_view(request):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Sales Report"
-
-    ws.append([
-        "Transaction ID", "Date", "Customer", "Product",
-        "Qty", "Price", "Subtotal", "Discount", "Tax", "Total"
-    ])
-
-    orders = Order.objects.prefetch_related("items__product", "customer").order_by("-created_at")
-
-    for order in orders:
-        for item in order.items.all():
-            ws.append([
-                f"INV{order.id:015d}",
-                timezone.localtime(order.created_at).strftime("%Y-%m-%d %H:%M"),
-                order.customer.name if order.customer else "-",
-                item.product.name if item.product else "-",
-                item.quantity,
-                item.price,
-                (item.quantity or 0) * (item.price or 0),
-                order.discount,
-                order.tax,
-                order.total
-            ])
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = "attachment; filename=sales_report.xlsx"
-    wb.save(response)
-    return response
+    return _sales_export_response(request, "transactions")
 
 
+@login_required
 def order_pdf_view(request, order_id):
-    order = get_object_or_404(
-        Order.objects.prefetch_related("items__product", "items__weight_unit").select_related("served_by", "customer"),
-        id=order_id
-    )
-    shop = Shop.objects.first()
-
-    # bikin receipt_items biar cocok dengan template receipt yang kamu pakai di views.py
-    receipt_items = []
-    for item in order.items.all():
-        qty = item.quantity or 0
-        unit_price = item.price or 0
-        receipt_items.append({
-            "name": item.product.name if item.product else "-",
-            "qty": qty,
-            "unit_price": unit_price,
-            "line_total": qty * unit_price,
-            "order_type": getattr(item, "order_type", ""),
-            "order_type_icon": "",
-        })
-
-    template = get_template("pos/order_receipt.html")
-    html = template.render({"order": order, "shop": shop, "receipt_items": receipt_items})
+    qs = receipt_order_queryset()
+    if request.user.is_superuser:
+        order = get_object_or_404(qs, id=order_id)
+    else:
+        order = get_object_or_404(qs, id=order_id, shop_id=getattr(request.user, "shop_id", None))
 
-    result = io.BytesIO()
-    pdf = pisa.pisaDocument(io.BytesIO(html.encode("UTF-8")), result)
-
-    if not pdf.err:
-        return HttpResponse(result.getvalue(), content_type="application/pdf")
-    return HttpResponse("PDF generation error", status=500)
+    try:
+        pdf_bytes = receipt_pdf_bytes(order, renderer=request.GET.get("engine"))
+    except ValueError:
+        return HttpResponse("PDF generation error", status=500)
+    return HttpResponse(pdf_bytes, content_type=PDF_CONTENT_TYPE)
 
 
+@role_required(["owner", "manager"])
 def sales_report_pdf_view(request):
-    month = request.GET.get("month")
-    orders = Order.objects.prefetch_related("items__product", "customer").order_by("-created_at")
-
-    if month:
-        year, m = map(int, month.split("-"))
-        orders = orders.filter(created_at__year=year, created_at__month=m)
-
-    html = render_to_string("pos/sales_report_pdf.html", {"orders": orders})
-    result = io.BytesIO()
-    pisa.CreatePDF(io.BytesIO(html.encode("UTF-8")), dest=result)
-    return HttpResponse(result.getvalue(), content_type="application/pdf")
+    try:
+        shop = _export_shop(request)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+
+    params = parse_sales_export_params(request.GET)
+    qs = sales_report_queryset(shop_id=shop.id if shop else None, **params)
+
+    return FileResponse(
+        sales_report_pdf_temp_file(qs, sales_report_totals(qs), period=period_label(**params)),
+        filename="sales_report.pdf",
+        content_type=PDF_CONTENT_TYPE,
+    )
 
 
+@role_required(["owner", "manager"])
 def sales_report_excel_view(request):
-    month = request.GET.get("month")
-    orders = Order.objects.prefetch_related("items__product", "items__weight_unit", "customer").order_by("-created_at")
-
-    if month:
-        year, m = map(int, month.split("-"))
-        orders = orders.filter(created_at__year=year, created_at__month=m)
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Sales Report"
-    ws.append(["Product Name", "Invoice ID", "Qty", "Weight", "Total Price", "Order Date"])
-
-    for order in orders:
-        for item in order.items.all():
-            ws.append([
-                item.product.name if item.product else "-",
-                f"INV{order.id:015d}",
-                item.quantity,
-                item.weight_unit.name if item.weight_unit else "",
-                (item.quantity or 0) * (item.price or 0),
-                timezone.localtime(order.created_at).strftime("%Y-%m-%d %H:%M"),
-            ])
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = "attachment; filename=sales_report.xlsx"
-    wb.save(response)
-    return response
+    return _sales_export_response(request, "items")
 
 
+@role_required(["owner", "manager"])
 def sales_report_print_view(request):
-    month = request.GET.get("month")
-    orders = Order.objects.prefetch_related("items__product", "items__weight_unit").order_by("-created_at")
-
-    if month:
-        year, m = map(int, month.split("-"))
-        orders = orders.filter(created_at__year=year, created_at__month=m)
-
-    rows = []
-    for order in orders:
-        for item in order.items.all():
-            rows.append({
-                "product_name": item.product.name if item.product else "-",
-                "invoice_id": f"INV{order.id:015d}",
-                "qty": item.quantity,
-                "weight": item.weight_unit.name if item.weight_unit else "",
-                "total_price": (item.quantity or 0) * (item.price or 0),
-                "order_date": timezone.localtime(order.created_at).date(),
-            })
-
-    return render(request, "pos/sales_report_print.html", {"rows": rows})
+    try:
+        context = sales_report_context(request, paginate=False)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+    return render(request, "pos/sales_report_print.html", context)
 
 
 # --- OPTIONAL dashboards (kalau kamu memang mau tetap pakai dari report_urls.py) ---
@@ -14,6 +14,14 @@ from .models import (
     Warehouse, WarehouseStock, sync_product_total_stock,
     StockTransfer, StockTransferItem,
 )
+from .services.shift_service import (
+    expense_datetime,
+    record_expense,
+    record_order_sale,
+    record_product_return,
+    resolve_open_shift,
+)
+from .tenant import get_request_tenant
 
 User = get_user_model()
 
@@ -51,8 +59,11 @@ def _request_user(context):
 
 
 def _request_shop(context):
-    user = _request_user(context)
-    return getattr(user, "shop", None)
+    # request.tenant: shop di-resolve sekali per request (bukan per serializer / field)
+    request = context.get("request")
+    if request is None:
+        return None
+    return get_request_tenant(request).shop
 
 
 def require_authenticated_user(context):
@@ -1316,8 +1327,9 @@ class OrderSerializer(serializers.ModelSerializer):
             "items",
             "payments",
             "payment_records",
+            "shift",
         ]
-        read_only_fields = ["id", "created_at", "invoice_number", "subtotal", "total"]
+        read_only_fields = ["id", "created_at", "invoice_number", "subtotal", "total", "shift"]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -1566,6 +1578,9 @@ class OrderSerializer(serializers.ModelSerializer):
         if model_has_field(Order, "served_by") and "served_by" not in validated_data:
             validated_data["served_by"] = user
 
+        # stamp laci kasir yang OPEN -> laporan shift lewat index, bukan window waktu
+        validated_data["shift"] = resolve_open_shift(shop.id, user)
+
         order = Order.objects.create(**validated_data)
 
         for item_data in items_data:
@@ -1627,6 +1642,7 @@ class OrderSerializer(serializers.ModelSerializer):
 
                 payment_obj = SalePayment.objects.create(
                     order=order,
+                    shift_id=order.shift_id,
                     payment_method=payment_method,
                     bank_account=bank_account,
                     amount=payment_data["amount"],
@@ -1649,6 +1665,7 @@ class OrderSerializer(serializers.ModelSerializer):
                     "payments": f"Total pembayaran ({payment_total}) tidak sama dengan total order ({order.total})."
                 })
 
+        record_order_sale(order)
         return order
 
 
@@ -1677,14 +1694,27 @@ class ExpenseSerializer(serializers.ModelSerializer):
         attrs["note"] = note
         return attrs
 
+    @transaction.atomic
     def create(self, validated_data):
         shop = require_tenant_shop(self.context)
+        user = require_authenticated_user(self.context)
         validated_data = inject_shop_if_supported(Expense, validated_data, shop)
-        return super().create(validated_data)
+        validated_data["shift"] = resolve_open_shift(
+            shop.id,
+            user,
+            at=expense_datetime(validated_data["date"], validated_data.get("time")),
+        )
+        expense = super().create(validated_data)
+        record_expense(expense)
+        return expense
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ensure_instance_belongs_to_shop(instance, self.context)
-        return super().update(instance, validated_data)
+        record_expense(instance, sign=-1)
+        expense = super().update(instance, validated_data)
+        record_expense(expense)
+        return expense
 
 
 class BannerSerializer(serializers.ModelSerializer):
@@ -2372,6 +2402,8 @@ class ProductReturnSerializer(serializers.ModelSerializer):
         if model_has_field(ProductReturn, "returned_by"):
             validated_data["returned_by"] = user
 
+        validated_data["shift"] = resolve_open_shift(shop.id, user)
+
         ret = ProductReturn.objects.create(**validated_data)
 
         for it in items:
@@ -2414,6 +2446,7 @@ class ProductReturnSerializer(serializers.ModelSerializer):
                     created_by=user,
                 )
 
+        record_product_return(ret)
         return ret
 
 # ==========================================================
@@ -499,9 +499,10 @@ class RestoreRequestSerializer(serializers.Serializer):
     )
 
     confirm_overwrite = serializers.BooleanField(default=False)
+    dry_run = serializers.BooleanField(default=False)
 
     def validate(self, attrs):
-        if not attrs.get("confirm_overwrite"):
+        if not attrs.get("dry_run") and not attrs.get("confirm_overwrite"):
             raise serializers.ValidationError({
                 "confirm_overwrite": "You must confirm overwrite before restore."
             })
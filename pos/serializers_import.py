@@ -3,6 +3,7 @@
 from rest_framework import serializers
 
 from .models_import import ImportJob, ImportRowError
+from .services.import_service import IMPORT_FILE_FORMATS, TEMPLATE_SHEETS, import_file_format
 
 
 def _human_file_size(num_bytes: int) -> str:
@@ -140,11 +141,17 @@ class ImportJobDetailSerializer(serializers.ModelSerializer):
 
 class ImportUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
+    # target sheet for single-sheet files (CSV / NDJSON)
+    sheet_name = serializers.ChoiceField(
+        choices=list(TEMPLATE_SHEETS.keys()),
+        required=False,
+        allow_blank=True,
+    )
 
     def validate_file(self, value):
-        name = (getattr(value, "name", "") or "").lower()
-        if not name.endswith(".xlsx"):
-            raise serializers.ValidationError("Only .xlsx files are allowed.")
+        if not import_file_format(getattr(value, "name", "")):
+            allowed = ", ".join(sorted(IMPORT_FILE_FORMATS))
+            raise serializers.ValidationError(f"Only {allowed} files are allowed.")
         return value
 
 
@@ -172,6 +179,7 @@ class ImportTemplateInfoSerializer(serializers.Serializer):
     filename = serializers.CharField()
     format = serializers.CharField()
     sheets = serializers.ListField(child=serializers.CharField())
+    accepted_formats = serializers.ListField(child=serializers.CharField())
     description = serializers.CharField()
 
 
@@ -1,4 +1,6 @@
+import os
 import json
+import shutil
 import hashlib
 import tempfile
 import zipfile
@@ -111,6 +113,258 @@ def compute_sha256(file_path: Path) -> str:
     return sha256.hexdigest()
 
 
+# =========================================================
+# CONTENT-ADDRESSED MEDIA STORE
+# =========================================================
+MEDIA_STORE_DIRNAME = "_media_store"
+MEDIA_STORE_INDEX_NAME = "index.json"
+
+# blob yang baru dipakai/dibuat tidak boleh dihapus GC
+# (mis. backup lain sedang berjalan dan belum mark_success)
+MEDIA_STORE_GC_GRACE_SECONDS = 60 * 60
+
+
+def media_store_dir(shop: Shop) -> Path:
+    path = shop_backup_dir(shop) / MEDIA_STORE_DIRNAME
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def media_blob_path(shop: Shop, sha256: str) -> Path:
+    """
+    Lokasi blob: <shop_backup_dir>/_media_store/ab/abcdef...
+    """
+    sha256 = (sha256 or "").strip().lower()
+    return media_store_dir(shop) / sha256[:2] / sha256
+
+
+def load_media_store_index(shop: Shop) -> dict:
+    """
+    Index cache agar media yang tidak berubah tidak perlu di-hash ulang:
+    - local:  abs_path -> {size, mtime_ns, sha256}
+    - remote: url -> sha256
+    """
+    index_path = media_store_dir(shop) / MEDIA_STORE_INDEX_NAME
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+
+    if not isinstance(data, dict):
+        data = {}
+
+    data.setdefault("local", {})
+    data.setdefault("remote", {})
+    return data
+
+
+def save_media_store_index(shop: Shop, index: dict):
+    store_dir = media_store_dir(shop)
+    index_path = store_dir / MEDIA_STORE_INDEX_NAME
+
+    fd, tmp_name = tempfile.mkstemp(dir=store_dir, prefix=".index-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp_name, index_path)
+    except Exception:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _touch_blob(blob_path: Path):
+    try:
+        os.utime(blob_path, None)
+    except OSError:
+        pass
+
+
+def _publish_blob(blob_path: Path, write_tmp):
+    """
+    Tulis blob via temp file lalu os.replace supaya blob
+    tidak pernah terlihat setengah jadi.
+    """
+    blob_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=blob_path.parent, prefix=".blob-")
+    os.close(fd)
+    try:
+        write_tmp(Path(tmp_name))
+        os.replace(tmp_name, blob_path)
+    except Exception:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def store_local_media_blob(shop: Shop, abs_path: Path, index: dict) -> tuple[str, bool]:
+    """
+    Return (sha256, stored_new).
+    File yang size + mtime-nya sama dengan index tidak dibaca ulang.
+    """
+    stat = abs_path.stat()
+    abs_key = str(abs_path.resolve())
+    cached = index["local"].get(abs_key) or {}
+
+    sha256 = cached.get("sha256") or ""
+    if cached.get("size") != stat.st_size or cached.get("mtime_ns") != stat.st_mtime_ns:
+        sha256 = compute_sha256(abs_path)
+        index["local"][abs_key] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+        }
+
+    blob_path = media_blob_path(shop, sha256)
+    if blob_path.exists():
+        _touch_blob(blob_path)
+        return sha256, False
+
+    _publish_blob(blob_path, lambda tmp: shutil.copyfile(abs_path, tmp))
+    return sha256, True
+
+
+def store_bytes_media_blob(shop: Shop, content: bytes) -> tuple[str, bool]:
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    blob_path = media_blob_path(shop, sha256)
+    if blob_path.exists():
+        _touch_blob(blob_path)
+        return sha256, False
+
+    _publish_blob(blob_path, lambda tmp: tmp.write_bytes(content))
+    return sha256, True
+
+
+def store_media_blobs(shop: Shop, media_result: dict, index: dict) -> dict:
+    """
+    Pindahkan semua file hasil collect_media_files ke media store.
+    Setiap item mendapat key "sha256"; bytes remote dibuang dari memory.
+    File yang gagal disimpan dipindah ke skipped.
+    """
+    stored_files = []
+    skipped = list(media_result.get("skipped", []) or [])
+    new_blob_count = 0
+    new_blob_bytes = 0
+
+    for item in media_result.get("files", []) or []:
+        try:
+            if item.get("sha256"):
+                # remote yang sudah ada di index, tidak perlu download ulang
+                _touch_blob(media_blob_path(shop, item["sha256"]))
+                stored_new = False
+            elif item.get("source_type") == "local" and item.get("abs_path"):
+                item["sha256"], stored_new = store_local_media_blob(shop, item["abs_path"], index)
+            elif item.get("source_type") == "remote":
+                item["sha256"], stored_new = store_bytes_media_blob(shop, item.pop("content", b"") or b"")
+                if item.get("remote_url"):
+                    index["remote"][item["remote_url"]] = item["sha256"]
+            else:
+                continue
+        except Exception as e:
+            skipped.append({
+                "model": item.get("model"),
+                "object_id": item.get("object_id"),
+                "field": item.get("field"),
+                "file_name": item.get("file_name", ""),
+                "reason": f"media store failed: {str(e)}",
+            })
+            continue
+
+        if stored_new:
+            new_blob_count += 1
+            new_blob_bytes += int(item.get("size_bytes") or 0)
+
+        stored_files.append(item)
+
+    return {
+        "files": stored_files,
+        "skipped": skipped,
+        "new_blob_count": new_blob_count,
+        "new_blob_bytes": new_blob_bytes,
+    }
+
+
+def referenced_media_hashes(shop: Shop) -> set:
+    """
+    Semua sha256 yang masih dipakai backup aktif milik shop.
+    """
+    referenced = set()
+    qs = BackupHistory.objects.filter(
+        shop=shop,
+        deleted_at__isnull=True,
+        status=BackupHistory.Status.SUCCESS,
+    ).values_list("metadata", flat=True)
+
+    for metadata in qs.iterator():
+        media_export = (metadata or {}).get("media_export") or {}
+        for item in media_export.get("exported_files") or []:
+            sha256 = (item or {}).get("sha256")
+            if sha256:
+                referenced.add(sha256)
+
+    return referenced
+
+
+def collect_media_store_garbage(shop: Shop) -> dict:
+    """
+    Hapus blob yang tidak lagi direferensikan oleh backup aktif.
+    Blob yang baru dibuat/dipakai (lihat MEDIA_STORE_GC_GRACE_SECONDS)
+    dilewati agar backup yang sedang berjalan tetap aman.
+    """
+    store_dir = media_store_dir(shop)
+    referenced = referenced_media_hashes(shop)
+    cutoff = timezone.now().timestamp() - MEDIA_STORE_GC_GRACE_SECONDS
+
+    deleted_count = 0
+    deleted_bytes = 0
+    deleted_hashes = set()
+
+    for prefix_dir in store_dir.iterdir():
+        if not prefix_dir.is_dir():
+            continue
+
+        for blob_path in prefix_dir.iterdir():
+            sha256 = blob_path.name
+            if sha256.startswith(".") or sha256 in referenced:
+                continue
+
+            try:
+                stat = blob_path.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                blob_path.unlink()
+            except OSError:
+                continue
+
+            deleted_count += 1
+            deleted_bytes += stat.st_size
+            deleted_hashes.add(sha256)
+
+        try:
+            prefix_dir.rmdir()  # hanya berhasil kalau folder sudah kosong
+        except OSError:
+            pass
+
+    if deleted_hashes:
+        index = load_media_store_index(shop)
+        index["local"] = {
+            key: value
+            for key, value in index["local"].items()
+            if value.get("sha256") not in deleted_hashes
+        }
+        index["remote"] = {
+            key: value
+            for key, value in index["remote"].items()
+            if value not in deleted_hashes
+        }
+        save_media_store_index(shop, index)
+
+    return {
+        "deleted_count": deleted_count,
+        "deleted_bytes": deleted_bytes,
+    }
+
+
 # =========================================================
 # JSON / SERIALIZATION HELPERS
 # =========================================================
@@ -231,7 +485,7 @@ def _download_remote_file_bytes(url: str, timeout: int = 20):
     return content, content_type
 
 
-def collect_media_files(shop: Shop, setting: BackupSetting):
+def collect_media_files(shop: Shop, setting: BackupSetting, media_index: dict | None = None):
     """
     Kumpulkan file media yang terkait dengan shop.
 
@@ -239,6 +493,9 @@ def collect_media_files(shop: Shop, setting: BackupSetting):
     1. Local filesystem storage -> ambil dari file_attr.path
     2. Remote storage (mis. Cloudinary) -> ambil dari file_attr.url lalu download bytes
 
+    Jika media_index diberikan, remote url yang blob-nya sudah ada
+    di media store tidak di-download ulang.
+
     Tidak melempar exception untuk file rusak/hilang; cukup skip dan catat.
     """
     collected = []
@@ -333,6 +590,23 @@ def collect_media_files(shop: Shop, setting: BackupSetting):
                         if zip_path in seen_zip_paths:
                             continue
 
+                        cached_sha256 = (media_index or {}).get("remote", {}).get(remote_url)
+                        if cached_sha256 and media_blob_path(shop, cached_sha256).exists():
+                            seen_zip_paths.add(zip_path)
+
+                            collected.append({
+                                "source_type": "remote",
+                                "sha256": cached_sha256,
+                                "remote_url": remote_url,
+                                "zip_path": zip_path,
+                                "model": model_label,
+                                "object_id": object_id,
+                                "field": field_name,
+                                "file_name": remote_name,
+                                "size_bytes": media_blob_path(shop, cached_sha256).stat().st_size,
+                            })
+                            continue
+
                         try:
                             content, content_type = _download_remote_file_bytes(remote_url)
                             size_bytes = len(content)
@@ -390,15 +664,21 @@ def build_media_export_summary(media_result: dict) -> dict:
     skipped = media_result.get("skipped", []) or []
 
     total_bytes = sum(int(item.get("size_bytes") or 0) for item in files)
+    new_blob_bytes = int(media_result.get("new_blob_bytes") or 0)
 
     return {
+        "storage": "content_addressed",
         "exported_count": len(files),
         "skipped_count": len(skipped),
         "total_size_bytes": total_bytes,
         "total_size_label": format_file_size(total_bytes),
+        "new_blob_count": int(media_result.get("new_blob_count") or 0),
+        "new_blob_bytes": new_blob_bytes,
+        "new_blob_size_label": format_file_size(new_blob_bytes),
         "exported_files": [
             {
                 "zip_path": item["zip_path"],
+                "sha256": item.get("sha256", ""),
                 "model": item["model"],
                 "object_id": item["object_id"],
                 "field": item["field"],
@@ -434,7 +714,7 @@ def build_backup_payload(shop: Shop, setting: BackupSetting) -> dict:
                 "users": bool(setting.include_users),
                 "settings": bool(setting.include_settings),
             },
-            "version": "1.0",
+            "version": "1.1",
         },
         "data": {
             "shop": serialize_queryset(
@@ -716,11 +996,11 @@ def create_backup_zip(
     Membuat backup zip berisi:
     - metadata.json
     - data.json
-    - media/... (jika include_media=True dan file ada)
 
-    Mendukung:
-    - local media file -> zip dari abs_path
-    - remote media file -> download bytes lalu tulis ke zip
+    Media (jika include_media=True) tidak di-embed ke zip, tapi disimpan
+    sekali di media store per shop (key = sha256). metadata.json berisi
+    referensi zip_path -> sha256, sehingga backup berulang untuk media
+    yang tidak berubah hampir tidak memakan disk/I/O.
     """
     backup_dir = shop_backup_dir(shop)
 
@@ -730,12 +1010,15 @@ def create_backup_zip(
 
     payload = build_backup_payload(shop, setting)
 
-    media_result = {"files": [], "skipped": []}
     if setting.include_media:
-        media_result = collect_media_files(shop, setting)
+        media_index = load_media_store_index(shop)
+        media_result = collect_media_files(shop, setting, media_index=media_index)
+        media_result = store_media_blobs(shop, media_result, media_index)
+        save_media_store_index(shop, media_index)
         payload["metadata"]["media_export"] = build_media_export_summary(media_result)
     else:
         payload["metadata"]["media_export"] = {
+            "storage": "content_addressed",
             "exported_count": 0,
             "skipped_count": 0,
             "total_size_bytes": 0,
@@ -759,17 +1042,6 @@ def create_backup_zip(
             zf.write(metadata_path, arcname="metadata.json")
             zf.write(data_path, arcname="data.json")
 
-            # export media fisik / remote
-            for item in media_result.get("files", []):
-                try:
-                    if item.get("source_type") == "local" and item.get("abs_path"):
-                        zf.write(item["abs_path"], arcname=item["zip_path"])
-                    elif item.get("source_type") == "remote":
-                        zf.writestr(item["zip_path"], item["content"])
-                except Exception:
-                    # jangan bikin seluruh backup gagal hanya karena 1 file bermasalah
-                    pass
-
     file_size_bytes = zip_path.stat().st_size
     checksum = compute_sha256(zip_path)
 
@@ -814,6 +1086,13 @@ def cleanup_old_backups(shop: Shop, keep_last: int):
                 pass
         item.soft_delete()
 
+    if old_items:
+        try:
+            collect_media_store_garbage(shop)
+        except Exception:
+            # GC gagal tidak boleh menggagalkan backup; dicoba lagi di cleanup berikutnya
+            pass
+
 
 # =========================================================
 # HIGH LEVEL ACTION
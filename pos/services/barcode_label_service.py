@@ -0,0 +1,280 @@
+# pos/services/barcode_label_service.py
+
+import logging
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+from reportlab.graphics.barcode import code128
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+from pos.models import Product
+from pos.services.export_service import (
+    PDF_CONTENT_TYPE,
+    export_file_name,
+    export_job_dir,
+    register_export_runner,
+)
+
+
+logger = logging.getLogger(__name__)
+
+LABEL_CHUNK_SIZE = 500
+LABEL_PRODUCT_FIELDS = ("id", "name", "sku", "code", "sell_price")
+
+DEFAULT_LABEL_LAYOUT = "a4_70x35"
+
+# Semua ukuran dalam point (reportlab). "lines" = baris teks di atas barcode, urut dari atas.
+LABEL_LAYOUTS = {
+    # layout lama print-barcodes: A4, 2 kolom x 7 baris, label 70x35mm dengan border
+    "a4_70x35": {
+        "pagesize": A4,
+        "label_w": 70 * mm,
+        "label_h": 35 * mm,
+        "margin_x": 10 * mm,
+        "margin_y": 10 * mm,
+        "gap_x": 5 * mm,
+        "gap_y": 5 * mm,
+        "border": True,
+        "lines": ("name", "sku", "price"),
+        "bar_height": 12 * mm,
+        "name_chars": 26,
+    },
+    # sheet stiker A4 3 x 7 (63.5 x 38.1mm, mis. Avery L7160), tanpa border
+    "a4_63x38": {
+        "pagesize": A4,
+        "label_w": 63.5 * mm,
+        "label_h": 38.1 * mm,
+        "margin_x": 7.2 * mm,
+        "margin_y": 15.1 * mm,
+        "gap_x": 2.5 * mm,
+        "gap_y": 0,
+        "border": False,
+        "lines": ("name", "sku", "price"),
+        "bar_height": 12 * mm,
+        "name_chars": 24,
+    },
+    # printer label roll 50x30mm: satu label per halaman
+    "roll_50x30": {
+        "pagesize": (50 * mm, 30 * mm),
+        "label_w": 50 * mm,
+        "label_h": 30 * mm,
+        "margin_x": 0,
+        "margin_y": 0,
+        "gap_x": 0,
+        "gap_y": 0,
+        "border": False,
+        "lines": ("name", "price"),
+        "bar_height": 7 * mm,
+        "name_chars": 20,
+    },
+}
+
+
+def label_layout(name=None) -> dict:
+    name = (name or DEFAULT_LABEL_LAYOUT).strip().lower()
+    if name not in LABEL_LAYOUTS:
+        raise ValueError(f"Unknown label layout '{name}'. Choose: {', '.join(LABEL_LAYOUTS)}.")
+    return LABEL_LAYOUTS[name]
+
+
+def label_sync_max_labels() -> int:
+    return int(getattr(settings, "BARCODE_LABEL_SYNC_MAX_LABELS", 1000) or 0)
+
+
+def parse_label_ids(raw) -> list:
+    """ "1,2,3" atau list -> [1, 2, 3]; ValueError kalau format salah."""
+    if isinstance(raw, (list, tuple)):
+        values = raw
+    else:
+        values = str(raw or "").split(",")
+
+    try:
+        return [int(str(x).strip()) for x in values if str(x).strip()]
+    except (TypeError, ValueError):
+        raise ValueError("Invalid ids format. Example: ?ids=1,2,3")
+
+
+def label_products(*, ids=None, shop_id=None):
+    """
+    Queryset produk untuk label: hanya kolom yang dicetak.
+    ids=None berarti semua produk (dalam shop_id kalau ada).
+    """
+    qs = Product.objects.only(*LABEL_PRODUCT_FIELDS)
+    if ids is not None:
+        qs = qs.filter(id__in=ids)
+    if shop_id:
+        qs = qs.filter(shop_id=shop_id)
+    return qs.order_by("name", "id")
+
+
+# =========================================================
+# DRAWING
+# =========================================================
+@lru_cache(maxsize=4096)
+def code128_valid(value: str, bar_height: float) -> bool:
+    """
+    Validasi Code128 per (code, tinggi) disimpan di memori proses; hanya hasil
+    bool, objek Code128 tidak dibagi antar thread (drawOn() set / del self.canv).
+    """
+    try:
+        code128.Code128(value, barHeight=bar_height, humanReadable=True).width
+        return True
+    except Exception:
+        logger.warning("Invalid Code128 value %r", value)
+        return False
+
+
+def code128_barcode(value: str, bar_height: float):
+    """Code128 baru untuk satu canvas; None kalau code tidak valid untuk Code128."""
+    if not code128_valid(value, bar_height):
+        return None
+    return code128.Code128(value, barHeight=bar_height, humanReadable=True)
+
+
+class BarcodeForms:
+    """
+    Barcode per canvas. Code yang dicetak lebih dari sekali (label berulang
+    untuk produk yang sama) digambar sekali ke PDF form (XObject), label
+    berikutnya cukup doForm() tanpa menggambar ulang ratusan rect.
+    Code yang baru sekali muncul langsung drawOn() (form per code lebih mahal).
+    Objek Code128 dibuat per canvas, jadi aman untuk render paralel.
+    """
+
+    def __init__(self, c):
+        self.canvas = c
+        self.names = {}
+        self.seen = set()
+
+    def _form(self, key):
+        bc = code128_barcode(*key)
+        name = f"barcode{len(self.names)}"
+        # teks human-readable ada di bawah baseline barcode
+        self.canvas.beginForm(name, lowerx=0, lowery=-2 * bc.fontSize, upperx=bc.width, uppery=bc.height)
+        bc.drawOn(self.canvas, 0, 0)
+        self.canvas.endForm()
+        self.names[key] = name
+        return name
+
+    def draw(self, value: str, bar_height: float, x, y) -> bool:
+        key = (value, bar_height)
+        if key not in self.seen:
+            bc = code128_barcode(value, bar_height)
+            if bc is None:
+                return False
+            self.seen.add(key)
+            bc.drawOn(self.canvas, x, y)
+            return True
+
+        name = self.names.get(key) or self._form(key)
+        self.canvas.saveState()
+        self.canvas.translate(x, y)
+        self.canvas.doForm(name)
+        self.canvas.restoreState()
+        return True
+
+
+def _draw_label(c, prod, x0, y0, layout, barcodes):
+    label_w = layout["label_w"]
+    label_h = layout["label_h"]
+    left = x0 + 4 * mm
+
+    if layout["border"]:
+        c.roundRect(x0, y0, label_w, label_h, 6, stroke=1, fill=0)
+
+    y = y0 + label_h - 7 * mm
+    for line in layout["lines"]:
+        if line == "name":
+            c.setFont("Helvetica-Bold", 9)
+            c.drawString(left, y, (prod.name or "")[:layout["name_chars"]])
+        elif line == "sku":
+            sku = (prod.sku or "")[:22]
+            if sku:
+                c.setFont("Helvetica", 8)
+                c.drawString(left, y, f"SKU: {sku}")
+        elif line == "price":
+            c.setFont("Helvetica", 8)
+            c.drawString(left, y, f"Price: ${prod.sell_price}")
+        y -= 5 * mm
+
+    value = (prod.code or "").strip()
+    if not value or not barcodes.draw(value, layout["bar_height"], left, y0 + 4 * mm):
+        c.setFont("Helvetica-Oblique", 8)
+        c.drawString(left, y0 + 6 * mm, "No barcode (code)" if not value else "Invalid barcode")
+
+
+def write_label_pdf(target, products, layout_name=None) -> int:
+    """
+    Gambar label untuk products (queryset) ke target (path / file object).
+    Produk dibaca per chunk dengan iterator(); halaman di-compress saat selesai.
+    Return jumlah label.
+    """
+    layout = label_layout(layout_name)
+    width, height = layout["pagesize"]
+    label_w, label_h = layout["label_w"], layout["label_h"]
+    margin_x, margin_y = layout["margin_x"], layout["margin_y"]
+    gap_x, gap_y = layout["gap_x"], layout["gap_y"]
+    cols = int((width - 2 * margin_x + gap_x) // (label_w + gap_x)) or 1
+
+    c = canvas.Canvas(target, pagesize=layout["pagesize"], pageCompression=1)
+    c.setTitle("Product barcodes")
+    barcodes = BarcodeForms(c)
+
+    x = margin_x
+    y = height - margin_y - label_h
+    count = 0
+
+    for prod in products.iterator(chunk_size=LABEL_CHUNK_SIZE):
+        if y < margin_y - 0.01:
+            c.showPage()
+            y = height - margin_y - label_h
+            x = margin_x
+
+        _draw_label(c, prod, x, y, layout, barcodes)
+        count += 1
+
+        if count % cols == 0:
+            x = margin_x
+            y -= (label_h + gap_y)
+        else:
+            x += (label_w + gap_x)
+
+    c.showPage()
+    c.save()
+    return count
+
+
+def label_pdf_temp_file(products, layout_name=None):
+    """PDF label di temporary file (bukan di memory response), siap untuk FileResponse."""
+    output = tempfile.TemporaryFile(suffix=".pdf")
+    write_label_pdf(output, products, layout_name)
+    output.seek(0)
+    return output
+
+
+# =========================================================
+# BACKGROUND RUNNER
+# =========================================================
+@register_export_runner("barcode_labels")
+def run_barcode_label_export(export_job):
+    params = export_job.params or {}
+    layout_name = params.get("layout") or DEFAULT_LABEL_LAYOUT
+    ids = params.get("ids")
+
+    products = label_products(
+        ids=parse_label_ids(ids) if ids is not None else None,
+        shop_id=export_job.shop_id,
+    )
+
+    file_name = export_file_name(f"barcodes_{export_job.id}", "pdf")
+    file_path = export_job_dir(export_job) / file_name
+    count = write_label_pdf(str(file_path), products, layout_name)
+
+    return {
+        "file_name": file_name,
+        "file_path": file_path,
+        "content_type": PDF_CONTENT_TYPE,
+        "row_count": count,
+    }
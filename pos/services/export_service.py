@@ -0,0 +1,161 @@
+# pos/services/export_service.py
+
+import csv
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from openpyxl import Workbook
+
+from pos.models_export import ExportJob
+from pos.services.job_runner import submit_job
+
+
+logger = logging.getLogger(__name__)
+
+CSV_CONTENT_TYPE = "text/csv"
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PDF_CONTENT_TYPE = "application/pdf"
+
+# kind -> callable(export_job) -> dict(file_name, file_path, content_type, row_count)
+EXPORT_JOB_RUNNERS = {}
+
+
+def register_export_runner(kind: str):
+    def decorator(func):
+        EXPORT_JOB_RUNNERS[kind] = func
+        return func
+    return decorator
+
+
+# =========================================================
+# FILES
+# =========================================================
+def export_root() -> Path:
+    """
+    Folder file export. Default di luar MEDIA_ROOT (MEDIA_ROOT bisa di-serve
+    publik); file hanya bisa diunduh lewat ExportJobDownloadAPIView.
+    """
+    root = getattr(settings, "EXPORT_ROOT", None)
+    if root:
+        path = Path(root)
+    else:
+        path = Path(settings.BASE_DIR) / "exports"
+
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def export_job_dir(export_job: ExportJob) -> Path:
+    shop_code = "platform"
+    if export_job.shop_id and export_job.shop and export_job.shop.code:
+        shop_code = str(export_job.shop.code).strip().upper()
+
+    path = export_root() / shop_code
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+# =========================================================
+# WRITERS (constant memory)
+# =========================================================
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """
+    Generator baris CSV untuk StreamingHttpResponse.
+    """
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_csv_file(path: Path, rows) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_xlsx_file(target, rows, *, sheet_title: str = "Sheet1") -> int:
+    """
+    Tulis rows ke workbook write-only: row langsung di-flush ke XML
+    sementara, jadi memory tidak tumbuh mengikuti jumlah row.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+
+    count = 0
+    for row in rows:
+        ws.append(row)
+        count += 1
+
+    wb.save(target)
+    return count
+
+
+def xlsx_temp_file(rows, *, sheet_title: str = "Sheet1"):
+    output = tempfile.TemporaryFile(suffix=".xlsx")
+    write_xlsx_file(output, rows, sheet_title=sheet_title)
+    output.seek(0)
+    return output
+
+
+# =========================================================
+# JOBS
+# =========================================================
+def queue_export(*, kind: str, shop=None, params=None, requested_by=None) -> ExportJob:
+    if kind not in EXPORT_JOB_RUNNERS:
+        raise ValueError(f"Unsupported export kind '{kind}'.")
+
+    export_job = ExportJob.objects.create(
+        shop=shop,
+        kind=kind,
+        params=params or {},
+        requested_by=requested_by if requested_by and requested_by.is_authenticated else None,
+        status=ExportJob.Status.QUEUED,
+    )
+    submit_job(run_export_job, export_job.id)
+    return export_job
+
+
+def run_export_job(export_job_id: int):
+    export_job = ExportJob.objects.select_related("shop").filter(pk=export_job_id).first()
+    if not export_job or export_job.status != ExportJob.Status.QUEUED:
+        return export_job
+
+    runner = EXPORT_JOB_RUNNERS.get(export_job.kind)
+    export_job.mark_running()
+
+    try:
+        if runner is None:
+            raise ValueError(f"Unsupported export kind '{export_job.kind}'.")
+
+        result = runner(export_job)
+        file_path = result["file_path"]
+        export_job.mark_completed(
+            file_name=result["file_name"],
+            file_path=str(file_path),
+            content_type=result["content_type"],
+            file_size_bytes=os.path.getsize(file_path),
+            row_count=result.get("row_count", 0),
+        )
+    except Exception as e:
+        logger.exception("Export job #%s failed", export_job_id)
+        export_job.mark_failed(str(e))
+
+    return export_job
+
+
+def export_file_name(prefix: str, extension: str) -> str:
+    stamp = timezone.localtime().strftime("%Y%m%d_%H%M%S")
+    return f"{prefix}_{stamp}.{extension}"
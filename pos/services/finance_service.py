@@ -1,5 +1,10 @@
+from datetime import datetime, time, timedelta
 from decimal import Decimal
+
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
 from django.utils import timezone
+
 from pos.models_shift import Shift
 
 
@@ -14,4 +19,35 @@ def get_opening_cash_today(shop_id, user=None):
         qs = qs.filter(cashier=user)
 
     s = qs.first()
-    return (s.opening_cash if s else Decimal("0.00")), (s.id if s else None)
\ No newline at end of file
+    return (s.opening_cash if s else Decimal("0.00")), (s.id if s else None)
+
+def sales_expense_by_day(*, shop_id, start, end):
+    """
+    Penjualan (order paid) dan expense per hari dalam [start, end].
+    shop_id=None -> semua shop (platform admin). Hanya hari yang ada datanya.
+    """
+    from pos.models import Expense, Order
+
+    tz = timezone.get_current_timezone()
+    start_dt = timezone.make_aware(datetime.combine(start, time.min), tz)
+    end_dt = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz)
+
+    orders = Order.objects.filter(is_paid=True, created_at__gte=start_dt, created_at__lt=end_dt)
+    expenses = Expense.objects.filter(date__gte=start, date__lte=end)
+    if shop_id:
+        orders = orders.filter(shop_id=shop_id)
+        expenses = expenses.filter(shop_id=shop_id)
+
+    sales_map = {
+        row["d"]: row["total"] or Decimal("0")
+        for row in orders.annotate(d=TruncDate("created_at")).values("d").annotate(total=Sum("total")).order_by()
+    }
+    exp_map = {
+        row["date"]: row["total"] or Decimal("0")
+        for row in expenses.values("date").annotate(total=Sum("amount")).order_by()
+    }
+
+    return [
+        {"date": d, "sales": sales_map.get(d, Decimal("0")), "expense": exp_map.get(d, Decimal("0"))}
+        for d in sorted(set(sales_map) | set(exp_map))
+    ]
@@ -1,5 +1,13 @@
+import csv
+import json
+import logging
+import os
+import time
 from io import BytesIO
+from itertools import islice
+from pathlib import Path
 
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 from openpyxl import Workbook, load_workbook
@@ -14,6 +22,11 @@ from pos.models import (
 )
 from pos.models_backup import BackupHistory
 from pos.models_import import ImportJob, ImportRowError
+from pos.services.export_service import iter_csv, xlsx_temp_file
+from pos.services.job_runner import submit_job
+
+
+logger = logging.getLogger(__name__)
 
 
 # =========================================================
@@ -42,6 +55,17 @@ TEMPLATE_SHEETS = {
     "OpeningStock": ["product_code", "quantity"],
 }
 
+# rows validated / imported per round-trip when walking the row cache
+IMPORT_CHUNK_SIZE = 1000
+
+ROW_CACHE_VERSION = 1
+
+# row errors are written with bulk_create in batches of this size
+IMPORT_ERROR_BATCH_SIZE = 1000
+
+# distinct (sheet, field, message) groups kept in the validation summary
+IMPORT_ERROR_GROUP_LIMIT = 200
+
 
 # =========================================================
 # TEMPLATE BUILDERS
@@ -67,6 +91,7 @@ def template_info():
         "format": "Excel Workbook",
         "sheets": list(TEMPLATE_SHEETS.keys()),
         "description": "One file with multiple sheets for importing master data.",
+        "accepted_formats": sorted(set(IMPORT_FILE_FORMATS)),
     }
 
 
@@ -75,7 +100,7 @@ def template_info():
 # =========================================================
 def _load_workbook(file_path: str):
     try:
-        return load_workbook(file_path, data_only=True)
+        return load_workbook(file_path, read_only=True, data_only=True)
     except FileNotFoundError:
         raise ValueError("Import file not found.")
     except Exception as e:
@@ -118,8 +143,12 @@ def _safe_bool(value, default=False):
     return default
 
 
-def _sheet_headers(ws):
-    return [_safe_str(c.value) for c in ws[1]] if ws.max_row >= 1 else []
+def _sheet_headers(header_row):
+    headers = [_safe_str(v) for v in (header_row or [])]
+    # read-only sheets report the widest used column, so drop trailing blanks
+    while headers and not headers[-1]:
+        headers.pop()
+    return headers
 
 
 def _row_to_dict(headers, row):
@@ -131,17 +160,111 @@ def _row_to_dict(headers, row):
 
 
 def _clear_previous_errors(import_job: ImportJob):
-    import_job.row_errors.all().delete()
-
+    # ImportRowError has no dependents or delete signals: single DELETE
+    ImportRowError.objects.filter(import_job=import_job).delete()
+
+
+def _max_stored_errors():
+    return max(int(getattr(settings, "IMPORT_MAX_ROW_ERRORS", 5000) or 0), 0)
+
+
+def _format_row_range(first_row: int, last_row: int):
+    if first_row == last_row:
+        return f"row {first_row:,}"
+    return f"rows {first_row:,}\u2013{last_row:,}"
+
+
+class ImportErrorBuffer:
+    """
+    Buffer row errors and write them with bulk_create.
+
+    Only the first `limit` errors are stored as ImportRowError rows; every
+    error is still counted and aggregated per (sheet, field, message) so the
+    summary can say "same error on rows 12–9,876".
+    """
+
+    def __init__(self, import_job: ImportJob, *, limit=None, batch_size=IMPORT_ERROR_BATCH_SIZE):
+        self.import_job = import_job
+        self.limit = _max_stored_errors() if limit is None else limit
+        self.batch_size = batch_size
+        self.pending = []
+        self.total = 0
+        self.stored = 0
+        self.groups = {}
+        self.ungrouped = 0
+
+    def add(self, sheet_name: str, row_number: int, field_name: str, message: str):
+        # bulk_create melewati CleanSaveMixin, jadi normalisasi di sini
+        sheet_name = _safe_str(sheet_name)[:100]
+        field_name = _safe_str(field_name)[:100]
+        message = _safe_str(message) or "Invalid row."
+        row_number = max(int(row_number or 1), 1)
+
+        self.total += 1
+
+        key = (sheet_name, field_name, message)
+        group = self.groups.get(key)
+        if group is None and len(self.groups) < IMPORT_ERROR_GROUP_LIMIT:
+            group = self.groups[key] = {
+                "sheet_name": sheet_name,
+                "field_name": field_name,
+                "message": message,
+                "count": 0,
+                "first_row": row_number,
+                "last_row": row_number,
+            }
 
-def _add_error(import_job: ImportJob, sheet_name: str, row_number: int, field_name: str, message: str):
-    ImportRowError.objects.create(
-        import_job=import_job,
-        sheet_name=sheet_name,
-        row_number=row_number,
-        field_name=field_name,
-        message=message,
-    )
+        if group is None:
+            self.ungrouped += 1
+        else:
+            group["count"] += 1
+            group["first_row"] = min(group["first_row"], row_number)
+            group["last_row"] = max(group["last_row"], row_number)
+
+        if self.stored >= self.limit:
+            return
+
+        self.pending.append(
+            ImportRowError(
+                import_job=self.import_job,
+                sheet_name=sheet_name,
+                row_number=row_number,
+                field_name=field_name,
+                message=message,
+            )
+        )
+        self.stored += 1
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        ImportRowError.objects.bulk_create(self.pending, batch_size=self.batch_size)
+        self.pending = []
+
+    @property
+    def truncated(self):
+        return self.total > self.stored
+
+    def summary(self):
+        groups = sorted(
+            self.groups.values(),
+            key=lambda g: (-g["count"], g["sheet_name"], g["first_row"]),
+        )
+        out = []
+        for group in groups:
+            prefix = "same error on " if group["count"] > 1 else ""
+            out.append({
+                **group,
+                "summary": (
+                    f"{group['sheet_name']} {group['field_name']}: {group['message']} "
+                    f"({prefix}{_format_row_range(group['first_row'], group['last_row'])}, "
+                    f"{group['count']:,} errors)"
+                ),
+            })
+        return out
 
 
 def _is_blank_row(row_values):
@@ -154,6 +277,279 @@ def _normalize_sheet_name(sheet_name: str):
     return _safe_str(sheet_name)
 
 
+def _chunked(iterable, size=None):
+    size = size or IMPORT_CHUNK_SIZE
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# =========================================================
+# ROW SOURCES
+# =========================================================
+# A row source turns an uploaded file into (sheet_name, header_row, rows)
+# tuples, where rows yields (row_number, values). An XLSX workbook carries
+# every sheet; a CSV or NDJSON file carries exactly one sheet.
+IMPORT_FILE_FORMATS = {
+    ".xlsx": "xlsx",
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+
+
+def import_file_format(filename: str) -> str:
+    return IMPORT_FILE_FORMATS.get(Path(filename or "").suffix.lower(), "")
+
+
+def import_job_file_format(import_job: ImportJob) -> str:
+    source = (import_job.metadata or {}).get("source") or {}
+    return (
+        source.get("format")
+        or import_file_format(import_job.original_filename)
+        or import_file_format(import_job.file.name)
+    )
+
+
+def _single_sheet_name(import_job: ImportJob, headers=None) -> str:
+    """
+    Tentukan sheet tujuan untuk file satu-sheet (CSV/NDJSON):
+    pilihan saat upload -> header yang unik -> nama file (mis. products.csv).
+    """
+    source = (import_job.metadata or {}).get("source") or {}
+    if source.get("sheet") in TEMPLATE_SHEETS:
+        return source["sheet"]
+
+    if headers:
+        matches = [name for name, expected in TEMPLATE_SHEETS.items() if expected == headers]
+        if len(matches) == 1:
+            return matches[0]
+
+    stem = Path(import_job.original_filename or import_job.file.name or "").stem.lower()
+    stem = "".join(ch for ch in stem if ch.isalpha())
+    for sheet_name in TEMPLATE_SHEETS:
+        if stem.startswith(sheet_name.lower()):
+            return sheet_name
+
+    raise ValueError(
+        "Cannot determine the target sheet for this file. "
+        f"Choose one of: {', '.join(TEMPLATE_SHEETS)}."
+    )
+
+
+def _xlsx_row_source(import_job: ImportJob, file_path: str):
+    workbook = _load_workbook(file_path)
+    try:
+        for sheet_name in workbook.sheetnames:
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            header_row = next(rows, None)
+            yield sheet_name, header_row, enumerate(rows, start=2)
+    finally:
+        workbook.close()
+
+
+def _csv_row_source(import_job: ImportJob, file_path: str):
+    with open(file_path, "r", encoding="utf-8-sig", newline="") as fh:
+        sample = fh.read(64 * 1024)
+        fh.seek(0)
+
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+
+        reader = csv.reader(fh, dialect)
+        header_row = next(reader, None)
+        sheet_name = _single_sheet_name(import_job, _sheet_headers(header_row))
+        yield sheet_name, header_row, enumerate(reader, start=2)
+
+
+def _iter_ndjson_rows(file_path: str, headers: list[str]):
+    with open(file_path, "r", encoding="utf-8-sig") as fh:
+        for line_number, line in enumerate(fh, start=1):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise ValueError(f"Invalid JSON on line {line_number}.")
+
+            if not isinstance(record, dict):
+                raise ValueError(f"Line {line_number} must be a JSON object.")
+
+            yield line_number, [record.get(header) for header in headers]
+
+
+def _ndjson_row_source(import_job: ImportJob, file_path: str):
+    # NDJSON tidak punya header row: key tiap object dipetakan ke header template
+    sheet_name = _single_sheet_name(import_job)
+    headers = TEMPLATE_SHEETS[sheet_name]
+    yield sheet_name, headers, _iter_ndjson_rows(file_path, headers)
+
+
+IMPORT_ROW_SOURCES = {
+    "xlsx": _xlsx_row_source,
+    "csv": _csv_row_source,
+    "ndjson": _ndjson_row_source,
+}
+
+
+# =========================================================
+# ROW CACHE
+# =========================================================
+# The uploaded file is parsed once (streaming, via its row source) into a
+# compact JSON-lines cache next to the file:
+#   <file>.rowcache/manifest.json  -> sheets, headers, row counts
+#   <file>.rowcache/<n>.jsonl      -> [row_number, value, ...] per row
+# Validation and import both read from this cache, so an XLSX DOM is
+# never held in memory and the file is not parsed a second time.
+def _row_cache_dir(import_job: ImportJob) -> Path:
+    return Path(f"{import_job.file.path}.rowcache")
+
+
+def _cache_value(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _write_sheet_cache(cache_dir: Path, index: int, sheet_name: str, header_row, rows) -> dict:
+    headers = _sheet_headers(header_row)
+    width = len(headers)
+    filename = f"{index}.jsonl"
+    row_count = 0
+
+    with open(cache_dir / filename, "w", encoding="utf-8") as fh:
+        for row_number, row in rows:
+            if _is_blank_row(row):
+                continue
+            values = [_cache_value(v) for v in row[:width]]
+            fh.write(json.dumps([row_number, *values], ensure_ascii=False, separators=(",", ":")))
+            fh.write("\n")
+            row_count += 1
+
+    return {
+        "name": _normalize_sheet_name(sheet_name),
+        "headers": headers,
+        "file": filename,
+        "row_count": row_count,
+    }
+
+
+def _build_row_cache(import_job: ImportJob, cache_dir: Path) -> dict:
+    file_path = import_job.file.path
+    file_format = import_job_file_format(import_job)
+    row_source = IMPORT_ROW_SOURCES.get(file_format)
+    if row_source is None:
+        raise ValueError("Unsupported import file format.")
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        sheets = [
+            _write_sheet_cache(cache_dir, index, sheet_name, header_row, rows)
+            for index, (sheet_name, header_row, rows) in enumerate(row_source(import_job, file_path))
+        ]
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Failed to read import file: {e}")
+
+    manifest = {
+        "version": ROW_CACHE_VERSION,
+        "format": file_format,
+        "source_size": os.path.getsize(file_path),
+        "source_mtime": os.path.getmtime(file_path),
+        "sheets": sheets,
+    }
+    tmp_path = cache_dir / "manifest.json.tmp"
+    tmp_path.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp_path, cache_dir / "manifest.json")
+    return manifest
+
+
+def load_row_cache(import_job: ImportJob) -> dict:
+    """
+    Return the row cache manifest for an import job, building it from the
+    uploaded file when it is missing or stale.
+    """
+    file_path = import_job.file.path
+    if not os.path.exists(file_path):
+        raise ValueError("Import file not found.")
+
+    cache_dir = _row_cache_dir(import_job)
+    manifest_path = cache_dir / "manifest.json"
+
+    if manifest_path.exists():
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            manifest = None
+
+        if (
+            manifest
+            and manifest.get("version") == ROW_CACHE_VERSION
+            and manifest.get("source_size") == os.path.getsize(file_path)
+            and manifest.get("source_mtime") == os.path.getmtime(file_path)
+        ):
+            manifest["dir"] = str(cache_dir)
+            return manifest
+
+    manifest = _build_row_cache(import_job, cache_dir)
+    manifest["dir"] = str(cache_dir)
+    return manifest
+
+
+def _cached_sheet(manifest: dict, sheet_name: str):
+    for sheet in manifest["sheets"]:
+        if sheet["name"] == sheet_name:
+            return sheet
+    return None
+
+
+def _iter_cached_rows(manifest: dict, sheet: dict):
+    """
+    Yield (row_number, values) for every non-blank data row of a cached sheet.
+    """
+    with open(Path(manifest["dir"]) / sheet["file"], "r", encoding="utf-8") as fh:
+        for line in fh:
+            row = json.loads(line)
+            yield row[0], row[1:]
+
+
+def _has_template_sheet(manifest: dict, sheet_name: str):
+    sheet = _cached_sheet(manifest, sheet_name)
+    return bool(sheet) and sheet["headers"] == TEMPLATE_SHEETS[sheet_name]
+
+
+def _iter_template_rows(manifest: dict, sheet_name: str):
+    """
+    Yield row dicts for a sheet only when its header matches the template.
+    """
+    if not _has_template_sheet(manifest, sheet_name):
+        return
+
+    sheet = _cached_sheet(manifest, sheet_name)
+
+    headers = sheet["headers"]
+    for _, values in _iter_cached_rows(manifest, sheet):
+        yield _row_to_dict(headers, values)
+
+
+def delete_row_cache(import_job: ImportJob):
+    cache_dir = _row_cache_dir(import_job)
+    if not cache_dir.exists():
+        return
+    for path in cache_dir.iterdir():
+        path.unlink(missing_ok=True)
+    cache_dir.rmdir()
+
+
 # =========================================================
 # VALIDATION LOGIC PER SHEET
 # =========================================================
@@ -315,7 +711,7 @@ def _validate_row_by_sheet(
 # VALIDATION
 # =========================================================
 def validate_import_workbook(import_job: ImportJob):
-    workbook = _load_workbook(import_job.file.path)
+    manifest = load_row_cache(import_job)
     _clear_previous_errors(import_job)
 
     shop = import_job.shop
@@ -359,47 +755,29 @@ def validate_import_workbook(import_job: ImportJob):
     file_products = set()
 
     header_has_error = False
+    errors = ImportErrorBuffer(import_job)
 
     # -----------------------------------------------------
     # PASS 1: collect in-file references
     # -----------------------------------------------------
-    for sheet_name in workbook.sheetnames:
-        normalized_sheet_name = _normalize_sheet_name(sheet_name)
-        if normalized_sheet_name not in TEMPLATE_SHEETS:
-            continue
-
-        ws = workbook[sheet_name]
-        headers = _sheet_headers(ws)
-
-        if headers != TEMPLATE_SHEETS[normalized_sheet_name]:
-            continue
-
-        if ws.max_row < 2:
-            continue
-
-        for _, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-            row_values = list(row or [])
-            if _is_blank_row(row_values):
-                continue
-
-            row_data = _row_to_dict(headers, row_values)
-
-            if normalized_sheet_name == "Categories":
+    for sheet_name in ("Categories", "Units", "Suppliers", "Products"):
+        for row_data in _iter_template_rows(manifest, sheet_name):
+            if sheet_name == "Categories":
                 name = _safe_str(row_data.get("name"))
                 if name:
                     file_categories.add(name.lower())
 
-            elif normalized_sheet_name == "Units":
+            elif sheet_name == "Units":
                 name = _safe_str(row_data.get("name"))
                 if name:
                     file_units.add(name.lower())
 
-            elif normalized_sheet_name == "Suppliers":
+            elif sheet_name == "Suppliers":
                 name = _safe_str(row_data.get("name"))
                 if name:
                     file_suppliers.add(name.lower())
 
-            elif normalized_sheet_name == "Products":
+            elif sheet_name == "Products":
                 code = _safe_str(row_data.get("code"))
                 if code:
                     file_products.add(code.lower())
@@ -407,84 +785,72 @@ def validate_import_workbook(import_job: ImportJob):
     # -----------------------------------------------------
     # PASS 2: validate rows
     # -----------------------------------------------------
-    for sheet_name in workbook.sheetnames:
-        normalized_sheet_name = _normalize_sheet_name(sheet_name)
-        ws = workbook[sheet_name]
-        headers = _sheet_headers(ws)
+    for sheet in manifest["sheets"]:
+        normalized_sheet_name = sheet["name"]
+        headers = sheet["headers"]
 
         header_errors = _validate_headers(normalized_sheet_name, headers)
         if header_errors:
             header_has_error = True
             for err in header_errors:
-                _add_error(
-                    import_job=import_job,
-                    sheet_name=normalized_sheet_name,
-                    row_number=1,
-                    field_name=err.get("field_name", "__header__"),
-                    message=err.get("message", "Invalid header."),
+                errors.add(
+                    normalized_sheet_name,
+                    1,
+                    err.get("field_name", "__header__"),
+                    err.get("message", "Invalid header."),
                 )
             continue
 
-        if ws.max_row < 2:
-            continue
-
-        for row_index, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-            row_values = list(row or [])
-            if _is_blank_row(row_values):
-                continue
-
-            excel_row_number = row_index
-            total_rows += 1
-
-            row_data = _row_to_dict(headers, row_values)
-
-            if len(preview_data.get(normalized_sheet_name, [])) < 20:
-                safe_row = {}
-                for key, value in row_data.items():
-                    if value is None:
-                        safe_row[key] = ""
-                    elif isinstance(value, (str, int, float, bool)):
-                        safe_row[key] = value
-                    else:
-                        safe_row[key] = str(value)
-
-                preview_data.setdefault(normalized_sheet_name, []).append({
-                    "row_number": excel_row_number,
-                    "data": safe_row,
-                })
-
-            try:
-                row_errors = _validate_row_by_sheet(
-                    sheet_name=normalized_sheet_name,
-                    row_data=row_data,
-                    existing_categories=existing_categories,
-                    existing_units=existing_units,
-                    existing_suppliers=existing_suppliers,
-                    existing_products=existing_products,
-                    file_categories=file_categories,
-                    file_units=file_units,
-                    file_suppliers=file_suppliers,
-                    file_products=file_products,
-                )
-            except Exception as e:
-                row_errors = [{
-                    "field_name": "__all__",
-                    "message": str(e),
-                }]
-
-            if row_errors:
-                invalid_rows += 1
-                for err in row_errors:
-                    _add_error(
-                        import_job=import_job,
+        for chunk in _chunked(_iter_cached_rows(manifest, sheet)):
+            for excel_row_number, row_values in chunk:
+                total_rows += 1
+                row_data = _row_to_dict(headers, row_values)
+
+                if len(preview_data.get(normalized_sheet_name, [])) < 20:
+                    safe_row = {
+                        key: "" if value is None else value
+                        for key, value in row_data.items()
+                    }
+                    preview_data.setdefault(normalized_sheet_name, []).append({
+                        "row_number": excel_row_number,
+                        "data": safe_row,
+                    })
+
+                try:
+                    row_errors = _validate_row_by_sheet(
                         sheet_name=normalized_sheet_name,
-                        row_number=excel_row_number,
-                        field_name=err.get("field_name", "__all__"),
-                        message=err.get("message", "Invalid row."),
+                        row_data=row_data,
+                        existing_categories=existing_categories,
+                        existing_units=existing_units,
+                        existing_suppliers=existing_suppliers,
+                        existing_products=existing_products,
+                        file_categories=file_categories,
+                        file_units=file_units,
+                        file_suppliers=file_suppliers,
+                        file_products=file_products,
                     )
-            else:
-                valid_rows += 1
+                except Exception as e:
+                    row_errors = [{
+                        "field_name": "__all__",
+                        "message": str(e),
+                    }]
+
+                if row_errors:
+                    invalid_rows += 1
+                    for err in row_errors:
+                        errors.add(
+                            normalized_sheet_name,
+                            excel_row_number,
+                            err.get("field_name", "__all__"),
+                            err.get("message", "Invalid row."),
+                        )
+                else:
+                    valid_rows += 1
+
+            errors.flush()
 
+    errors.flush()
+    error_groups = errors.summary()
     has_errors = header_has_error or invalid_rows > 0
 
     import_job.status = (
@@ -499,6 +865,11 @@ def validate_import_workbook(import_job: ImportJob):
             "valid_rows": valid_rows,
             "invalid_rows": invalid_rows,
             "has_errors": has_errors,
+            "error_count": errors.total,
+            "stored_errors": errors.stored,
+            "errors_truncated": errors.truncated,
+            "error_groups": error_groups,
+            "ungrouped_errors": errors.ungrouped,
         },
         "preview": preview_data,
         "validated_at": timezone.localtime().isoformat(),
@@ -520,12 +891,90 @@ def validate_import_workbook(import_job: ImportJob):
             }
             for err in import_job.row_errors.all().order_by("sheet_name", "row_number", "id")
         ],
+        "error_count": errors.total,
+        "errors_truncated": errors.truncated,
+        "error_groups": error_groups,
         "preview": preview_data,
     }
 
+# =========================================================
+# ERROR REPORT
+# =========================================================
+ERROR_REPORT_HEADERS = ["sheet", "row", "field", "message"]
+
+
+def _iter_error_report_rows(import_job: ImportJob):
+    yield ERROR_REPORT_HEADERS
+
+    qs = (
+        ImportRowError.objects
+        .filter(import_job=import_job)
+        .order_by("sheet_name", "row_number", "id")
+        .values_list("sheet_name", "row_number", "field_name", "message")
+    )
+    for row in qs.iterator(chunk_size=IMPORT_ERROR_BATCH_SIZE):
+        yield list(row)
+
+    summary = (import_job.metadata or {}).get("validation_summary") or {}
+    if summary.get("errors_truncated"):
+        # error di atas cap tidak disimpan per row, tampilkan ringkasannya
+        yield []
+        yield ["Error summary (errors beyond the stored limit are only counted)"]
+        for group in summary.get("error_groups") or []:
+            yield [
+                group.get("sheet_name", ""),
+                _format_row_range(group.get("first_row", 1), group.get("last_row", 1)),
+                group.get("field_name", ""),
+                f"{group.get('message', '')} ({group.get('count', 0):,} errors)",
+            ]
+
+
+def iter_error_report_csv(import_job: ImportJob):
+    return iter_csv(_iter_error_report_rows(import_job))
+
+
+def build_error_report_xlsx(import_job: ImportJob):
+    return xlsx_temp_file(_iter_error_report_rows(import_job), sheet_title="Errors")
+
+
 # =========================================================
 # IMPORT EXECUTION
 # =========================================================
+# Import runs sheet by sheet, IMPORT_CHUNK_SIZE rows at a time. Every chunk
+# commits in its own transaction together with a checkpoint in
+# ImportJob.metadata["import_progress"], so checkout is never blocked for
+# the whole import and an interrupted job resumes from the last chunk.
+IMPORT_STAGES = (
+    "Categories",
+    "Units",
+    "Suppliers",
+    "Customers",
+    "Products",
+    "OpeningStock",
+)
+
+# columns overwritten when a product code already exists in the shop
+# (stock is owned by OpeningStock / stock movements, never by this upsert)
+PRODUCT_IMPORT_UPDATE_FIELDS = [
+    "name",
+    "sku",
+    "item_type",
+    "category",
+    "unit",
+    "supplier",
+    "description",
+    "track_stock",
+    "buy_price",
+    "sell_price",
+    "is_active",
+    "updated_at",
+]
+
+
+class ImportCancelled(Exception):
+    pass
+
+
 def _latest_successful_backup_exists(shop, hours=24):
     cutoff = timezone.now() - timezone.timedelta(hours=hours)
     return BackupHistory.objects.filter(
@@ -536,441 +985,524 @@ def _latest_successful_backup_exists(shop, hours=24):
     ).exists()
 
 
-@transaction.atomic
-def run_import(import_job: ImportJob, *, confirm_import: bool, skip_backup_check: bool = False):
-    if not confirm_import:
-        raise ValueError("Import confirmation is required.")
+# Lookup maps only hold ids / codes (values_list), never model instances,
+# so a shop with 100k products does not load 100k ORM objects.
+def _name_map(model, shop):
+    return {
+        name.strip().lower(): pk
+        for pk, name in model.objects.filter(shop=shop).values_list("id", "name").iterator()
+        if name
+    }
 
-    if import_job.status not in {ImportJob.Status.VALIDATED, ImportJob.Status.UPLOADED}:
-        raise ValueError("Import job must be uploaded or validated before import.")
 
-    if import_job.status == ImportJob.Status.UPLOADED:
-        validate_import_workbook(import_job)
+def _product_code_map(shop):
+    # lower(code) -> code tersimpan, agar ON CONFLICT (shop, code) kena
+    # walau kapitalisasi di file berbeda
+    return {
+        code.strip().lower(): code
+        for code in Product.objects.filter(shop=shop).values_list("code", flat=True).iterator()
+        if code
+    }
 
-    current_invalid_rows = import_job.row_errors.count()
-    if current_invalid_rows > 0:
-        raise ValueError("Import cannot continue because invalid rows still exist.")
 
-    if not skip_backup_check and not _latest_successful_backup_exists(import_job.shop):
-        raise ValueError("No recent successful backup found. Please create a backup before import.")
+def _product_stock_map(shop):
+    return {
+        code.strip().lower(): [pk, stock]
+        for pk, code, stock in (
+            Product.objects.filter(shop=shop).values_list("id", "code", "stock").iterator()
+        )
+        if code
+    }
 
-    import_job.mark_importing()
 
-    wb = load_workbook(import_job.file.path, data_only=True)
-    shop = import_job.shop
+class ImportContext:
+    """
+    Lookup state shared by the chunks of one import run.
+
+    Maps are reloaded from the DB when a stage starts, so a resumed import
+    sees everything committed by earlier chunks and stages.
+
+    categories / units / suppliers / customers: lower(name) -> id
+    products: lower(code) -> stored code (Products stage)
+              lower(code) -> [id, stock] (OpeningStock stage)
+    """
+
+    def __init__(self, import_job: ImportJob):
+        self.import_job = import_job
+        self.shop = import_job.shop
+        self.categories = {}
+        self.units = {}
+        self.suppliers = {}
+        self.customers = {}
+        self.products = {}
+        self.seen_product_codes = set()
+        self.touched_product_ids = set()
+
+    def begin_stage(self, sheet_name: str):
+        if sheet_name == "Categories":
+            self.categories = _name_map(Category, self.shop)
+        elif sheet_name == "Units":
+            self.units = _name_map(Unit, self.shop)
+        elif sheet_name == "Suppliers":
+            self.suppliers = _name_map(Supplier, self.shop)
+        elif sheet_name == "Customers":
+            self.customers = _name_map(Customer, self.shop)
+        elif sheet_name == "Products":
+            self.categories = _name_map(Category, self.shop)
+            self.units = _name_map(Unit, self.shop)
+            self.suppliers = _name_map(Supplier, self.shop)
+            self.products = _product_code_map(self.shop)
+        elif sheet_name == "OpeningStock":
+            self.products = _product_stock_map(self.shop)
+
+
+class ImportProgress:
+    """
+    Resumable checkpoint + throughput stats stored on the import job.
+    """
+
+    def __init__(self, import_job: ImportJob, manifest: dict, *, resume: bool = False):
+        checkpoint = {}
+        if resume:
+            checkpoint = (import_job.metadata or {}).get("import_progress") or {}
+
+        self.import_job = import_job
+        self.total_rows = sum(
+            _cached_sheet(manifest, sheet_name)["row_count"]
+            for sheet_name in IMPORT_STAGES
+            if _has_template_sheet(manifest, sheet_name)
+        )
+        self.stage_index = int(checkpoint.get("stage_index") or 0)
+        self.stage_rows = int(checkpoint.get("stage_rows") or 0)
+        self.processed_rows = int(checkpoint.get("processed_rows") or 0)
+        self.imported_rows = int(checkpoint.get("imported_rows") or 0)
+        self.skipped_rows = int(checkpoint.get("skipped_rows") or 0)
+        self.started_at = checkpoint.get("started_at") or timezone.localtime().isoformat()
+        self.resumed = bool(checkpoint)
+
+        self._run_started = time.monotonic()
+        self._run_rows = 0
+
+    def start_offset(self, stage_index: int):
+        """
+        Jumlah row yang sudah di-commit untuk stage ini, atau None bila
+        stage sudah selesai pada run sebelumnya.
+        """
+        if stage_index < self.stage_index:
+            return None
+        if stage_index == self.stage_index:
+            return self.stage_rows
+        return 0
+
+    def advance(self, stage_index: int, rows: int, imported: int, skipped: int):
+        if stage_index != self.stage_index:
+            self.stage_index = stage_index
+            self.stage_rows = 0
+
+        self.stage_rows += rows
+        self.processed_rows += rows
+        self.imported_rows += imported
+        self.skipped_rows += skipped
+        self._run_rows += rows
+
+    def as_dict(self, **extra):
+        elapsed = max(time.monotonic() - self._run_started, 0.001)
+        rate = self._run_rows / elapsed
+        remaining = max(self.total_rows - self.processed_rows, 0)
+
+        return {
+            "stage": IMPORT_STAGES[self.stage_index] if self.stage_index < len(IMPORT_STAGES) else "",
+            "stage_index": self.stage_index,
+            "stage_rows": self.stage_rows,
+            "processed_rows": self.processed_rows,
+            "total_rows": self.total_rows,
+            "imported_rows": self.imported_rows,
+            "skipped_rows": self.skipped_rows,
+            "percent": round(self.processed_rows * 100 / self.total_rows, 1) if self.total_rows else 100.0,
+            "rows_per_second": round(rate, 1),
+            "eta_seconds": int(remaining / rate) if rate > 0 else None,
+            "started_at": self.started_at,
+            "updated_at": timezone.localtime().isoformat(),
+            "resumed": self.resumed,
+            **extra,
+        }
+
+    def save(self, **extra):
+        self.import_job.metadata = {
+            **(self.import_job.metadata or {}),
+            "import_progress": self.as_dict(**extra),
+        }
+        # queryset update: jangan menimpa status (mis. cancelled) dari request lain
+        ImportJob.objects.filter(pk=self.import_job.pk).update(
+            metadata=self.import_job.metadata,
+            imported_rows=self.imported_rows,
+            skipped_rows=self.skipped_rows,
+        )
+
+
+def _raise_if_cancelled(import_job: ImportJob):
+    if ImportJob.objects.filter(pk=import_job.pk, status=ImportJob.Status.CANCELLED).exists():
+        raise ImportCancelled()
+
+
+# ---------------------------------------------------------
+# chunk handlers: (ctx, rows) -> (imported, skipped)
+# ---------------------------------------------------------
+def _import_named_rows(rows, *, model, lookup: dict, build, ignore_conflicts=True):
+    to_create = []
+    skipped = 0
+
+    for data in rows:
+        name = _safe_str(data.get("name"))
+        if not name:
+            skipped += 1
+            continue
 
-    imported_rows = 0
-    skipped_rows = 0
+        key = name.lower()
+        if key in lookup:
+            skipped += 1
+            continue
 
-    # =====================================================
-    # PRELOAD EXISTING DATA
-    # =====================================================
-    existing_categories = {
-        obj.name.strip().lower(): obj
-        for obj in Category.objects.filter(shop=shop)
-        if obj.name
-    }
-    existing_units = {
-        obj.name.strip().lower(): obj
-        for obj in Unit.objects.filter(shop=shop)
-        if obj.name
-    }
-    existing_suppliers = {
-        obj.name.strip().lower(): obj
-        for obj in Supplier.objects.filter(shop=shop)
-        if obj.name
-    }
-    existing_customers = {
-        obj.name.strip().lower(): obj
-        for obj in Customer.objects.filter(shop=shop)
-        if obj.name
-    }
-    existing_products = {
-        obj.code.strip().lower(): obj
-        for obj in Product.objects.filter(shop=shop)
-        if obj.code
-    }
+        lookup[key] = None
+        to_create.append(build(name, data))
 
-    # =====================================================
-    # CATEGORIES - BULK CREATE
-    # =====================================================
-    category_to_create = []
-    if "Categories" in wb.sheetnames:
-        ws = wb["Categories"]
-        headers = _sheet_headers(ws)
-
-        if headers == TEMPLATE_SHEETS["Categories"]:
-            seen_in_file = set()
-
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                if _is_blank_row(row):
-                    continue
-
-                data = _row_to_dict(headers, row)
-                name = _safe_str(data.get("name"))
-                if not name:
-                    skipped_rows += 1
-                    continue
-
-                key = name.lower()
-                if key in existing_categories or key in seen_in_file:
-                    skipped_rows += 1
-                    continue
-
-                seen_in_file.add(key)
-                category_to_create.append(Category(shop=shop, name=name))
-
-            if category_to_create:
-                Category.objects.bulk_create(category_to_create, batch_size=1000)
-                imported_rows += len(category_to_create)
-
-            existing_categories = {
-                obj.name.strip().lower(): obj
-                for obj in Category.objects.filter(shop=shop)
-                if obj.name
-            }
+    if to_create:
+        # ON CONFLICT DO NOTHING: row existing tetap di-skip, tidak di-update
+        model.objects.bulk_create(to_create, batch_size=1000, ignore_conflicts=ignore_conflicts)
 
-    # =====================================================
-    # UNITS - BULK CREATE
-    # =====================================================
-    unit_to_create = []
-    if "Units" in wb.sheetnames:
-        ws = wb["Units"]
-        headers = _sheet_headers(ws)
-
-        if headers == TEMPLATE_SHEETS["Units"]:
-            seen_in_file = set()
-
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                if _is_blank_row(row):
-                    continue
-
-                data = _row_to_dict(headers, row)
-                name = _safe_str(data.get("name"))
-                if not name:
-                    skipped_rows += 1
-                    continue
-
-                key = name.lower()
-                if key in existing_units or key in seen_in_file:
-                    skipped_rows += 1
-                    continue
-
-                seen_in_file.add(key)
-                unit_to_create.append(Unit(shop=shop, name=name))
-
-            if unit_to_create:
-                Unit.objects.bulk_create(unit_to_create, batch_size=1000)
-                imported_rows += len(unit_to_create)
-
-            existing_units = {
-                obj.name.strip().lower(): obj
-                for obj in Unit.objects.filter(shop=shop)
-                if obj.name
-            }
+    return len(to_create), skipped
 
-    # =====================================================
-    # SUPPLIERS - BULK CREATE
-    # =====================================================
-    supplier_to_create = []
-    if "Suppliers" in wb.sheetnames:
-        ws = wb["Suppliers"]
-        headers = _sheet_headers(ws)
-
-        if headers == TEMPLATE_SHEETS["Suppliers"]:
-            seen_in_file = set()
-
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                if _is_blank_row(row):
-                    continue
-
-                data = _row_to_dict(headers, row)
-                name = _safe_str(data.get("name"))
-                if not name:
-                    skipped_rows += 1
-                    continue
-
-                key = name.lower()
-                if key in existing_suppliers or key in seen_in_file:
-                    skipped_rows += 1
-                    continue
-
-                seen_in_file.add(key)
-                supplier_to_create.append(
-                    Supplier(
-                        shop=shop,
-                        name=name,
-                        contact_person=_safe_str(data.get("contact_person")),
-                        cell=_safe_str(data.get("cell")),
-                        email=_safe_str(data.get("email")) or None,
-                        address=_safe_str(data.get("address")),
-                    )
-                )
 
-            if supplier_to_create:
-                Supplier.objects.bulk_create(supplier_to_create, batch_size=1000)
-                imported_rows += len(supplier_to_create)
+def _import_category_rows(ctx: ImportContext, rows):
+    return _import_named_rows(
+        rows,
+        model=Category,
+        lookup=ctx.categories,
+        build=lambda name, data: Category(shop=ctx.shop, name=name),
+    )
 
-            existing_suppliers = {
-                obj.name.strip().lower(): obj
-                for obj in Supplier.objects.filter(shop=shop)
-                if obj.name
-            }
 
-    # =====================================================
-    # CUSTOMERS - BULK CREATE
-    # =====================================================
-    customer_to_create = []
-    if "Customers" in wb.sheetnames:
-        ws = wb["Customers"]
-        headers = _sheet_headers(ws)
-
-        if headers == TEMPLATE_SHEETS["Customers"]:
-            seen_in_file = set()
-
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                if _is_blank_row(row):
-                    continue
-
-                data = _row_to_dict(headers, row)
-                name = _safe_str(data.get("name"))
-                if not name:
-                    skipped_rows += 1
-                    continue
-
-                key = name.lower()
-                if key in existing_customers or key in seen_in_file:
-                    skipped_rows += 1
-                    continue
-
-                seen_in_file.add(key)
-                customer_to_create.append(
-                    Customer(
-                        shop=shop,
-                        name=name,
-                        cell=_safe_str(data.get("cell")),
-                        email=_safe_str(data.get("email")) or None,
-                        address=_safe_str(data.get("address")),
-                        points=_safe_int(data.get("points"), default=0),
-                    )
-                )
+def _import_unit_rows(ctx: ImportContext, rows):
+    return _import_named_rows(
+        rows,
+        model=Unit,
+        lookup=ctx.units,
+        build=lambda name, data: Unit(shop=ctx.shop, name=name),
+    )
 
-            if customer_to_create:
-                Customer.objects.bulk_create(customer_to_create, batch_size=1000)
-                imported_rows += len(customer_to_create)
 
-            existing_customers = {
-                obj.name.strip().lower(): obj
-                for obj in Customer.objects.filter(shop=shop)
-                if obj.name
-            }
+def _import_supplier_rows(ctx: ImportContext, rows):
+    return _import_named_rows(
+        rows,
+        model=Supplier,
+        lookup=ctx.suppliers,
+        build=lambda name, data: Supplier(
+            shop=ctx.shop,
+            name=name,
+            contact_person=_safe_str(data.get("contact_person")),
+            cell=_safe_str(data.get("cell")),
+            email=_safe_str(data.get("email")) or None,
+            address=_safe_str(data.get("address")),
+        ),
+    )
 
-    # refresh references after master import
-    category_map = existing_categories
-    unit_map = existing_units
-    supplier_map = existing_suppliers
-    product_map = existing_products.copy()
-
-    # =====================================================
-    # PRODUCTS - BULK CREATE + BULK UPDATE
-    # =====================================================
-    products_to_create = []
-    products_to_update = []
-    seen_product_codes = set()
-
-    if "Products" in wb.sheetnames:
-        ws = wb["Products"]
-        headers = _sheet_headers(ws)
-
-        if headers == TEMPLATE_SHEETS["Products"]:
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                if _is_blank_row(row):
-                    continue
-
-                data = _row_to_dict(headers, row)
-
-                code = _safe_str(data.get("code"))
-                name = _safe_str(data.get("name"))
-                if not code or not name:
-                    skipped_rows += 1
-                    continue
-
-                code_key = code.lower()
-
-                # hindari duplikat code dalam file yang sama
-                if code_key in seen_product_codes:
-                    skipped_rows += 1
-                    continue
-                seen_product_codes.add(code_key)
-
-                category_name = _safe_str(data.get("category")).lower()
-                unit_name = _safe_str(data.get("unit")).lower()
-                supplier_name = _safe_str(data.get("supplier")).lower()
-
-                category = category_map.get(category_name) if category_name else None
-                unit = unit_map.get(unit_name) if unit_name else None
-                supplier = supplier_map.get(supplier_name) if supplier_name else None
-
-                prepared = {
-                    "name": name,
-                    "sku": _safe_str(data.get("sku")) or None,
-                    "item_type": _safe_str(data.get("item_type")).lower() or "product",
-                    "category": category,
-                    "unit": unit,
-                    "supplier": supplier,
-                    "description": _safe_str(data.get("description")),
-                    "stock": _safe_int(data.get("stock"), default=0),
-                    "track_stock": _safe_bool(data.get("track_stock"), default=True),
-                    "buy_price": _safe_decimal(data.get("buy_price"), default=0),
-                    "sell_price": _safe_decimal(data.get("sell_price"), default=0),
-                    "weight": 0,
-                    "is_active": _safe_bool(data.get("is_active"), default=True),
-                }
-
-                existing = product_map.get(code_key)
-                if existing:
-                    existing.name = prepared["name"]
-                    existing.sku = prepared["sku"]
-                    existing.item_type = prepared["item_type"]
-                    existing.category = prepared["category"]
-                    existing.unit = prepared["unit"]
-                    existing.supplier = prepared["supplier"]
-                    existing.description = prepared["description"]
-                    existing.track_stock = prepared["track_stock"]
-                    existing.buy_price = prepared["buy_price"]
-                    existing.sell_price = prepared["sell_price"]
-                    existing.is_active = prepared["is_active"]
-                    products_to_update.append(existing)
-                else:
-                    products_to_create.append(
-                        Product(
-                            shop=shop,
-                            code=code,
-                            name=prepared["name"],
-                            sku=prepared["sku"],
-                            item_type=prepared["item_type"],
-                            category=prepared["category"],
-                            unit=prepared["unit"],
-                            supplier=prepared["supplier"],
-                            description=prepared["description"],
-                            stock=prepared["stock"],
-                            track_stock=prepared["track_stock"],
-                            buy_price=prepared["buy_price"],
-                            sell_price=prepared["sell_price"],
-                            weight=prepared["weight"],
-                            is_active=prepared["is_active"],
-                        )
-                    )
 
-            if products_to_create:
-                Product.objects.bulk_create(products_to_create, batch_size=1000)
-                imported_rows += len(products_to_create)
-
-            if products_to_update:
-                Product.objects.bulk_update(
-                    products_to_update,
-                    fields=[
-                        "name",
-                        "sku",
-                        "item_type",
-                        "category",
-                        "unit",
-                        "supplier",
-                        "description",
-                        "track_stock",
-                        "buy_price",
-                        "sell_price",
-                        "is_active",
-                    ],
-                    batch_size=1000,
-                )
-                imported_rows += len(products_to_update)
+def _import_customer_rows(ctx: ImportContext, rows):
+    return _import_named_rows(
+        rows,
+        model=Customer,
+        lookup=ctx.customers,
+        ignore_conflicts=False,
+        build=lambda name, data: Customer(
+            shop=ctx.shop,
+            name=name,
+            cell=_safe_str(data.get("cell")),
+            email=_safe_str(data.get("email")) or None,
+            address=_safe_str(data.get("address")),
+            points=_safe_int(data.get("points"), default=0),
+        ),
+    )
 
-            product_map = {
-                obj.code.strip().lower(): obj
-                for obj in Product.objects.filter(shop=shop)
-                if obj.code
-            }
 
-    # =====================================================
-    # OPENING STOCK - BULK UPDATE + BULK MOVEMENTS
-    # =====================================================
+def _import_product_rows(ctx: ImportContext, rows):
+    products = []
+    skipped = 0
+
+    for data in rows:
+        code = _safe_str(data.get("code"))
+        name = _safe_str(data.get("name"))
+        if not code or not name:
+            skipped += 1
+            continue
+
+        code_key = code.lower()
+
+        # hindari duplikat code dalam file yang sama
+        if code_key in ctx.seen_product_codes:
+            skipped += 1
+            continue
+        ctx.seen_product_codes.add(code_key)
+
+        category_name = _safe_str(data.get("category")).lower()
+        unit_name = _safe_str(data.get("unit")).lower()
+        supplier_name = _safe_str(data.get("supplier")).lower()
+
+        products.append(
+            Product(
+                shop=ctx.shop,
+                code=ctx.products.get(code_key) or code,
+                name=name,
+                sku=_safe_str(data.get("sku")) or None,
+                item_type=_safe_str(data.get("item_type")).lower() or "product",
+                category_id=ctx.categories.get(category_name) if category_name else None,
+                unit_id=ctx.units.get(unit_name) if unit_name else None,
+                supplier_id=ctx.suppliers.get(supplier_name) if supplier_name else None,
+                description=_safe_str(data.get("description")),
+                # stock & weight hanya dipakai saat insert; update tidak menyentuhnya
+                stock=_safe_int(data.get("stock"), default=0),
+                track_stock=_safe_bool(data.get("track_stock"), default=True),
+                buy_price=_safe_decimal(data.get("buy_price"), default=0),
+                sell_price=_safe_decimal(data.get("sell_price"), default=0),
+                weight=0,
+                is_active=_safe_bool(data.get("is_active"), default=True),
+            )
+        )
+
+    if products:
+        Product.objects.bulk_create(
+            products,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["shop", "code"],
+            update_fields=PRODUCT_IMPORT_UPDATE_FIELDS,
+        )
+
+    return len(products), skipped
+
+
+def _import_opening_stock_rows(ctx: ImportContext, rows):
     stock_products_to_update = []
     stock_movements_to_create = []
-    touched_product_ids = set()
-
-    if "OpeningStock" in wb.sheetnames:
-        ws = wb["OpeningStock"]
-        headers = _sheet_headers(ws)
-
-        if headers == TEMPLATE_SHEETS["OpeningStock"]:
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                if _is_blank_row(row):
-                    continue
-
-                data = _row_to_dict(headers, row)
-                product_code = _safe_str(data.get("product_code")).lower()
-                qty = _safe_int(data.get("quantity"), default=0)
-
-                if not product_code:
-                    skipped_rows += 1
-                    continue
-
-                product = product_map.get(product_code)
-                if not product:
-                    skipped_rows += 1
-                    continue
-
-                before_stock = product.stock
-                after_stock = qty
-
-                if before_stock == after_stock:
-                    skipped_rows += 1
-                    continue
-
-                # hindari product yang sama diupdate berulang di file opening stock
-                if product.id in touched_product_ids:
-                    skipped_rows += 1
-                    continue
-
-                touched_product_ids.add(product.id)
-                product.stock = after_stock
-                stock_products_to_update.append(product)
-
-                stock_movements_to_create.append(
-                    StockMovement(
-                        shop=shop,
-                        product=product,
-                        movement_type=StockMovement.Type.ADJUSTMENT,
-                        quantity_delta=after_stock - before_stock,
-                        before_stock=before_stock,
-                        after_stock=after_stock,
-                        note=f"Opening stock import #{import_job.id}",
-                        ref_model="ImportJob",
-                        ref_id=import_job.id,
-                        created_by=import_job.uploaded_by,
-                    )
-                )
-                imported_rows += 1
+    skipped = 0
 
-            if stock_products_to_update:
-                Product.objects.bulk_update(
-                    stock_products_to_update,
-                    fields=["stock"],
-                    batch_size=1000,
-                )
+    for data in rows:
+        product_code = _safe_str(data.get("product_code")).lower()
+        qty = _safe_int(data.get("quantity"), default=0)
+
+        if not product_code:
+            skipped += 1
+            continue
+
+        product = ctx.products.get(product_code)
+        if not product:
+            skipped += 1
+            continue
+
+        product_id, before_stock = product
+        after_stock = qty
+
+        if before_stock == after_stock:
+            skipped += 1
+            continue
+
+        # hindari product yang sama diupdate berulang di file opening stock
+        if product_id in ctx.touched_product_ids:
+            skipped += 1
+            continue
+
+        ctx.touched_product_ids.add(product_id)
+        product[1] = after_stock
+        stock_products_to_update.append(Product(pk=product_id, stock=after_stock))
+
+        stock_movements_to_create.append(
+            StockMovement(
+                shop=ctx.shop,
+                product_id=product_id,
+                movement_type=StockMovement.Type.ADJUSTMENT,
+                quantity_delta=after_stock - before_stock,
+                before_stock=before_stock,
+                after_stock=after_stock,
+                note=f"Opening stock import #{ctx.import_job.id}",
+                ref_model="ImportJob",
+                ref_id=ctx.import_job.id,
+                created_by=ctx.import_job.uploaded_by,
+            )
+        )
+
+    if stock_products_to_update:
+        Product.objects.bulk_update(
+            stock_products_to_update,
+            fields=["stock"],
+            batch_size=1000,
+        )
+
+    if stock_movements_to_create:
+        StockMovement.objects.bulk_create(stock_movements_to_create, batch_size=1000)
+
+    return len(stock_movements_to_create), skipped
+
+
+IMPORT_STAGE_HANDLERS = {
+    "Categories": _import_category_rows,
+    "Units": _import_unit_rows,
+    "Suppliers": _import_supplier_rows,
+    "Customers": _import_customer_rows,
+    "Products": _import_product_rows,
+    "OpeningStock": _import_opening_stock_rows,
+}
+
+
+def run_import(
+    import_job: ImportJob,
+    *,
+    confirm_import: bool,
+    skip_backup_check: bool = False,
+    resume: bool = False,
+):
+    if not confirm_import:
+        raise ValueError("Import confirmation is required.")
+
+    allowed_statuses = {
+        ImportJob.Status.VALIDATED,
+        ImportJob.Status.UPLOADED,
+        ImportJob.Status.QUEUED,
+    }
+    if resume:
+        allowed_statuses.add(ImportJob.Status.IMPORTING)
+
+    if import_job.status not in allowed_statuses:
+        raise ValueError("Import job must be uploaded or validated before import.")
+
+    queued_from = ((import_job.metadata or {}).get("import_request") or {}).get("queued_from")
+    if import_job.status == ImportJob.Status.UPLOADED or (
+        import_job.status == ImportJob.Status.QUEUED and queued_from == ImportJob.Status.UPLOADED
+    ):
+        validate_import_workbook(import_job)
+
+    if import_job.row_errors.exists():
+        raise ValueError("Import cannot continue because invalid rows still exist.")
+
+    if not skip_backup_check and not _latest_successful_backup_exists(import_job.shop):
+        raise ValueError("No recent successful backup found. Please create a backup before import.")
+
+    manifest = load_row_cache(import_job)
+    progress = ImportProgress(import_job, manifest, resume=resume)
+    ctx = ImportContext(import_job)
+
+    if not import_job.mark_importing():
+        raise ImportCancelled()
+
+    for stage_index, sheet_name in enumerate(IMPORT_STAGES):
+        offset = progress.start_offset(stage_index)
+        if offset is None or not _has_template_sheet(manifest, sheet_name):
+            continue
+
+        ctx.begin_stage(sheet_name)
+        handler = IMPORT_STAGE_HANDLERS[sheet_name]
+        rows = islice(_iter_template_rows(manifest, sheet_name), offset, None)
 
-            if stock_movements_to_create:
-                StockMovement.objects.bulk_create(stock_movements_to_create, batch_size=1000)
+        for chunk in _chunked(rows):
+            _raise_if_cancelled(import_job)
 
+            with transaction.atomic():
+                imported, skipped = handler(ctx, chunk)
+                progress.advance(stage_index, len(chunk), imported, skipped)
+                progress.save()
+
+    # UPDATE bersyarat: cancel yang masuk setelah cek chunk terakhir tidak ditimpa COMPLETED
     import_job.mark_completed(
-        imported_rows=imported_rows,
-        skipped_rows=skipped_rows,
+        imported_rows=progress.imported_rows,
+        skipped_rows=progress.skipped_rows,
         note="Master data import completed successfully.",
         metadata={
             **(import_job.metadata or {}),
+            "import_progress": progress.as_dict(stage_index=len(IMPORT_STAGES), stage_rows=0),
             "imported_at": timezone.localtime().isoformat(),
         },
     )
 
-    return import_job
\ No newline at end of file
+    return import_job
+
+
+# =========================================================
+# BACKGROUND IMPORT
+# =========================================================
+def queue_import(import_job: ImportJob, *, confirm_import: bool, skip_backup_check: bool = False):
+    if not confirm_import:
+        raise ValueError("Import confirmation is required.")
+
+    if import_job.is_running:
+        raise ValueError("Import job is already queued or running.")
+
+    if import_job.status not in {ImportJob.Status.VALIDATED, ImportJob.Status.UPLOADED}:
+        raise ValueError("Import job must be uploaded or validated before import.")
+
+    if not skip_backup_check and not _latest_successful_backup_exists(import_job.shop):
+        raise ValueError("No recent successful backup found. Please create a backup before import.")
+
+    metadata = {
+        **(import_job.metadata or {}),
+        "import_request": {
+            "queued_at": timezone.localtime().isoformat(),
+            "queued_from": import_job.status,
+        },
+    }
+    metadata.pop("import_progress", None)
+    import_job.mark_queued(metadata=metadata)
+
+    submit_job(run_import_job, import_job.id)
+    return import_job
+
+
+def run_import_job(import_job_id: int, *, resume: bool = False):
+    """
+    Entry point worker: jalankan (atau lanjutkan) import satu job.
+    """
+    import_job = (
+        ImportJob.objects
+        .select_related("shop", "uploaded_by")
+        .filter(pk=import_job_id)
+        .first()
+    )
+    if not import_job or import_job.status == ImportJob.Status.CANCELLED:
+        return import_job
+
+    try:
+        run_import(import_job, confirm_import=True, skip_backup_check=True, resume=resume)
+    except ImportCancelled:
+        cancelled_at = timezone.localtime().isoformat()
+        progress = {**((import_job.metadata or {}).get("import_progress") or {}), "cancelled_at": cancelled_at}
+        ImportJob.objects.filter(pk=import_job.pk).update(
+            metadata={**(import_job.metadata or {}), "import_progress": progress},
+            note=(
+                f"Import cancelled after {progress.get('processed_rows', 0)} rows. "
+                "Rows committed before cancellation are kept."
+            ),
+        )
+        import_job.refresh_from_db()
+    except Exception as e:
+        logger.exception("Import job #%s failed", import_job_id)
+        import_job.mark_failed(str(e))
+
+    return import_job
+
+
+def cancel_import(import_job: ImportJob):
+    if not import_job.is_running:
+        raise ValueError("Only queued or running imports can be cancelled.")
+
+    ImportJob.objects.filter(
+        pk=import_job.pk,
+        status__in=[ImportJob.Status.QUEUED, ImportJob.Status.IMPORTING],
+    ).update(
+        status=ImportJob.Status.CANCELLED,
+        completed_at=timezone.now(),
+    )
+    import_job.refresh_from_db()
+    return import_job
+
+
+def resumable_import_jobs():
+    return ImportJob.objects.filter(
+        status__in=[ImportJob.Status.QUEUED, ImportJob.Status.IMPORTING],
+    ).order_by("created_at", "id")
@@ -0,0 +1,51 @@
+# pos/services/job_runner.py
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(getattr(settings, "BACKGROUND_JOB_WORKERS", 2) or 1)),
+                    thread_name_prefix="pos-job",
+                )
+    return _executor
+
+
+def _run_job(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background job %s failed", getattr(func, "__name__", func))
+    finally:
+        # thread worker dipakai ulang, jangan biarkan koneksi DB menggantung
+        connections.close_all()
+
+
+def submit_job(func, *args, **kwargs):
+    """
+    Jalankan job di worker lokal setelah transaksi saat ini commit.
+
+    Job harus menerima id (bukan instance model) dan me-load ulang datanya
+    sendiri, karena dijalankan di thread dengan koneksi DB terpisah.
+    """
+    if getattr(settings, "BACKGROUND_JOBS_EAGER", False):
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return
+
+    transaction.on_commit(lambda: _get_executor().submit(_run_job, func, args, kwargs))
@@ -0,0 +1,207 @@
+# pos/services/owner_chat_log_service.py
+
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from pos.models import OwnerChatIntentDaily, OwnerChatLog
+from pos.services.job_runner import submit_job
+
+
+logger = logging.getLogger(__name__)
+
+LOG_TEXT_MAX_CHARS = 4000
+COMPACT_BATCH_SIZE = 5000
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# =========================================================
+# BUFFERED WRITER
+# =========================================================
+def _write_logs(entries):
+    OwnerChatLog.objects.bulk_create(entries, batch_size=500)
+
+
+class ChatLogBuffer:
+    """
+    Log chat dikumpulkan di memori proses lalu di-bulk insert:
+    - saat buffer mencapai OWNER_CHAT_LOG_BUFFER_SIZE entry, atau
+    - paling lambat OWNER_CHAT_LOG_FLUSH_SECONDS setelah entry pertama masuk.
+    Insert jalan di job runner, bukan di request. Sisa buffer ditulis saat proses berhenti.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, entry: OwnerChatLog):
+        size = int(_setting("OWNER_CHAT_LOG_BUFFER_SIZE", 50) or 0)
+        if size <= 1:
+            submit_job(_write_logs, [entry])
+            return
+
+        with self._lock:
+            self._entries.append(entry)
+            full = len(self._entries) >= size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(float(_setting("OWNER_CHAT_LOG_FLUSH_SECONDS", 5)), self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if full:
+            self.flush()
+
+    def _take(self):
+        with self._lock:
+            entries, self._entries = self._entries, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return entries
+
+    def flush(self):
+        entries = self._take()
+        if entries:
+            submit_job(_write_logs, entries)
+
+    def flush_now(self):
+        """Tulis langsung di thread ini (shutdown / test)."""
+        entries = self._take()
+        if entries:
+            _write_logs(entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+chat_log_buffer = ChatLogBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        chat_log_buffer.flush_now()
+    except Exception:
+        logger.exception("Owner chat log flush on exit failed")
+
+
+def log_chat(*, user, shop=None, message: str, response: str, source: str, intent: str = ""):
+    """Catat satu pertanyaan + jawaban (non-blocking)."""
+    if not getattr(user, "pk", None):
+        return
+
+    chat_log_buffer.add(OwnerChatLog(
+        user_id=user.pk,
+        shop_id=getattr(shop, "pk", None) or getattr(user, "shop_id", None),
+        message=(message or "")[:LOG_TEXT_MAX_CHARS],
+        response=(response or "")[:LOG_TEXT_MAX_CHARS],
+        source=(source or "")[:20],
+        intent=(intent or "")[:50],
+        created_at=timezone.now(),
+    ))
+
+
+# =========================================================
+# RETENTION / COMPACTION
+# =========================================================
+def owner_chat_log_retention_days() -> int:
+    return int(_setting("OWNER_CHAT_LOG_RETENTION_DAYS", 30))
+
+
+def compact_cutoff(days=None):
+    """Awal hari lokal (hari ini - days): log sebelum ini dipadatkan."""
+    days = owner_chat_log_retention_days() if days is None else days
+    day = timezone.localdate() - timedelta(days=days)
+    return timezone.make_aware(datetime.combine(day, dt_time.min), timezone.get_current_timezone())
+
+
+def compact_owner_chat_logs(days=None, *, batch_size: int = COMPACT_BATCH_SIZE) -> dict:
+    """
+    Log lebih tua dari `days` hari -> jumlah per (shop, tanggal lokal, source, intent)
+    di OwnerChatIntentDaily, lalu raw log dihapus. Diproses per batch supaya
+    transaksi tetap kecil; aman dijalankan berulang (count ditambah, bukan ditimpa).
+    """
+    cutoff = compact_cutoff(days)
+    compacted = 0
+    started = time.monotonic()
+
+    while True:
+        with transaction.atomic():
+            ids = list(
+                OwnerChatLog.objects.filter(created_at__lt=cutoff)
+                .order_by("created_at", "id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            rows = (
+                OwnerChatLog.objects.filter(id__in=ids)
+                .annotate(day=TruncDate("created_at"))
+                .values("shop_id", "day", "source", "intent")
+                .annotate(n=Count("id"))
+                .order_by()
+            )
+            for row in rows:
+                key = {
+                    "shop_id": row["shop_id"],
+                    "date": row["day"],
+                    "source": row["source"],
+                    "intent": row["intent"],
+                }
+                updated = OwnerChatIntentDaily.objects.filter(**key).update(count=F("count") + row["n"])
+                if not updated:
+                    OwnerChatIntentDaily.objects.create(count=row["n"], **key)
+
+            OwnerChatLog.objects.filter(id__in=ids).delete()
+            compacted += len(ids)
+
+    return {
+        "cutoff": cutoff,
+        "compacted": compacted,
+        "seconds": round(time.monotonic() - started, 3),
+    }
+
+
+def popular_intents(*, shop_id=None, start=None, end=None, limit: int = 10) -> list:
+    """
+    Intent terbanyak di [start, end] (tanggal lokal): hari yang sudah dipadatkan dari
+    OwnerChatIntentDaily, hari yang masih raw dari index (shop, created_at).
+    """
+    totals = {}
+
+    daily = OwnerChatIntentDaily.objects.all()
+    raw = OwnerChatLog.objects.all()
+    if shop_id:
+        daily = daily.filter(shop_id=shop_id)
+        raw = raw.filter(shop_id=shop_id)
+    if start:
+        daily = daily.filter(date__gte=start)
+        raw = raw.filter(created_at__gte=timezone.make_aware(
+            datetime.combine(start, dt_time.min), timezone.get_current_timezone()
+        ))
+    if end:
+        daily = daily.filter(date__lte=end)
+        raw = raw.filter(created_at__lt=timezone.make_aware(
+            datetime.combine(end + timedelta(days=1), dt_time.min), timezone.get_current_timezone()
+        ))
+
+    for row in daily.values("intent").annotate(n=Sum("count")).order_by():
+        totals[row["intent"]] = totals.get(row["intent"], 0) + (row["n"] or 0)
+    for row in raw.values("intent").annotate(n=Count("id")).order_by():
+        totals[row["intent"]] = totals.get(row["intent"], 0) + row["n"]
+
+    ranked = sorted(totals.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+    return [{"intent": intent or "-", "count": count} for intent, count in ranked]
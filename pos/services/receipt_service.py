@@ -0,0 +1,493 @@
+# pos/services/receipt_service.py
+
+import hashlib
+import io
+import json
+import logging
+import os
+import textwrap
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils import timezone
+from reportlab.lib.utils import ImageReader, simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from xhtml2pdf import pisa
+
+from pos.models import Order
+
+
+logger = logging.getLogger(__name__)
+
+# Naikkan kalau layout receipt berubah -> semua PDF lama di cache otomatis tidak terpakai.
+RECEIPT_LAYOUT_VERSION = 1
+
+# Label + ikon per order type. "icon" untuk HTML (unicode),
+# "text_icon" untuk output yang hanya punya font/codepage terbatas (PDF Courier, printer thermal).
+TYPE_META = {
+    "DINE_IN": {"label": "DINE IN", "icon": "■■", "text_icon": "##"},
+    "TAKE_OUT": {"label": "TAKE OUT", "icon": "■", "text_icon": "#"},
+    "DELIVERY": {"label": "DELIVERY", "icon": "▲", "text_icon": "^"},
+    "GENERAL": {"label": "GENERAL", "icon": "•", "text_icon": "*"},
+}
+
+RECEIPT_FOOTER = "Obrigado ba order ona iha!"
+
+
+def receipt_order_queryset():
+    return Order.objects.prefetch_related(
+        "items__product", "items__weight_unit"
+    ).select_related(
+        "served_by", "shop"
+    )
+
+
+def type_meta(order_type):
+    return TYPE_META.get(order_type) or {
+        "label": order_type or "-",
+        "icon": "•",
+        "text_icon": "*",
+    }
+
+
+# =========================================================
+# RECEIPT DATA
+# =========================================================
+def build_receipt_items(order):
+    receipt_items = []
+    for item in order.items.all():
+        unit_price = item.price or 0
+        qty = item.quantity or 0
+        meta = type_meta(item.order_type)
+
+        receipt_items.append({
+            "name": item.product.name if item.product else "-",
+            "qty": qty,
+            "unit_price": unit_price,
+            "line_total": qty * unit_price,
+            "order_type": meta["label"],
+            "order_type_icon": meta["icon"],
+            "order_type_text_icon": meta["text_icon"],
+        })
+    return receipt_items
+
+
+def build_receipt(order):
+    """
+    Semua data yang tampil di receipt, sudah dalam bentuk siap cetak.
+    Dipakai oleh semua renderer (PDF reportlab, HTML/xhtml2pdf, ESC/POS, text).
+    """
+    shop = order.shop
+    served_by = order.served_by
+    return {
+        "shop": {
+            "name": shop.name if shop else "",
+            "address": (shop.address or "") if shop else "",
+            "phone": (shop.phone or "") if shop else "",
+            "logo": shop.logo.name if shop and shop.logo else "",
+        },
+        "order_no": f"INV{order.id:015d}",
+        "cashier": served_by.username if served_by else "",
+        "date": timezone.localtime(order.created_at).strftime("%d/%m/%y %H:%M") if order.created_at else "",
+        "table_number": order.table_number or "",
+        "delivery_address": order.delivery_address or "",
+        "items": build_receipt_items(order),
+        "subtotal": order.subtotal or Decimal("0"),
+        "discount": order.discount or Decimal("0"),
+        "tax": order.tax or Decimal("0"),
+        "delivery_fee": order.delivery_fee or Decimal("0"),
+        "total": order.total or Decimal("0"),
+    }
+
+
+def receipt_marker(receipt) -> str:
+    """
+    Order tidak punya updated_at, jadi penanda versinya adalah digest dari isi receipt:
+    item/harga/total/shop berubah -> marker berubah -> cache lama tidak dipakai lagi.
+    """
+    raw = json.dumps(receipt, default=str, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def money(value) -> str:
+    return f"${Decimal(value or 0):.2f}"
+
+
+# =========================================================
+# RENDERER: REPORTLAB (direct drawing)
+# =========================================================
+# Layout sama dengan pos/order_receipt.html: kertas 58mm (164pt), margin 6pt, Courier.
+PAPER_WIDTH = 164
+PAPER_MARGIN = 6
+CONTENT_WIDTH = PAPER_WIDTH - 2 * PAPER_MARGIN
+FONT = "Courier"
+FONT_BOLD = "Courier-Bold"
+FONT_SIZE = 9.5
+FONT_SIZE_SMALL = 8.5
+FONT_SIZE_GRAND = 12.5
+LOGO_WIDTH = 75
+# Template HTML memotong garis 42 "-" dengan overflow:hidden; di sini langsung sepanjang kertas.
+SEPARATOR = "-" * int(CONTENT_WIDTH // stringWidth("-", FONT, FONT_SIZE))
+
+_LOGO_CACHE = {}
+_LOGO_CACHE_MAX = 32
+
+
+def _logo_reader(shop):
+    """ImageReader logo per file; dibaca sekali dari storage lalu disimpan di memori proses."""
+    name = shop.logo.name if shop and shop.logo else ""
+    if not name:
+        return None
+
+    if name in _LOGO_CACHE:
+        return _LOGO_CACHE[name]
+
+    reader = None
+    try:
+        with shop.logo.storage.open(name, "rb") as fh:
+            reader = ImageReader(io.BytesIO(fh.read()))
+    except Exception:
+        logger.warning("Receipt logo %s could not be loaded", name, exc_info=True)
+
+    if len(_LOGO_CACHE) >= _LOGO_CACHE_MAX:
+        _LOGO_CACHE.clear()
+    _LOGO_CACHE[name] = reader
+    return reader
+
+
+def _pdf_text(value) -> str:
+    # Font standar PDF hanya cp1252; karakter lain diganti "?" daripada jadi kotak hitam.
+    return str(value or "").encode("cp1252", "replace").decode("cp1252")
+
+
+def _receipt_lines(receipt, logo):
+    """
+    Susun receipt menjadi daftar baris (jenis, data, tinggi).
+    Tinggi kertas dihitung dari sini sebelum menggambar.
+    """
+    lines = []
+
+    def leading(size, pad=2):
+        return size * 1.2 + pad
+
+    def center(text, font=FONT, size=FONT_SIZE):
+        for part in simpleSplit(_pdf_text(text), font, size, CONTENT_WIDTH) or [""]:
+            lines.append(("center", (part, font, size), leading(size, 0)))
+
+    def pair(left, right, font=FONT, size=FONT_SIZE, pad=2):
+        right = _pdf_text(right)
+        right_width = stringWidth(right, font, size) if right else 0
+        if right_width > CONTENT_WIDTH * 2 / 3:
+            # value panjang (mis. alamat delivery): label di satu baris, value di bawahnya rata kanan
+            lines.append(("pair", (_pdf_text(left), "", font, size), leading(size, pad)))
+            for part in simpleSplit(right, font, size, CONTENT_WIDTH):
+                lines.append(("pair", ("", part, font, size), leading(size, 0)))
+            return
+        left_width = max(CONTENT_WIDTH - right_width - 4, CONTENT_WIDTH / 3)
+        parts = simpleSplit(_pdf_text(left), font, size, left_width) or [""]
+        lines.append(("pair", (parts[0], right, font, size), leading(size, pad)))
+        for part in parts[1:]:
+            lines.append(("pair", (part, "", font, size), leading(size, 0)))
+
+    def separator():
+        lines.append(("left", (SEPARATOR, FONT, FONT_SIZE), leading(FONT_SIZE, 8)))
+
+    if logo is not None:
+        img_w, img_h = logo.getSize()
+        height = LOGO_WIDTH * img_h / img_w if img_w else 0
+        if height:
+            lines.append(("image", logo, height + 6))
+
+    shop = receipt["shop"]
+    center(shop["name"], FONT_BOLD)
+    if shop["address"]:
+        center(shop["address"])
+    if shop["phone"]:
+        center(shop["phone"])
+
+    separator()
+    pair("Order:", receipt["order_no"])
+    pair("Kasir:", receipt["cashier"])
+    pair("Data:", receipt["date"])
+    if receipt["table_number"]:
+        pair("Table:", receipt["table_number"])
+    if receipt["delivery_address"]:
+        pair("Delivery:", receipt["delivery_address"])
+
+    separator()
+    for item in receipt["items"]:
+        pair(item["name"], money(item["line_total"]), FONT_BOLD, pad=4)
+        pair(f"({item['order_type_text_icon']} {item['order_type']})", "", size=FONT_SIZE_SMALL)
+        pair(f"{item['qty']} x {money(item['unit_price'])}", "", size=FONT_SIZE_SMALL)
+
+    separator()
+    pair("Subtotal", money(receipt["subtotal"]), FONT_BOLD)
+    pair("Discount", money(receipt["discount"]))
+    pair("VAT / Tax", money(receipt["tax"]))
+    if receipt["delivery_fee"]:
+        pair("Delivery Fee", money(receipt["delivery_fee"]))
+    pair("Total", money(receipt["total"]), FONT_BOLD, FONT_SIZE_GRAND, pad=6)
+
+    separator()
+    center(RECEIPT_FOOTER, size=9)
+    center(shop["name"], size=9)
+    return lines
+
+
+def render_receipt_pdf(order, receipt=None) -> bytes:
+    """Gambar receipt langsung dengan reportlab canvas (tanpa HTML/CSS parsing)."""
+    receipt = receipt or build_receipt(order)
+    logo = _logo_reader(order.shop)
+    lines = _receipt_lines(receipt, logo)
+
+    height = sum(line[2] for line in lines) + 2 * PAPER_MARGIN
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=(PAPER_WIDTH, height), pageCompression=1)
+    pdf.setTitle("Receipt")
+
+    left = PAPER_MARGIN
+    right = PAPER_WIDTH - PAPER_MARGIN
+    y = height - PAPER_MARGIN
+
+    for kind, data, line_height in lines:
+        if kind == "image":
+            img_h = line_height - 6
+            pdf.drawImage(
+                data, (PAPER_WIDTH - LOGO_WIDTH) / 2, y - img_h,
+                width=LOGO_WIDTH, height=img_h, mask="auto",
+            )
+            y -= line_height
+            continue
+
+        y -= line_height
+        if kind == "center":
+            text, font, size = data
+            pdf.setFont(font, size)
+            pdf.drawCentredString(PAPER_WIDTH / 2, y, text)
+        elif kind == "left":
+            text, font, size = data
+            pdf.setFont(font, size)
+            pdf.drawString(left, y, text)
+        else:
+            text, right_text, font, size = data
+            pdf.setFont(font, size)
+            pdf.drawString(left, y, text)
+            if right_text:
+                pdf.drawRightString(right, y, right_text)
+
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+# =========================================================
+# RENDERER: HTML (xhtml2pdf, template lama)
+# =========================================================
+def _link_callback(uri, rel):
+    if uri.startswith(settings.MEDIA_URL):
+        path = os.path.join(settings.MEDIA_ROOT, uri.replace(settings.MEDIA_URL, ""))
+        if os.path.isfile(path):
+            return path
+
+    if uri.startswith(settings.STATIC_URL):
+        path = os.path.join(settings.STATIC_ROOT, uri.replace(settings.STATIC_URL, ""))
+        if os.path.isfile(path):
+            return path
+
+    return uri
+
+
+def render_receipt_pdf_html(order, receipt=None) -> bytes:
+    """Renderer lama (template pos/order_receipt.html + xhtml2pdf). Untuk shop yang kustom template."""
+    receipt = receipt or build_receipt(order)
+    html = get_template("pos/order_receipt.html").render({
+        "order": order,
+        "shop": order.shop,
+        "receipt_items": receipt["items"],
+    })
+
+    result = io.BytesIO()
+    pdf = pisa.pisaDocument(
+        io.BytesIO(html.encode("UTF-8")),
+        result,
+        link_callback=_link_callback
+    )
+    if pdf.err:
+        raise ValueError("Error generating PDF")
+    return result.getvalue()
+
+
+PDF_RENDERERS = {
+    "reportlab": render_receipt_pdf,
+    "html": render_receipt_pdf_html,
+}
+
+
+# =========================================================
+# RENDERER: TEXT / ESC/POS (thermal printer)
+# =========================================================
+# Jumlah kolom font A: kertas 58mm = 32 karakter, 80mm = 48 karakter.
+PAPER_COLUMNS = {"58": 32, "80": 48}
+DEFAULT_PAPER = "58"
+
+# Codepage PC860 (Portuguese): punya ã/õ/ç/é untuk nama & alamat Tetum/Portugis.
+ESCPOS_CODEPAGE = 3
+ESCPOS_ENCODING = "cp860"
+
+ESC_INIT = b"\x1b@"
+ESC_CODEPAGE = b"\x1bt"
+ESC_ALIGN_LEFT = b"\x1ba\x00"
+ESC_ALIGN_CENTER = b"\x1ba\x01"
+ESC_BOLD_ON = b"\x1bE\x01"
+ESC_BOLD_OFF = b"\x1bE\x00"
+GS_SIZE_NORMAL = b"\x1d!\x00"
+GS_SIZE_DOUBLE_HEIGHT = b"\x1d!\x01"
+GS_FEED_CUT = b"\x1dVB\x03"  # feed 3 baris lalu partial cut
+
+
+def paper_columns(paper=None) -> int:
+    return PAPER_COLUMNS.get(str(paper or DEFAULT_PAPER).replace("mm", "").strip(), PAPER_COLUMNS[DEFAULT_PAPER])
+
+
+def _wrap(text, width):
+    return textwrap.wrap(str(text or ""), width) or [""]
+
+
+def _receipt_text_lines(receipt, width):
+    """
+    Receipt sebagai baris teks fixed-width: list of (text, align, bold, big).
+    Layout mengikuti receipt PDF; dipakai oleh output text dan ESC/POS.
+    """
+    lines = []
+
+    def center(text, bold=False):
+        for part in _wrap(text, width):
+            lines.append((part, "center", bold, False))
+
+    def pair(left, right="", bold=False, big=False):
+        right = str(right or "")
+        if len(right) > width * 2 // 3:
+            lines.append((str(left), "left", bold, big))
+            for part in _wrap(right, width):
+                lines.append((part.rjust(width), "left", bold, big))
+            return
+
+        parts = _wrap(left, width - len(right) - 1 if right else width)
+        lines.append((parts[0].ljust(width - len(right)) + right, "left", bold, big))
+        for part in parts[1:]:
+            lines.append((part, "left", bold, big))
+
+    def separator():
+        lines.append(("-" * width, "left", False, False))
+
+    shop = receipt["shop"]
+    center(shop["name"], bold=True)
+    if shop["address"]:
+        center(shop["address"])
+    if shop["phone"]:
+        center(shop["phone"])
+
+    separator()
+    pair("Order:", receipt["order_no"])
+    pair("Kasir:", receipt["cashier"])
+    pair("Data:", receipt["date"])
+    if receipt["table_number"]:
+        pair("Table:", receipt["table_number"])
+    if receipt["delivery_address"]:
+        pair("Delivery:", receipt["delivery_address"])
+
+    separator()
+    for item in receipt["items"]:
+        pair(item["name"], money(item["line_total"]), bold=True)
+        pair(f"  ({item['order_type_text_icon']} {item['order_type']})")
+        pair(f"  {item['qty']} x {money(item['unit_price'])}")
+
+    separator()
+    pair("Subtotal", money(receipt["subtotal"]), bold=True)
+    pair("Discount", money(receipt["discount"]))
+    pair("VAT / Tax", money(receipt["tax"]))
+    if receipt["delivery_fee"]:
+        pair("Delivery Fee", money(receipt["delivery_fee"]))
+    pair("Total", money(receipt["total"]), bold=True, big=True)
+
+    separator()
+    center(RECEIPT_FOOTER)
+    center(shop["name"])
+    return lines
+
+
+def render_receipt_text(receipt, paper=None) -> str:
+    width = paper_columns(paper)
+    out = []
+    for text, align, _bold, _big in _receipt_text_lines(receipt, width):
+        out.append(text.center(width).rstrip() if align == "center" else text.rstrip())
+    return "\n".join(out) + "\n"
+
+
+def render_receipt_escpos(receipt, paper=None) -> bytes:
+    """
+    Byte stream ESC/POS siap kirim ke printer thermal (raw / port 9100 / Bluetooth).
+    Hanya perintah dasar Epson (init, codepage, align, bold, double height, cut).
+    """
+    width = paper_columns(paper)
+    out = bytearray(ESC_INIT + ESC_CODEPAGE + bytes([ESCPOS_CODEPAGE]))
+    state = {"align": None, "bold": False, "big": False}
+
+    for text, align, bold, big in _receipt_text_lines(receipt, width):
+        if align != state["align"]:
+            out += ESC_ALIGN_CENTER if align == "center" else ESC_ALIGN_LEFT
+            state["align"] = align
+        if bold != state["bold"]:
+            out += ESC_BOLD_ON if bold else ESC_BOLD_OFF
+            state["bold"] = bold
+        if big != state["big"]:
+            out += GS_SIZE_DOUBLE_HEIGHT if big else GS_SIZE_NORMAL
+            state["big"] = big
+        out += text.rstrip().encode(ESCPOS_ENCODING, "replace") + b"\n"
+
+    if state["bold"]:
+        out += ESC_BOLD_OFF
+    if state["big"]:
+        out += GS_SIZE_NORMAL
+    out += GS_FEED_CUT
+    return bytes(out)
+
+
+# format -> (renderer(receipt, paper), content_type, file extension)
+RECEIPT_TEXT_FORMATS = {
+    "text": (render_receipt_text, "text/plain; charset=utf-8", "txt"),
+    "escpos": (render_receipt_escpos, "application/octet-stream", "bin"),
+}
+
+
+# =========================================================
+# CACHE
+# =========================================================
+def receipt_renderer_name(renderer=None) -> str:
+    name = (renderer or getattr(settings, "RECEIPT_PDF_RENDERER", "reportlab") or "reportlab").strip().lower()
+    return name if name in PDF_RENDERERS else "reportlab"
+
+
+def receipt_cache_key(order_id, marker, renderer) -> str:
+    return f"receipt-pdf:v{RECEIPT_LAYOUT_VERSION}:{renderer}:{order_id}:{marker}"
+
+
+def receipt_pdf_bytes(order, renderer=None) -> bytes:
+    """
+    PDF receipt untuk order, di-cache per (order_id, marker isi receipt).
+    Reprint order yang sama tidak render ulang; order yang berubah otomatis dapat key baru.
+    """
+    renderer = receipt_renderer_name(renderer)
+    receipt = build_receipt(order)
+    key = receipt_cache_key(order.id, receipt_marker(receipt), renderer)
+
+    pdf_bytes = cache.get(key)
+    if pdf_bytes is not None:
+        return pdf_bytes
+
+    pdf_bytes = PDF_RENDERERS[renderer](order, receipt)
+    cache.set(key, pdf_bytes, getattr(settings, "RECEIPT_PDF_CACHE_TIMEOUT", 60 * 60 * 24))
+    return pdf_bytes
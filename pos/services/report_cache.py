@@ -0,0 +1,209 @@
+# pos/services/report_cache.py
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from pos.services.shared_cache import shared_timeout
+
+
+# =========================================================
+# VERSION PER SHOP
+# =========================================================
+# Dua versi per shop:
+# - "live"    : naik di setiap write penjualan/expense/payment/return
+#               -> bucket hari ini (dan tanggal ke depan) dihitung ulang
+# - "history" : naik hanya kalau write menyentuh tanggal yang sudah lewat
+#               (expense backdate, order lama dibayar/diedit, restore)
+#               -> range tertutup tetap di cache selama tidak ada perubahan
+# Scope "all" dipakai platform admin (report lintas shop) dan ikut naik di setiap write.
+LIVE = "live"
+HISTORY = "history"
+ALL_SHOPS = "all"
+
+
+def _version_key(scope: str, shop_id) -> str:
+    return f"report-version:{scope}:{shop_id or ALL_SHOPS}"
+
+
+def _fresh_version() -> int:
+    # kalau key versi hilang (restart / eviction), mulai dari nilai baru supaya
+    # entry lama dengan versi kecil tidak pernah terpakai lagi
+    return int(time.time() * 1000)
+
+
+def report_version(scope: str, shop_id) -> int:
+    key = _version_key(scope, shop_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def _incr(scope: str, shop_id):
+    key = _version_key(scope, shop_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), None)
+
+
+def bump_report_version(shop_id, *, history: bool = False):
+    """Naikkan versi report shop (dan scope "all"). history=True juga membatalkan range tertutup."""
+    scopes = (LIVE, HISTORY) if history else (LIVE,)
+    for scope in scopes:
+        _incr(scope, shop_id)
+        _incr(scope, None)
+
+
+def bump_report_version_on_commit(shop_id, affected_date=None):
+    """Bump setelah transaksi commit, supaya reader tidak meng-cache data lama dengan versi baru."""
+    if not shop_id:
+        return
+    history = affected_date is not None and affected_date < timezone.localdate()
+    transaction.on_commit(lambda: bump_report_version(shop_id, history=history))
+
+
+# =========================================================
+# CACHED DAY BUCKETS
+# =========================================================
+def _cache_key(dataset: str, shop_id, start, end, scope: str) -> str:
+    return (
+        f"report:{dataset}:{shop_id or ALL_SHOPS}:{start.isoformat()}:{end.isoformat()}"
+        f":{scope}{report_version(scope, shop_id)}"
+    )
+
+
+def _cached(key, compute, timeout):
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+def cached_day_rows(*, dataset: str, shop_id, start, end, compute) -> list:
+    """
+    compute(start, end) -> list baris per hari (sudah urut tanggal).
+    Range dipecah:
+    - [start, kemarin]  : tertutup, di-cache per versi "history" (REPORT_CACHE_HISTORY_TIMEOUT)
+    - [hari ini, end]   : dihitung ulang tiap versi "live" naik (+ timeout pendek)
+    """
+    today = timezone.localdate()
+    rows = []
+
+    closed_end = min(end, today - timedelta(days=1))
+    if start <= closed_end:
+        key = _cache_key(dataset, shop_id, start, closed_end, HISTORY)
+        rows.extend(_cached(key, lambda: compute(start, closed_end), report_cache_history_timeout()))
+
+    open_start = max(start, today)
+    if open_start <= end:
+        key = _cache_key(dataset, shop_id, open_start, end, LIVE)
+        rows.extend(_cached(key, lambda: compute(open_start, end), report_cache_today_timeout()))
+
+    return rows
+
+
+def cached_today(*, dataset: str, shop_id, compute):
+    """Nilai untuk hari ini saja (net income today, finance summary)."""
+    today = timezone.localdate()
+    key = _cache_key(dataset, shop_id, today, today, LIVE)
+    return _cached(key, lambda: compute(today), report_cache_today_timeout())
+
+
+def cached_range(*, dataset: str, shop_id, start, end, closed: bool, compute, history_timeout=None):
+    """
+    Satu nilai untuk seluruh range (mis. jawaban owner chat).
+    closed=True (range sudah lewat) -> versi "history" (history_timeout, default
+    REPORT_CACHE_HISTORY_TIMEOUT; tanpa shared cache dibatasi timeout "today");
+    selain itu versi "live" + timeout pendek.
+    """
+    if closed:
+        timeout = report_cache_history_timeout()
+        if history_timeout is not None:
+            timeout = min(timeout, shared_timeout(int(history_timeout), local_max=report_cache_today_timeout()))
+        return _cached(_cache_key(dataset, shop_id, start, end, HISTORY), compute, timeout)
+    return _cached(_cache_key(dataset, shop_id, start, end, LIVE), compute, report_cache_today_timeout())
+
+
+def report_cache_today_timeout() -> int:
+    return int(getattr(settings, "REPORT_CACHE_TODAY_TIMEOUT", 300))
+
+
+def report_cache_history_timeout() -> int:
+    """
+    Bump versi hanya sampai ke cache yang sama; tanpa shared cache (LocMem per
+    proses) range tertutup dibatasi ke timeout "today" supaya worker lain
+    tidak menyajikan data lama selamanya.
+    """
+    return shared_timeout(
+        int(getattr(settings, "REPORT_CACHE_HISTORY_TIMEOUT", 60 * 60 * 24)),
+        local_max=report_cache_today_timeout(),
+    )
+
+
+# =========================================================
+# WRITE HOOKS
+# =========================================================
+def _local_date(value):
+    if value is None:
+        return None
+    if hasattr(value, "tzinfo"):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+def _order_written(sender, instance, **kwargs):
+    bump_report_version_on_commit(instance.shop_id, _local_date(instance.created_at))
+
+
+def _related_order(instance):
+    # saat cascade delete order, order-nya bisa sudah tidak ada
+    try:
+        return instance.order
+    except ObjectDoesNotExist:
+        return None
+
+
+def _order_item_written(sender, instance, **kwargs):
+    order = _related_order(instance)
+    if order is not None:
+        bump_report_version_on_commit(order.shop_id, _local_date(order.created_at))
+
+
+def _expense_written(sender, instance, **kwargs):
+    bump_report_version_on_commit(instance.shop_id, instance.date)
+
+
+def _payment_written(sender, instance, **kwargs):
+    order = _related_order(instance)
+    if order is not None:
+        bump_report_version_on_commit(order.shop_id, _local_date(order.created_at))
+
+
+def _return_written(sender, instance, **kwargs):
+    bump_report_version_on_commit(instance.shop_id, _local_date(instance.returned_at))
+
+
+def connect_report_cache_signals():
+    from pos.models import Expense, Order, OrderItem, ProductReturn, SalePayment
+
+    hooks = (
+        (Order, _order_written),
+        (OrderItem, _order_item_written),
+        (Expense, _expense_written),
+        (SalePayment, _payment_written),
+        (ProductReturn, _return_written),
+    )
+    for model, handler in hooks:
+        uid = f"report-cache-{model.__name__}"
+        post_save.connect(handler, sender=model, dispatch_uid=f"{uid}-save")
+        post_delete.connect(handler, sender=model, dispatch_uid=f"{uid}-delete")
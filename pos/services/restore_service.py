@@ -1,16 +1,54 @@
 # pos/services/restore_service.py
 
+import io
+import re
 import json
-import os
-import tempfile
+import logging
+import time
 import zipfile
+from itertools import islice
 from pathlib import Path
 
-from django.db import transaction
+from django.core.management.color import no_style
+from django.db import connection, transaction
 from django.utils import timezone
 
-from pos.models import Shop
-from pos.models_backup import BackupHistory, RestoreHistory
+from pos.models import (
+    Shop,
+    Customer,
+    Supplier,
+    Category,
+    Unit,
+    Product,
+    Purchase,
+    PurchaseItem,
+    Order,
+    OrderItem,
+    Expense,
+    PaymentMethod,
+    BankAccount,
+    SalePayment,
+    BankLedger,
+    StockMovement,
+    StockAdjustment,
+    InventoryCount,
+    InventoryCountItem,
+    ProductReturn,
+    ProductReturnItem,
+    Banner,
+    CustomUser,
+)
+from pos.models_backup import BackupSetting, BackupHistory, RestoreHistory, RestoreIdMap
+from pos.services.report_cache import bump_report_version
+from pos.services.backup_service import compute_sha256, media_blob_path
+from pos.services.job_runner import submit_job
+
+logger = logging.getLogger(__name__)
+
+RESTORE_BATCH_SIZE = 500
+# progress ke RestoreHistory.metadata paling sering tiap N detik (+ saat ganti section)
+RESTORE_PROGRESS_INTERVAL = 2.0
+STREAM_CHUNK_CHARS = 64 * 1024
 
 
 # =========================================================
@@ -48,67 +86,296 @@ def validate_backup_history_for_restore(backup: BackupHistory):
     return backup_path
 
 
-def extract_backup_package(backup: BackupHistory) -> tuple[Path, tempfile.TemporaryDirectory]:
+# =========================================================
+# STREAMING BACKUP READER
+# =========================================================
+_JSON_WS = re.compile(r"[ \t\n\r]*")
+
+
+class _JsonStream:
     """
-    Return:
-    - extract dir path
-    - TemporaryDirectory object (must be kept alive by caller)
+    Parser JSON incremental sederhana untuk data.json.
+
+    data.json berbentuk {"section": [row, row, ...], ...}; setiap row
+    di-decode satu per satu dengan raw_decode sehingga memory hanya
+    sebesar satu row + satu chunk, bukan seluruh file.
     """
-    backup_path = validate_backup_history_for_restore(backup)
 
-    tmpdir = tempfile.TemporaryDirectory()
-    extract_dir = Path(tmpdir.name)
+    def __init__(self, fp, chunk_size: int = STREAM_CHUNK_CHARS):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.base = 0  # offset (karakter) buf[0] di data.json
+        self.eof = False
+        self.decoder = json.JSONDecoder()
 
-    with zipfile.ZipFile(backup_path, "r") as zf:
-        zf.extractall(extract_dir)
+    def _fill(self) -> bool:
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.base += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
 
-    return extract_dir, tmpdir
+    def offset(self) -> int:
+        return self.base + self.pos
 
+    def skip_to(self, offset: int):
+        """Maju ke offset absolut tanpa parsing JSON (hanya baca chunk)."""
+        if offset < self.offset():
+            raise ValueError("Cannot seek backwards in data.json stream.")
+        while offset > self.base + len(self.buf):
+            self.base += len(self.buf)
+            self.buf = ""
+            self.pos = 0
+            chunk = self.fp.read(self.chunk_size)
+            if not chunk:
+                self.eof = True
+                raise ValueError("data.json format is invalid.")
+            self.buf = chunk
+        self.pos = offset - self.base
 
-def load_backup_package(backup: BackupHistory) -> dict:
-    """
-    Safe loader helper.
+    def peek(self) -> str:
+        while True:
+            self.pos = _JSON_WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def consume(self, char: str):
+        if self.peek() != char:
+            raise ValueError("data.json format is invalid.")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # angka di ujung buffer bisa saja belum lengkap
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise ValueError("data.json format is invalid.")
+            self._fill()
+
+    def iter_keys(self):
+        self.consume("{")
+        first = True
+        while True:
+            if self.peek() == "}":
+                self.pos += 1
+                return
+            if not first:
+                self.consume(",")
+            first = False
+
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("data.json format is invalid.")
+            self.consume(":")
+            yield key
+
+    def iter_array(self):
+        self.consume("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.peek()
+            if char == ",":
+                self.pos += 1
+            elif char == "]":
+                self.pos += 1
+                return
+            else:
+                raise ValueError("data.json format is invalid.")
+
+    def skip_value(self):
+        if self.peek() == "[":
+            for _ in self.iter_array():
+                pass
+        else:
+            self.value()
+
+
+class BackupPackageReader:
     """
-    extract_dir, tmpdir = extract_backup_package(backup)
-    try:
-        metadata_path = extract_dir / "metadata.json"
-        data_path = extract_dir / "data.json"
+    Baca backup zip langsung dari ZipFile tanpa extract ke disk.
 
-        if not metadata_path.exists():
-            raise ValueError("metadata.json not found in backup package.")
+    - metadata.json dibaca utuh (kecil)
+    - data.json di-stream per section via rows(section)
 
-        if not data_path.exists():
-            raise ValueError("data.json not found in backup package.")
+    Offset awal setiap section dicatat dalam satu kali parsing; lompat ke
+    section lain hanya membaca (decompress) tanpa parsing JSON. Kalau
+    section yang diminta sudah terlewat, data.json dibuka ulang dari awal.
+    """
 
-        with open(metadata_path, "r", encoding="utf-8") as f:
-            metadata = json.load(f)
+    def __init__(self, backup_path: Path):
+        self.zf = zipfile.ZipFile(backup_path, "r")
+        self._fp = None
+        self._stream = None
+        self._offsets = None
 
-        with open(data_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        try:
+            self.metadata = self._read_metadata()
+            if "data.json" not in self.zf.namelist():
+                raise ValueError("data.json not found in backup package.")
+        except Exception:
+            self.close()
+            raise
+
+    def _read_metadata(self) -> dict:
+        try:
+            with self.zf.open("metadata.json") as f:
+                metadata = json.load(f)
+        except KeyError:
+            raise ValueError("metadata.json not found in backup package.")
 
         if not isinstance(metadata, dict):
             raise ValueError("metadata.json format is invalid.")
+        return metadata
 
-        if not isinstance(data, dict):
-            raise ValueError("data.json format is invalid.")
+    def _reopen(self):
+        if self._fp is not None:
+            self._fp.close()
+        self._fp = io.TextIOWrapper(self.zf.open("data.json"), encoding="utf-8")
+        self._stream = _JsonStream(self._fp)
 
-        return {
-            "metadata": metadata,
-            "data": data,
-        }
-    finally:
-        tmpdir.cleanup()
+    def _section_offsets(self) -> dict:
+        if self._offsets is None:
+            self._reopen()
+            offsets = {}
+            for key in self._stream.iter_keys():
+                offsets[key] = self._stream.offset()
+                self._stream.skip_value()
+            self._offsets = offsets
+        return self._offsets
+
+    def _advance_to(self, section: str) -> bool:
+        offset = self._section_offsets().get(section)
+        if offset is None:
+            return False
+
+        if self._stream is None or self._stream.offset() > offset:
+            self._reopen()
+        self._stream.skip_to(offset)
+        return True
+
+    def section_names(self) -> list:
+        return sorted(self._section_offsets())
+
+    def has_section(self, section: str) -> bool:
+        return section in self.section_names()
+
+    def rows(self, section: str):
+        """
+        Generator row (dict) untuk satu section array.
+        Section yang tidak ada menghasilkan iterator kosong.
+        """
+        if not self._advance_to(section):
+            return
+
+        if self._stream.peek() == "[":
+            yield from self._stream.iter_array()
+        else:
+            value = self._stream.value()
+            if isinstance(value, dict):
+                yield value
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        self.zf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_backup_package(backup: BackupHistory) -> BackupPackageReader:
+    backup_path = validate_backup_history_for_restore(backup)
+    try:
+        return BackupPackageReader(backup_path)
+    except zipfile.BadZipFile:
+        raise ValueError("Backup file is not a valid ZIP package.")
+
+
+def verify_backup_checksum(backup: BackupHistory, backup_path: Path):
+    """
+    Cocokkan sha256 file zip dengan checksum yang disimpan saat backup.
+    Backup lama tanpa checksum dilewati.
+    """
+    expected = (backup.file_checksum or "").strip().lower()
+    if not expected:
+        return False
+
+    if compute_sha256(backup_path) != expected:
+        raise ValueError("Backup file checksum does not match. The file may be corrupted.")
+    return True
+
+
+def validate_backup_media_entries(*, shop: Shop, package: BackupPackageReader) -> dict:
+    """
+    Cek media tanpa membaca isi file:
+    - backup content-addressed -> blob harus ada di media store
+    - backup lama (media di-embed) -> entry harus ada di central directory zip
+
+    Media yang hilang tidak menggagalkan restore data; hanya dicatat.
+    """
+    media_export = package.metadata.get("media_export") or {}
+    exported_files = media_export.get("exported_files") or []
+    content_addressed = media_export.get("storage") == "content_addressed"
+
+    zip_entries = {}
+    if not content_addressed:
+        zip_entries = {info.filename: info.file_size for info in package.zf.infolist()}
+
+    missing = []
+    size_mismatch = []
+
+    for item in exported_files:
+        zip_path = item.get("zip_path", "")
+        expected_size = int(item.get("size_bytes") or 0)
 
+        if content_addressed:
+            sha256 = item.get("sha256") or ""
+            blob_path = media_blob_path(shop, sha256) if sha256 else None
+            if not blob_path or not blob_path.exists():
+                missing.append(zip_path)
+                continue
+            actual_size = blob_path.stat().st_size
+        else:
+            if zip_path not in zip_entries:
+                missing.append(zip_path)
+                continue
+            actual_size = zip_entries[zip_path]
 
-def validate_restore_payload(*, shop: Shop, backup: BackupHistory, package: dict):
-    metadata = package.get("metadata") or {}
-    data = package.get("data") or {}
+        if expected_size and actual_size != expected_size:
+            size_mismatch.append(zip_path)
 
-    if not isinstance(metadata, dict):
-        raise ValueError("Backup metadata is invalid.")
+    return {
+        "storage": "content_addressed" if content_addressed else "embedded",
+        "checked_count": len(exported_files),
+        "missing_count": len(missing),
+        "size_mismatch_count": len(size_mismatch),
+        "missing_files": missing[:50],
+        "size_mismatch_files": size_mismatch[:50],
+    }
 
-    if not isinstance(data, dict):
-        raise ValueError("Backup data is invalid.")
+
+def validate_restore_payload(*, shop: Shop, backup: BackupHistory, package: BackupPackageReader):
+    metadata = package.metadata
 
     backup_shop_id = metadata.get("shop_id")
     backup_shop_code = metadata.get("shop_code")
@@ -119,16 +386,25 @@ def validate_restore_payload(*, shop: Shop, backup: BackupHistory, package: dict
     if backup_shop_code and str(backup_shop_code).strip().upper() != str(shop.code).strip().upper():
         raise ValueError("Backup shop_code does not match current shop.")
 
-    if "shop" not in data:
+    if not package.has_section("shop"):
         raise ValueError("Backup data missing shop section.")
 
     return True
 
 
+def open_verified_backup_package(backup: BackupHistory) -> tuple[BackupPackageReader, bool]:
+    """
+    Return (package, checksum_verified).
+    """
+    backup_path = validate_backup_history_for_restore(backup)
+    checksum_verified = verify_backup_checksum(backup, backup_path)
+    return open_backup_package(backup), checksum_verified
+
+
 # =========================================================
 # RESTORE ENGINE - SAFE PHASE
 # =========================================================
-def create_restore_history(*, shop: Shop, backup: BackupHistory, mode: str, user=None) -> RestoreHistory:
+def create_restore_history(*, shop: Shop, backup: BackupHistory, mode: str, user=None, metadata=None) -> RestoreHistory:
     return RestoreHistory.objects.create(
         shop=shop,
         backup=backup,
@@ -137,47 +413,729 @@ def create_restore_history(*, shop: Shop, backup: BackupHistory, mode: str, user
         restored_by=user if getattr(user, "is_superuser", False) is False else None,
         triggered_by=safe_user_display(user),
         started_at=timezone.now(),
-        metadata={},
+        metadata=metadata or {},
     )
 
 
-@transaction.atomic
-def run_restore_validation(*, shop: Shop, backup: BackupHistory, mode: str, user=None) -> RestoreHistory:
+# =========================================================
+# RESTORE ENGINE - UPSERT
+# =========================================================
+USERS_SECTION = "users"
+
+# Urutan = urutan dependency FK, disusun sama dengan urutan section di data.json
+# (backup_service) supaya reader tidak perlu mundur. "fks" memetakan field -> section sumber id.
+MASTER_RESTORE_SPECS = [
+    {
+        "section": "customers",
+        "model": Customer,
+        "fields": ["name", "cell", "email", "address", "points"],
+        "natural_key": ("cell",),
+    },
+    {
+        "section": "suppliers",
+        "model": Supplier,
+        "fields": ["name", "contact_person", "cell", "email", "address"],
+        "natural_key": ("name",),
+    },
+    {
+        "section": "categories",
+        "model": Category,
+        "fields": ["name"],
+        "natural_key": ("name",),
+    },
+    {
+        "section": "units",
+        "model": Unit,
+        "fields": ["name"],
+        "natural_key": ("name",),
+    },
+    {
+        "section": "products",
+        "model": Product,
+        "fields": [
+            "name",
+            "code",
+            "sku",
+            "item_type",
+            "category_id",
+            "description",
+            "stock",
+            "track_stock",
+            "buy_price",
+            "sell_price",
+            "weight",
+            "unit_id",
+            "supplier_id",
+            "is_active",
+            "created_at",
+            "updated_at",
+        ],
+        "fks": {"category_id": "categories", "unit_id": "units", "supplier_id": "suppliers"},
+        "natural_key": ("code",),
+    },
+    {
+        "section": "payment_methods",
+        "model": PaymentMethod,
+        "fields": ["name", "code", "payment_type", "requires_bank_account", "is_active", "note"],
+        "natural_key": ("code",),
+    },
+    {
+        "section": "bank_accounts",
+        "model": BankAccount,
+        "fields": [
+            "name",
+            "bank_name",
+            "account_number",
+            "account_holder",
+            "account_type",
+            "opening_balance",
+            "current_balance",
+            "is_active",
+            "note",
+            "created_at",
+        ],
+        "natural_key": ("bank_name", "name"),
+    },
+]
+
+TRANSACTION_RESTORE_SPECS = [
+    {
+        "section": "purchases",
+        "model": Purchase,
+        "fields": ["supplier_id", "invoice_id", "purchase_date", "note", "created_at", "updated_at", "created_by_id"],
+        "fks": {"supplier_id": "suppliers", "created_by_id": USERS_SECTION},
+        "natural_key": ("invoice_id",),
+    },
+    {
+        "section": "purchase_items",
+        "model": PurchaseItem,
+        "fields": ["purchase_id", "product_id", "quantity", "cost_price", "expired_date", "batch_code", "created_at"],
+        "fks": {"purchase_id": "purchases", "product_id": "products"},
+        "required": ("purchase_id", "product_id"),
+        "owner": "purchase__shop_id",
+    },
+    {
+        "section": "orders",
+        "model": Order,
+        "fields": [
+            "invoice_number",
+            "customer_id",
+            "created_at",
+            "payment_method",
+            "subtotal",
+            "discount",
+            "tax",
+            "total",
+            "notes",
+            "is_paid",
+            "default_order_type",
+            "table_number",
+            "delivery_address",
+            "delivery_fee",
+            "served_by_id",
+        ],
+        "fks": {"customer_id": "customers", "served_by_id": USERS_SECTION},
+        # invoice_number unik global, bukan per shop
+        "natural_key": ("invoice_number",),
+        "global_natural_key": True,
+    },
+    {
+        "section": "order_items",
+        "model": OrderItem,
+        "fields": ["order_id", "product_id", "quantity", "price", "weight_unit_id", "order_type"],
+        "fks": {"order_id": "orders", "product_id": "products", "weight_unit_id": "units"},
+        "required": ("order_id", "product_id"),
+        "owner": "order__shop_id",
+    },
+    {
+        "section": "expenses",
+        "model": Expense,
+        "fields": ["name", "note", "amount", "date", "time"],
+    },
+    {
+        "section": "sale_payments",
+        "model": SalePayment,
+        "fields": [
+            "order_id",
+            "payment_method_id",
+            "bank_account_id",
+            "amount",
+            "reference_number",
+            "note",
+            "paid_at",
+            "created_by_id",
+        ],
+        "fks": {
+            "order_id": "orders",
+            "payment_method_id": "payment_methods",
+            "bank_account_id": "bank_accounts",
+            "created_by_id": USERS_SECTION,
+        },
+        "required": ("order_id", "payment_method_id"),
+        "owner": "order__shop_id",
+    },
+    {
+        "section": "bank_ledgers",
+        "model": BankLedger,
+        "fields": [
+            "bank_account_id",
+            "transaction_type",
+            "direction",
+            "amount",
+            "balance_before",
+            "balance_after",
+            "reference_order_id",
+            "reference_payment_id",
+            "description",
+            "created_at",
+            "created_by_id",
+        ],
+        "fks": {
+            "bank_account_id": "bank_accounts",
+            "reference_order_id": "orders",
+            "reference_payment_id": "sale_payments",
+            "created_by_id": USERS_SECTION,
+        },
+        "required": ("bank_account_id",),
+        "owner": "bank_account__shop_id",
+    },
+    {
+        "section": "stock_movements",
+        "model": StockMovement,
+        "fields": [
+            "product_id",
+            "movement_type",
+            "quantity_delta",
+            "before_stock",
+            "after_stock",
+            "note",
+            "ref_model",
+            "ref_id",
+            "created_at",
+            "created_by_id",
+        ],
+        "fks": {"product_id": "products", "created_by_id": USERS_SECTION},
+        "required": ("product_id",),
+    },
+    {
+        "section": "stock_adjustments",
+        "model": StockAdjustment,
+        "fields": ["product_id", "old_stock", "new_stock", "reason", "note", "adjusted_at", "adjusted_by_id"],
+        "fks": {"product_id": "products", "adjusted_by_id": USERS_SECTION},
+        "required": ("product_id",),
+    },
+    {
+        "section": "inventory_counts",
+        "model": InventoryCount,
+        "fields": ["title", "note", "counted_at", "counted_by_id", "status", "created_at"],
+        "fks": {"counted_by_id": USERS_SECTION},
+    },
+    {
+        "section": "inventory_count_items",
+        "model": InventoryCountItem,
+        "fields": ["inventory_id", "product_id", "system_stock", "counted_stock"],
+        "fks": {"inventory_id": "inventory_counts", "product_id": "products"},
+        "required": ("inventory_id", "product_id"),
+        "owner": "inventory__shop_id",
+    },
+    {
+        "section": "product_returns",
+        "model": ProductReturn,
+        "fields": ["order_id", "customer_id", "note", "returned_at", "returned_by_id"],
+        "fks": {"order_id": "orders", "customer_id": "customers", "returned_by_id": USERS_SECTION},
+    },
+    {
+        "section": "product_return_items",
+        "model": ProductReturnItem,
+        "fields": ["product_return_id", "product_id", "quantity", "unit_price"],
+        "fks": {"product_return_id": "product_returns", "product_id": "products"},
+        "required": ("product_return_id", "product_id"),
+        "owner": "product_return__shop_id",
+    },
+    {
+        "section": "banners",
+        "model": Banner,
+        "fields": ["title", "active"],
+    },
+]
+
+
+def _chunked(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _timestamp_fields(model_cls, fields) -> list:
+    """
+    Field auto_now / auto_now_add selalu ditimpa bulk_create dengan waktu
+    sekarang, jadi nilai dari backup ditulis ulang setelah insert.
     """
-    Tahap aman:
-    - validasi backup history
-    - extract zip
-    - load metadata.json + data.json
-    - validasi shop cocok
-    - simpan hasil validasi ke RestoreHistory
+    names = []
+    for name in fields:
+        field = model_cls._meta.get_field(name)
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+            names.append(name)
+    return names
 
-    Belum melakukan overwrite/import database.
+
+class RestoreContext:
     """
-    restore = create_restore_history(
+    State restore yang dibagi antar section.
+
+    Id dari backup dipertahankan apa adanya bila memungkinkan, sehingga
+    remap hanya menyimpan id yang berubah (bentrok dengan tenant lain
+    atau cocok dengan row existing lewat natural key). Memory tetap kecil
+    walau transaksi berjumlah jutaan row.
+
+    Remap juga disimpan di RestoreIdMap (per shop) dan dibaca lagi per batch,
+    sehingga restore ulang setelah gagal di tengah meng-update row hasil
+    restore sebelumnya, bukan insert duplikat.
+    """
+
+    def __init__(self, *, shop: Shop, user=None, dry_run: bool = False, progress=None):
+        self.shop = shop
+        self.user = user
+        self.dry_run = dry_run
+        self.progress = progress
+        self.remap = {}
+        self.skipped_ids = {}
+        self.user_map = {}
+        self.stats = {}
+        self.touched_models = []
+
+    def load_remap(self, section: str, backup_ids):
+        """Ambil remap tersimpan untuk id-id ini yang belum ada di memory."""
+        known = self.remap.setdefault(section, {})
+        ids = {
+            backup_id
+            for backup_id in backup_ids
+            if isinstance(backup_id, int) and backup_id not in known
+        }
+        if not ids:
+            return
+
+        known.update(
+            RestoreIdMap.objects.filter(
+                shop=self.shop,
+                section=section,
+                backup_id__in=ids,
+            ).values_list("backup_id", "target_id")
+        )
+
+    def save_remap(self, section: str, mapping: dict):
+        if not mapping:
+            return
+        RestoreIdMap.objects.bulk_create(
+            [
+                RestoreIdMap(shop=self.shop, section=section, backup_id=backup_id, target_id=target_id)
+                for backup_id, target_id in mapping.items()
+            ],
+            batch_size=RESTORE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["shop", "section", "backup_id"],
+            update_fields=["target_id", "updated_at"],
+        )
+
+    def resolve(self, section: str, backup_id):
+        if backup_id in (None, ""):
+            return None
+
+        if section == USERS_SECTION:
+            return self.user_map.get(backup_id)
+
+        if backup_id in self.skipped_ids.get(section, ()):
+            return None
+        return self.remap.get(section, {}).get(backup_id, backup_id)
+
+    def section_stats(self, section: str) -> dict:
+        return self.stats.setdefault(section, {"created": 0, "updated": 0, "skipped": 0})
+
+    def report(self, section: str):
+        if self.progress:
+            stats = self.section_stats(section)
+            self.progress(section, stats["created"] + stats["updated"] + stats["skipped"])
+
+
+def _load_user_map(ctx: RestoreContext, package: BackupPackageReader):
+    """
+    User tidak di-restore (password tidak ikut backup); id user di backup
+    dipetakan ke user existing shop dengan username yang sama.
+    """
+    backup_users = {}
+    for row in package.rows(USERS_SECTION):
+        username = (row.get("username") or "").strip()
+        if username and row.get("id") is not None:
+            backup_users[username] = row["id"]
+
+    if not backup_users:
+        return
+
+    existing = CustomUser.objects.filter(
+        shop=ctx.shop,
+        username__in=list(backup_users.keys()),
+    ).values_list("username", "id")
+
+    for username, user_id in existing:
+        ctx.user_map[backup_users[username]] = user_id
+
+
+def _prepare_rows(ctx: RestoreContext, spec: dict, rows: list) -> list:
+    section = spec["section"]
+    fks = spec.get("fks") or {}
+    required = set(spec.get("required") or ())
+    has_shop = "owner" not in spec
+    stats = ctx.section_stats(section)
+
+    ctx.load_remap(section, [row.get("id") for row in rows])
+    for fk_field, fk_section in fks.items():
+        if fk_section != USERS_SECTION:
+            ctx.load_remap(fk_section, [row.get(fk_field) for row in rows])
+
+    prepared = []
+    for row in rows:
+        backup_id = row.get("id")
+        values = {field: row.get(field) for field in spec["fields"]}
+
+        missing_required = False
+        for fk_field, fk_section in fks.items():
+            values[fk_field] = ctx.resolve(fk_section, row.get(fk_field))
+            if values[fk_field] is None and fk_field in required:
+                missing_required = True
+
+        if missing_required:
+            stats["skipped"] += 1
+            if backup_id is not None:
+                ctx.skipped_ids.setdefault(section, set()).add(backup_id)
+            continue
+
+        if has_shop:
+            values["shop_id"] = ctx.shop.id
+
+        prepared.append((backup_id, values))
+
+    return prepared
+
+
+def _match_natural_keys(ctx: RestoreContext, spec: dict, prepared: list) -> dict:
+    """
+    Return {backup_id: existing_id | None}. None = bentrok dengan tenant lain.
+    Natural key kosong (mis. customer tanpa cell) tidak dicocokkan.
+    """
+    natural_key = spec.get("natural_key")
+    if not natural_key:
+        return {}
+
+    by_key = {}
+    for backup_id, values in prepared:
+        key = tuple(values.get(name) for name in natural_key)
+        if any(part in (None, "") for part in key):
+            continue
+        by_key[key] = backup_id
+
+    if not by_key:
+        return {}
+
+    model_cls = spec["model"]
+    qs = model_cls.objects.all()
+    if not spec.get("global_natural_key"):
+        qs = qs.filter(shop=ctx.shop)
+
+    # natural key 1 kolom -> filter __in; lebih dari 1 -> filter per kolom lalu cocokkan di Python
+    for name in natural_key:
+        qs = qs.filter(**{f"{name}__in": list({key[natural_key.index(name)] for key in by_key})})
+
+    matched = {}
+    for row in qs.values("id", "shop_id", *natural_key):
+        key = tuple(row[name] for name in natural_key)
+        backup_id = by_key.get(key)
+        if backup_id is None:
+            continue
+        matched[backup_id] = row["id"] if row["shop_id"] == ctx.shop.id else None
+
+    return matched
+
+
+def _restore_batch(ctx: RestoreContext, spec: dict, rows: list):
+    section = spec["section"]
+    model_cls = spec["model"]
+    owner_path = spec.get("owner", "shop_id")
+    stats = ctx.section_stats(section)
+    remap = ctx.remap.setdefault(section, {})
+
+    prepared = _prepare_rows(ctx, spec, rows)
+    if not prepared:
+        return
+
+    matched = _match_natural_keys(ctx, spec, prepared)
+
+    # id target: hasil remap restore sebelumnya kalau ada, selain itu id backup
+    target_ids = [
+        remap.get(backup_id, backup_id)
+        for backup_id, _ in prepared
+        if backup_id is not None and backup_id not in matched
+    ]
+    owners = dict(
+        model_cls.objects.filter(pk__in=target_ids).values_list("pk", owner_path)
+    ) if target_ids else {}
+
+    new_remap = {}
+    to_update = []
+    to_insert = []
+    for backup_id, values in prepared:
+        if backup_id in matched:
+            target_id = matched[backup_id]
+            if target_id is None:
+                # natural key dipakai tenant lain (mis. invoice_number global)
+                stats["skipped"] += 1
+                ctx.skipped_ids.setdefault(section, set()).add(backup_id)
+                continue
+            if target_id != backup_id and remap.get(backup_id) != target_id:
+                remap[backup_id] = new_remap[backup_id] = target_id
+            to_update.append(model_cls(pk=target_id, **values))
+            continue
+
+        target_id = remap.get(backup_id, backup_id)
+        if target_id in owners and owners[target_id] == ctx.shop.id:
+            to_update.append(model_cls(pk=target_id, **values))
+        elif backup_id is None or target_id in owners or target_id != backup_id:
+            # pk dipakai tenant lain / row hasil remap sudah dihapus -> row baru dengan pk baru
+            to_insert.append((backup_id, model_cls(**values), values))
+        else:
+            to_insert.append((backup_id, model_cls(pk=backup_id, **values), values))
+
+    stats["updated"] += len(to_update)
+    stats["created"] += len(to_insert)
+
+    if ctx.dry_run:
+        return
+
+    update_fields = list(spec["fields"])
+    timestamp_fields = _timestamp_fields(model_cls, update_fields)
+
+    with transaction.atomic():
+        if to_insert:
+            objs = [obj for _, obj, _ in to_insert]
+            if connection.features.can_return_rows_from_bulk_insert:
+                model_cls.objects.bulk_create(objs, batch_size=RESTORE_BATCH_SIZE)
+            else:
+                for obj in objs:
+                    obj.save_base(raw=True, force_insert=True)
+
+            for backup_id, obj, values in to_insert:
+                if backup_id is not None and obj.pk != backup_id:
+                    remap[backup_id] = new_remap[backup_id] = obj.pk
+                for name in timestamp_fields:
+                    setattr(obj, name, values[name])
+
+            if timestamp_fields:
+                model_cls.objects.bulk_update(objs, timestamp_fields, batch_size=RESTORE_BATCH_SIZE)
+
+        if to_update:
+            model_cls.objects.bulk_update(to_update, update_fields, batch_size=RESTORE_BATCH_SIZE)
+
+        # disimpan di transaksi yang sama dengan row-nya
+        ctx.save_remap(section, new_remap)
+
+    if model_cls not in ctx.touched_models:
+        ctx.touched_models.append(model_cls)
+
+
+def _restore_sections(ctx: RestoreContext, package: BackupPackageReader, specs: list):
+    for spec in specs:
+        section = spec["section"]
+        ctx.section_stats(section)
+
+        for batch in _chunked(package.rows(section), RESTORE_BATCH_SIZE):
+            _restore_batch(ctx, spec, batch)
+            ctx.report(section)
+
+
+def _restore_backup_setting(ctx: RestoreContext, package: BackupPackageReader):
+    row = next(iter(package.rows("backup_setting")), None)
+    if not row:
+        return
+
+    stats = ctx.section_stats("backup_setting")
+    stats["updated"] += 1
+    if ctx.dry_run:
+        return
+
+    setting, _ = BackupSetting.objects.get_or_create(shop=ctx.shop)
+    for field in [
+        "enabled",
+        "frequency",
+        "backup_time",
+        "keep_last",
+        "include_media",
+        "include_users",
+        "include_settings",
+        "default_restore_mode",
+    ]:
+        if row.get(field) is not None:
+            setattr(setting, field, row[field])
+    setting.save()
+
+
+def _reset_sequences(models_list: list):
+    """
+    Row yang di-insert dengan pk eksplisit tidak menggeser sequence
+    (PostgreSQL), jadi sequence harus di-reset setelah restore.
+    """
+    if not models_list:
+        return
+
+    statements = connection.ops.sequence_reset_sql(no_style(), models_list)
+    if not statements:
+        return
+
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def _run_specs(*, shop: Shop, package: BackupPackageReader, specs: list, user=None, dry_run=False, progress=None, with_settings=False) -> dict:
+    ctx = RestoreContext(shop=shop, user=user, dry_run=dry_run, progress=progress)
+    _load_user_map(ctx, package)
+
+    try:
+        _restore_sections(ctx, package, specs)
+        if with_settings:
+            _restore_backup_setting(ctx, package)
+    finally:
+        if not dry_run:
+            _reset_sequences(ctx.touched_models)
+
+    return {
+        "dry_run": dry_run,
+        "sections": ctx.stats,
+        "mapped_users": len(ctx.user_map),
+    }
+
+
+def restore_master_data(*, shop: Shop, package: BackupPackageReader, user=None, dry_run=False, progress=None) -> dict:
+    """
+    Restore master data (upsert, tidak menghapus data existing):
+    - categories
+    - units
+    - suppliers
+    - customers
+    - products
+    - payment methods
+    - bank accounts
+    - settings dasar (backup setting)
+
+    Row dicocokkan ke data existing lewat natural key (name/code/cell)
+    lalu lewat id; sisanya di-insert. progress(section, processed_rows)
+    dipanggil setiap batch.
+    """
+    return _run_specs(
         shop=shop,
-        backup=backup,
-        mode=mode,
+        package=package,
+        specs=MASTER_RESTORE_SPECS,
         user=user,
+        dry_run=dry_run,
+        progress=progress,
+        with_settings=True,
     )
 
+
+def restore_full_data(*, shop: Shop, package: BackupPackageReader, user=None, dry_run=False, progress=None) -> dict:
+    """
+    Restore master data lalu transaksi dalam urutan dependency FK:
+    purchases -> orders -> items -> payments -> ledgers -> movements, dst.
+
+    Setiap batch di-commit sendiri bersama remap id-nya (RestoreIdMap),
+    jadi restore yang gagal di tengah aman untuk dijalankan ulang:
+    row yang sudah masuk di-update, bukan di-insert lagi.
+    """
+    return _run_specs(
+        shop=shop,
+        package=package,
+        specs=MASTER_RESTORE_SPECS + TRANSACTION_RESTORE_SPECS,
+        user=user,
+        dry_run=dry_run,
+        progress=progress,
+        with_settings=True,
+    )
+
+
+class _RestoreProgress:
+    """
+    Callback progress(section, processed) -> RestoreHistory.metadata["restore_progress"]
+    lewat satu UPDATE (di-throttle), supaya client bisa poll restore yang jalan di background.
+    """
+
+    def __init__(self, restore: RestoreHistory):
+        self.restore = restore
+        self.sections = {}
+        self.section = None
+        self.saved_at = 0.0
+
+    def __call__(self, section, processed):
+        self.sections[section] = processed
+        now = time.monotonic()
+        if section == self.section and now - self.saved_at < RESTORE_PROGRESS_INTERVAL:
+            return
+
+        self.section = section
+        self.saved_at = now
+        self.restore.metadata = {
+            **(self.restore.metadata or {}),
+            "restore_progress": {
+                "section": section,
+                "section_rows": processed,
+                "processed_rows": sum(self.sections.values()),
+                "sections": dict(self.sections),
+                "updated_at": timezone.localtime().isoformat(),
+            },
+        }
+        RestoreHistory.objects.filter(pk=self.restore.pk).update(metadata=self.restore.metadata)
+
+
+def _execute_restore(restore: RestoreHistory, *, user=None, dry_run: bool = False) -> RestoreHistory:
+    shop = restore.shop
+    backup = restore.backup
+    mode = restore.restore_mode
+    progress = _RestoreProgress(restore)
+
     try:
-        package = load_backup_package(backup)
-        validate_restore_payload(shop=shop, backup=backup, package=package)
+        package, checksum_verified = open_verified_backup_package(backup)
+        with package:
+            validate_restore_payload(shop=shop, backup=backup, package=package)
+            media_check = validate_backup_media_entries(shop=shop, package=package) if dry_run else None
+
+            if mode == RestoreHistory.RestoreMode.MASTER:
+                result = restore_master_data(shop=shop, package=package, user=user, dry_run=dry_run, progress=progress)
+            else:
+                result = restore_full_data(shop=shop, package=package, user=user, dry_run=dry_run, progress=progress)
 
-        available_keys = sorted(list((package.get("data") or {}).keys()))
+        metadata = {
+            "validated": True,
+            "mode": mode,
+            "shop_id": shop.id,
+            "shop_code": shop.code,
+            "backup_id": backup.id,
+            "checksum_verified": checksum_verified,
+            **result,
+        }
+        if media_check is not None:
+            metadata["media_check"] = media_check
 
         restore.mark_success(
-            note=f"Restore validation completed with mode: {mode}. Actual import engine not implemented yet.",
-            metadata={
-                "validated": True,
-                "mode": mode,
-                "shop_id": shop.id,
-                "shop_code": shop.code,
-                "backup_id": backup.id,
-                "available_keys": available_keys,
-                "metadata": package.get("metadata", {}),
-            },
+            note=(
+                f"Restore dry run completed with mode: {mode}."
+                if dry_run
+                else f"Restore completed with mode: {mode}."
+            ),
+            metadata=metadata,
         )
+        if not dry_run:
+            # restore pakai bulk write (tanpa signal) -> semua report shop ini dihitung ulang
+            bump_report_version(shop.id, history=True)
         return restore
 
     except Exception as e:
@@ -185,29 +1143,55 @@ def run_restore_validation(*, shop: Shop, backup: BackupHistory, mode: str, user
         raise
 
 
-# =========================================================
-# FUTURE RESTORE STUBS
-# =========================================================
-def restore_master_data(*, shop: Shop, package: dict, user=None):
+def run_restore(*, shop: Shop, backup: BackupHistory, mode: str, user=None, dry_run: bool = False) -> RestoreHistory:
     """
-    Tahap berikutnya:
-    restore hanya master data seperti:
-    - categories
-    - units
-    - suppliers
-    - customers
-    - products
-    - payment methods
-    - bank accounts
-    - settings dasar
+    Validasi backup lalu jalankan restore sesuai mode (sinkron, untuk shell / command).
+    dry_run=True hanya validasi + menghitung row yang akan dibuat/di-update.
     """
-    raise NotImplementedError("restore_master_data is not implemented yet.")
+    restore = create_restore_history(
+        shop=shop,
+        backup=backup,
+        mode=mode,
+        user=user,
+        metadata={"mode": mode, "dry_run": dry_run},
+    )
+    return _execute_restore(restore, user=user, dry_run=dry_run)
 
 
-def restore_full_data(*, shop: Shop, package: dict, user=None):
+def queue_restore(*, shop: Shop, backup: BackupHistory, mode: str, user=None, dry_run: bool = False) -> RestoreHistory:
     """
-    Tahap berikutnya:
-    restore full data termasuk transaksi.
-    Harus dibuat sangat hati-hati agar tidak merusak tenant data existing.
+    Restore di worker background (restore besar melewati timeout request).
+    RestoreHistory dibuat RUNNING; progress di metadata["restore_progress"].
     """
-    raise NotImplementedError("restore_full_data is not implemented yet.")
\ No newline at end of file
+    restore = create_restore_history(
+        shop=shop,
+        backup=backup,
+        mode=mode,
+        user=user,
+        metadata={"mode": mode, "dry_run": dry_run},
+    )
+    submit_job(run_restore_job, restore.id)
+    return restore
+
+
+def run_restore_job(restore_id: int):
+    """Entry point worker: jalankan restore yang sudah di-queue."""
+    restore = (
+        RestoreHistory.objects
+        .select_related("shop", "backup", "restored_by")
+        .filter(pk=restore_id, status=RestoreHistory.Status.RUNNING, completed_at__isnull=True)
+        .first()
+    )
+    if not restore:
+        return None
+
+    try:
+        _execute_restore(
+            restore,
+            user=restore.restored_by,
+            dry_run=bool((restore.metadata or {}).get("dry_run")),
+        )
+    except Exception:
+        logger.exception("Restore #%s failed", restore_id)
+
+    return restore
@@ -0,0 +1,183 @@
+# pos/services/sales_export_service.py
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import DecimalField, ExpressionWrapper, F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from pos.models import OrderItem
+from pos.services.export_service import (
+    CSV_CONTENT_TYPE,
+    XLSX_CONTENT_TYPE,
+    export_file_name,
+    export_job_dir,
+    register_export_runner,
+    write_csv_file,
+    write_xlsx_file,
+)
+
+
+SALES_EXPORT_CHUNK_SIZE = 2000
+
+LINE_TOTAL = ExpressionWrapper(
+    F("quantity") * F("price"),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+# =========================================================
+# LAYOUTS
+# =========================================================
+# Each layout lists the .values_list() columns it needs and a formatter
+# that turns one tuple into an output row. Nothing else is loaded.
+def _invoice_id(order_id):
+    return f"INV{order_id:015d}"
+
+
+def _local_datetime(value):
+    return timezone.localtime(value).strftime("%Y-%m-%d %H:%M") if value else ""
+
+
+SALES_EXPORT_LAYOUTS = {
+    # sales_export_view
+    "transactions": {
+        "headers": [
+            "Transaction ID", "Date", "Customer", "Product",
+            "Qty", "Price", "Subtotal", "Discount", "Tax", "Total",
+        ],
+        "fields": [
+            "order_id", "order__created_at", "order__customer__name", "product__name",
+            "quantity", "price", "line_total", "order__discount", "order__tax", "order__total",
+        ],
+        "row": lambda r: [
+            _invoice_id(r[0]),
+            _local_datetime(r[1]),
+            r[2] or "-",
+            r[3] or "-",
+            r[4],
+            r[5],
+            r[6] or 0,
+            r[7],
+            r[8],
+            r[9],
+        ],
+    },
+    # sales_report_excel_view
+    "items": {
+        "headers": ["Product Name", "Invoice ID", "Qty", "Weight", "Total Price", "Order Date"],
+        "fields": [
+            "product__name", "order_id", "quantity", "weight_unit__name", "line_total", "order__created_at",
+        ],
+        "row": lambda r: [
+            r[0] or "-",
+            _invoice_id(r[1]),
+            r[2],
+            r[3] or "",
+            r[4] or 0,
+            _local_datetime(r[5]),
+        ],
+    },
+}
+
+
+# =========================================================
+# FILTERS
+# =========================================================
+def parse_sales_export_params(query_params) -> dict:
+    """
+    Normalisasi filter dari query string:
+    - start / end (YYYY-MM-DD), inklusif
+    - month (YYYY-MM) sebagai shortcut untuk satu bulan penuh
+    """
+    start = parse_date((query_params.get("start") or "").strip())
+    end = parse_date((query_params.get("end") or "").strip())
+
+    month = (query_params.get("month") or "").strip()
+    if month and not (start or end):
+        try:
+            year, month_number = map(int, month.split("-"))
+            start = datetime(year, month_number, 1).date()
+            next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+            end = next_month - timedelta(days=1)
+        except ValueError:
+            pass
+
+    if start and end and start > end:
+        start, end = end, start
+
+    return {
+        "start": start.isoformat() if start else "",
+        "end": end.isoformat() if end else "",
+    }
+
+
+def sales_export_queryset(*, shop_id=None, start: str = "", end: str = ""):
+    qs = OrderItem.objects.all()
+
+    if shop_id:
+        qs = qs.filter(order__shop_id=shop_id)
+
+    # range datetime aware (bukan __date) supaya index created_at terpakai
+    tz = timezone.get_current_timezone()
+    if start:
+        start_dt = timezone.make_aware(datetime.combine(parse_date(start), time.min), tz)
+        qs = qs.filter(order__created_at__gte=start_dt)
+    if end:
+        end_dt = timezone.make_aware(datetime.combine(parse_date(end) + timedelta(days=1), time.min), tz)
+        qs = qs.filter(order__created_at__lt=end_dt)
+
+    return qs.order_by("-order__created_at", "-order_id", "id")
+
+
+def iter_sales_export_rows(layout_name: str, qs):
+    layout = SALES_EXPORT_LAYOUTS[layout_name]
+    yield layout["headers"]
+
+    values = qs.annotate(line_total=LINE_TOTAL).values_list(*layout["fields"])
+    to_row = layout["row"]
+    for record in values.iterator(chunk_size=SALES_EXPORT_CHUNK_SIZE):
+        yield to_row(record)
+
+
+def sales_export_sync_max_rows() -> int:
+    return int(getattr(settings, "SALES_EXPORT_SYNC_MAX_ROWS", 100000) or 0)
+
+
+# =========================================================
+# BACKGROUND RUNNER
+# =========================================================
+@register_export_runner("sales")
+def run_sales_export(export_job):
+    params = export_job.params or {}
+    layout_name = params.get("layout") or "transactions"
+    file_format = params.get("file_format") or "xlsx"
+
+    if layout_name not in SALES_EXPORT_LAYOUTS:
+        raise ValueError(f"Unknown sales export layout '{layout_name}'.")
+
+    qs = sales_export_queryset(
+        shop_id=export_job.shop_id,
+        start=params.get("start") or "",
+        end=params.get("end") or "",
+    )
+    rows = iter_sales_export_rows(layout_name, qs)
+
+    file_name = export_file_name(f"sales_{layout_name}_{export_job.id}", file_format)
+    file_path = export_job_dir(export_job) / file_name
+
+    if file_format == "csv":
+        row_count = write_csv_file(file_path, rows) - 1
+        content_type = CSV_CONTENT_TYPE
+    else:
+        row_count = write_xlsx_file(file_path, rows, sheet_title="Sales Report") - 1
+        content_type = XLSX_CONTENT_TYPE
+
+    return {
+        "file_name": file_name,
+        "file_path": file_path,
+        "content_type": content_type,
+        "row_count": max(row_count, 0),
+    }
+
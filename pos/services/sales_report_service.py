@@ -0,0 +1,183 @@
+# pos/services/sales_report_service.py
+
+import tempfile
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+from django.utils import timezone
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+from pos.services.sales_export_service import LINE_TOTAL, sales_export_queryset
+
+
+SALES_REPORT_PAGE_SIZE = 50
+SALES_REPORT_CHUNK_SIZE = 2000
+CENT = Decimal("0.01")
+
+# Kolom yang benar-benar dipakai report; sisanya tidak di-load.
+SALES_REPORT_FIELDS = (
+    "product__name",
+    "product__weight",
+    "weight_unit__name",
+    "order_id",
+    "order__invoice_number",
+    "order__created_at",
+    "quantity",
+    "line_total",
+)
+
+
+def sales_report_queryset(*, shop_id=None, start: str = "", end: str = ""):
+    """Order line yang sudah dibayar, difilter shop + range (pakai index shop/created_at)."""
+    return sales_export_queryset(shop_id=shop_id, start=start, end=end).filter(order__is_paid=True)
+
+
+def sales_report_values(qs):
+    """.values() dengan line_total = quantity * price dihitung di DB."""
+    return qs.annotate(line_total=LINE_TOTAL).values(*SALES_REPORT_FIELDS)
+
+
+def _money(value) -> Decimal:
+    return Decimal(value or 0).quantize(CENT)
+
+
+def sales_report_totals(qs) -> dict:
+    """Total di server (satu query aggregate), bukan sum di Python / JavaScript."""
+    totals = qs.order_by().aggregate(
+        line_count=Count("id"),
+        order_count=Count("order_id", distinct=True),
+        total_qty=Sum("quantity"),
+        total_sales=Sum(LINE_TOTAL),
+    )
+    totals["total_qty"] = totals["total_qty"] or 0
+    totals["total_sales"] = _money(totals["total_sales"])
+    return totals
+
+
+def sales_report_row(record: dict) -> dict:
+    unit = record["weight_unit__name"]
+    return {
+        "product_name": record["product__name"] or "-",
+        "invoice_id": record["order__invoice_number"] or f"INV{record['order_id']:015d}",
+        "qty": record["quantity"],
+        "weight": f"{record['product__weight']} {unit}" if unit else "-",
+        "total_price": _money(record["line_total"]),
+        "order_date": timezone.localtime(record["order__created_at"]).strftime("%d %B, %Y"),
+    }
+
+
+def iter_sales_report_rows(qs):
+    for record in sales_report_values(qs).iterator(chunk_size=SALES_REPORT_CHUNK_SIZE):
+        yield sales_report_row(record)
+
+
+def period_label(start: str = "", end: str = "") -> str:
+    if start and end:
+        return f"{start} s/d {end}"
+    if start:
+        return f"sejak {start}"
+    if end:
+        return f"sampai {end}"
+    return "Semua periode"
+
+
+# =========================================================
+# PDF (reportlab, tanpa HTML)
+# =========================================================
+PDF_COLUMNS = (
+    # (judul, key, lebar, rata kanan)
+    ("Naran Produtu", "product_name", 90 * mm, False),
+    ("ID Invoice", "invoice_id", 48 * mm, False),
+    ("Quantidade", "qty", 24 * mm, True),
+    ("Weight", "weight", 30 * mm, False),
+    ("Presu Total", "total_price", 32 * mm, True),
+    ("Data Order", "order_date", 40 * mm, False),
+)
+PDF_MARGIN = 12 * mm
+PDF_ROW_HEIGHT = 5.5 * mm
+
+
+def _fit(c, text, font, size, width):
+    text = str(text)
+    while text and c.stringWidth(text, font, size) > width:
+        text = text[:-1]
+    return text
+
+
+def write_sales_report_pdf(target, rows, totals: dict, *, title: str = "Sales Report", period: str = "") -> int:
+    """
+    Tabel sales report langsung ke canvas, halaman demi halaman.
+    rows boleh generator (iter_sales_report_rows) -> tidak ada list 100k dict di memory.
+    """
+    pagesize = landscape(A4)
+    width, height = pagesize
+    c = canvas.Canvas(target, pagesize=pagesize, pageCompression=1)
+    c.setTitle(title)
+
+    def header():
+        y = height - PDF_MARGIN
+        c.setFont("Helvetica-Bold", 14)
+        c.drawCentredString(width / 2, y - 4 * mm, title)
+        c.setFont("Helvetica", 9)
+        c.drawString(PDF_MARGIN, y - 11 * mm, f"Periode: {period}")
+        c.drawRightString(width - PDF_MARGIN, y - 11 * mm, f"Page {c.getPageNumber()}")
+
+        y -= 19 * mm
+        c.setFont("Helvetica-Bold", 9)
+        x = PDF_MARGIN
+        for label, _key, col_w, right in PDF_COLUMNS:
+            if right:
+                c.drawRightString(x + col_w - 2 * mm, y, label)
+            else:
+                c.drawString(x, y, label)
+            x += col_w
+        c.line(PDF_MARGIN, y - 1.5 * mm, width - PDF_MARGIN, y - 1.5 * mm)
+        c.setFont("Helvetica", 8.5)
+        return y - PDF_ROW_HEIGHT
+
+    y = header()
+    count = 0
+    for row in rows:
+        if y < PDF_MARGIN + PDF_ROW_HEIGHT:
+            c.showPage()
+            y = header()
+
+        x = PDF_MARGIN
+        for _label, key, col_w, right in PDF_COLUMNS:
+            value = row[key]
+            if key == "total_price":
+                value = f"${value}"
+            text = _fit(c, value, "Helvetica", 8.5, col_w - 3 * mm)
+            if right:
+                c.drawRightString(x + col_w - 2 * mm, y, text)
+            else:
+                c.drawString(x, y, text)
+            x += col_w
+        y -= PDF_ROW_HEIGHT
+        count += 1
+
+    if y < PDF_MARGIN + 3 * PDF_ROW_HEIGHT:
+        c.showPage()
+        y = header()
+
+    c.line(PDF_MARGIN, y + 2 * mm, width - PDF_MARGIN, y + 2 * mm)
+    c.setFont("Helvetica-Bold", 9)
+    y -= 2 * mm
+    c.drawString(PDF_MARGIN, y, f"Total: {totals['order_count']} order, {totals['line_count']} item")
+    qty_x = PDF_MARGIN + sum(col[2] for col in PDF_COLUMNS[:3]) - 2 * mm
+    total_x = PDF_MARGIN + sum(col[2] for col in PDF_COLUMNS[:5]) - 2 * mm
+    c.drawRightString(qty_x, y, str(totals["total_qty"]))
+    c.drawRightString(total_x, y, f"${totals['total_sales']}")
+
+    c.showPage()
+    c.save()
+    return count
+
+
+def sales_report_pdf_temp_file(qs, totals: dict, *, period: str = ""):
+    output = tempfile.TemporaryFile(suffix=".pdf")
+    write_sales_report_pdf(output, iter_sales_report_rows(qs), totals, period=period)
+    output.seek(0)
+    return output
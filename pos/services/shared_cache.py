@@ -0,0 +1,48 @@
+# pos/services/shared_cache.py
+
+from django.conf import settings
+from django.core import checks
+
+# backend yang isinya hanya terlihat di proses sendiri
+LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def cache_is_shared(alias: str = "default") -> bool:
+    """
+    True kalau cache `alias` dipakai bersama semua proses (Redis, memcached,
+    database, file). LocMemCache per proses: invalidation dari worker lain
+    tidak pernah sampai.
+    """
+    backend = (settings.CACHES.get(alias) or {}).get("BACKEND", "")
+    return backend not in LOCAL_CACHE_BACKENDS
+
+
+def shared_timeout(timeout, *, local_max):
+    """
+    Timeout cache untuk data yang di-invalidate lewat signal / bump versi.
+    Tanpa shared cache, entry dibatasi local_max detik supaya proses lain
+    paling lama telat segitu (timeout None = tanpa expiry juga dibatasi).
+    """
+    if cache_is_shared():
+        return timeout
+    if timeout is None:
+        return local_max
+    return min(timeout, local_max)
+
+
+def check_shared_cache(app_configs, **kwargs):
+    if settings.DEBUG or cache_is_shared():
+        return []
+    return [
+        checks.Warning(
+            "The default cache is per-process (LocMemCache).",
+            hint=(
+                "Set REDIS_URL so cached data is invalidated across gunicorn "
+                "workers; until then cache timeouts are capped."
+            ),
+            id="pos.W001",
+        )
+    ]
@@ -1,64 +1,309 @@
+import logging
+from datetime import datetime, time
 from decimal import Decimal
+
 from django.db import transaction
-from django.db.models import Sum, Value, DecimalField
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, IntegerField, Q, Sum, Value, When
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+from pos.models_shift import Shift, ShiftStatus
+
+logger = logging.getLogger(__name__)
+
 DEC0 = Value(Decimal("0.00"), output_field=DecimalField(max_digits=18, decimal_places=2))
+ZERO = Decimal("0.00")
+TOTAL_FIELDS = ("total_sales", "total_refunds", "total_expenses", "expected_cash")
 
 
-def _sum_or_zero(qs, field_name: str) -> Decimal:
+def _sum_or_zero(qs, field_name) -> Decimal:
     """
     Sum decimal field safely (returns Decimal 0.00 if null).
     """
     agg = qs.aggregate(s=Coalesce(Sum(field_name), DEC0))
-    return agg["s"] or Decimal("0.00")
+    return agg["s"] or ZERO
 
 
-@transaction.atomic
-def recompute_shift_totals(shift, OrderModel, order_total_field: str = "total"):
+def _dec(value) -> Decimal:
+    return Decimal(str(value or 0)).quantize(Decimal("0.01"))
+
+
+# =========================================================
+# READ (satu row, index shop/status/opened_at)
+# =========================================================
+def find_open_shift(shop_id: int, cashier=None):
+    qs = Shift.objects.select_related("cashier").filter(
+        shop_id=shop_id,
+        status=ShiftStatus.OPEN,
+        closed_at__isnull=True,
+    )
+    if cashier is not None:
+        qs = qs.filter(cashier=cashier)
+    return qs.order_by("-opened_at", "-id").first()
+
+
+def can_use_shop_shift(user) -> bool:
+    """Owner / manager boleh menumpang laci kasir lain (hanya untuk stamp transaksi)."""
+    return bool(getattr(user, "is_owner", False) or getattr(user, "is_manager", False))
+
+
+def resolve_open_shift(shop_id, user=None, *, at=None):
+    """
+    Laci (shift OPEN) yang menerima transaksi user ini:
+    shift milik user sendiri dulu; hanya owner / manager (bantu checkout)
+    yang fallback ke shift OPEN terbaru di shop. Kasir tanpa shift sendiri
+    -> None, transaksinya tidak masuk laci kasir lain. Satu query.
+
+    Khusus atribusi transaksi; tutup shift / status laci kasir pakai
+    find_open_shift(shop_id, cashier=user).
+
+    `at` = waktu transaksi; shift yang dibuka setelah itu dilewati
+    (mis. expense backdated). Tidak ada -> None.
+    """
+    if not shop_id:
+        return None
+
+    qs = Shift.objects.select_related("cashier").filter(
+        shop_id=shop_id,
+        status=ShiftStatus.OPEN,
+        closed_at__isnull=True,
+    )
+    if at is not None:
+        qs = qs.filter(opened_at__lte=at)
+
+    user_id = getattr(user, "pk", None)
+    if not can_use_shop_shift(user):
+        if not user_id:
+            return None
+        return qs.filter(cashier_id=user_id).order_by("-opened_at", "-id").first()
+
+    qs = qs.annotate(
+        own=Case(When(cashier_id=user_id, then=Value(1)), default=Value(0), output_field=IntegerField())
+    ).order_by("-own", "-opened_at", "-id")
+    return qs.first()
+
+
+# =========================================================
+# INCREMENTAL TOTALS
+# =========================================================
+def bump_shift(shift_id, *, sales=ZERO, refunds=ZERO, expenses=ZERO) -> int:
+    """
+    Tambah counter satu shift OPEN (satu UPDATE atomik dengan F()).
+    Dipanggil di dalam transaksi checkout / retur / expense, jadi ikut rollback.
+    Shift sudah CLOSED -> no-op (total Z sudah final), return 0.
+    """
+    sales, refunds, expenses = _dec(sales), _dec(refunds), _dec(expenses)
+    if not shift_id or not (sales or refunds or expenses):
+        return 0
+
+    cash_delta = sales - refunds - expenses
+    return Shift.objects.filter(pk=shift_id, status=ShiftStatus.OPEN).update(
+        total_sales=F("total_sales") + sales,
+        total_refunds=F("total_refunds") + refunds,
+        total_expenses=F("total_expenses") + expenses,
+        expected_cash=F("expected_cash") + cash_delta,
+    )
+
+
+def record_order_sale(order) -> int:
+    if not getattr(order, "is_paid", False):
+        return 0
+    return bump_shift(order.shift_id, sales=order.total)
+
+
+def _line_total():
+    return ExpressionWrapper(
+        F("quantity") * F("unit_price"),
+        output_field=DecimalField(max_digits=18, decimal_places=2),
+    )
+
+
+def return_refund_total(product_return) -> Decimal:
+    return _sum_or_zero(product_return.items.all(), _line_total())
+
+
+def record_product_return(product_return) -> int:
+    if not product_return.shift_id:
+        return 0
+    return bump_shift(product_return.shift_id, refunds=return_refund_total(product_return))
+
+
+def expense_datetime(day, at_time=None):
+    """Expense menyimpan date + time lokal; gabungkan jadi datetime aware."""
+    tz = timezone.get_current_timezone()
+    return timezone.make_aware(datetime.combine(day, at_time or time.min), tz)
+
+
+def record_expense(expense, *, sign: int = 1) -> int:
+    """sign=-1 untuk membatalkan (expense dihapus / nilai lama sebelum update)."""
+    return bump_shift(expense.shift_id, expenses=_dec(expense.amount) * sign)
+
+
+# =========================================================
+# FULL RECOMPUTE (rekonsiliasi saat close / command)
+# =========================================================
+def compute_shift_totals(shift) -> dict:
+    """
+    Hitung ulang total shift dari transaksi yang di-stamp ke shift ini
+    (index shift, ...), bukan scan window created_at.
+    """
+    from pos.models import Expense, Order, ProductReturnItem
+
+    total_sales = _sum_or_zero(Order.objects.filter(shift=shift, is_paid=True), "total")
+    total_refunds = _sum_or_zero(ProductReturnItem.objects.filter(product_return__shift=shift), _line_total())
+    total_expenses = _sum_or_zero(Expense.objects.filter(shift=shift), "amount")
+
+    return {
+        "total_sales": _dec(total_sales),
+        "total_refunds": _dec(total_refunds),
+        "total_expenses": _dec(total_expenses),
+        "expected_cash": _dec((shift.opening_cash or ZERO) + total_sales - total_refunds - total_expenses),
+    }
+
+
+def shift_report(shift) -> dict:
+    """
+    Laporan X (shift masih OPEN) / Z (CLOSED): total dari row shift +
+    rincian pembayaran per metode. Semua lookup lewat index (shift, ...).
     """
-    Compute shift totals based on your current Order model.
+    from pos.models import Order, SalePayment
+
+    orders = Order.objects.filter(shift=shift, is_paid=True).aggregate(count=Count("id"))
+    payments = (
+        SalePayment.objects.filter(shift=shift)
+        .values("payment_method_id", "payment_method__name", "payment_method__payment_type")
+        .annotate(amount=Sum("amount"), count=Count("id"))
+        .order_by("-amount")
+    )
 
-    Notes (based on your Order fields):
-    - Order has NO shop/shop_id field -> do NOT filter by shop_id.
-    - Order has is_paid boolean -> use is_paid=True as "successful orders".
-    - Order has created_at -> filter by shift time window.
+    return {
+        "type": "Z" if shift.status == ShiftStatus.CLOSED else "X",
+        "orders": orders["count"],
+        "payments": [
+            {
+                "payment_method_id": row["payment_method_id"],
+                "name": row["payment_method__name"],
+                "payment_type": row["payment_method__payment_type"],
+                "amount": str(_dec(row["amount"])),
+                "count": row["count"],
+            }
+            for row in payments
+        ],
+    }
+
+
+# =========================================================
+# BACKFILL (transaksi lama sebelum ada kolom shift)
+# =========================================================
+def _local_window_q(start, end) -> Q:
+    """Filter Expense (date + time lokal terpisah) dalam [start, end]."""
+    tz = timezone.get_current_timezone()
+    s = timezone.localtime(start, tz)
+    e = timezone.localtime(end, tz)
+    return (
+        (Q(date__gt=s.date()) | Q(date=s.date(), time__gte=s.time()))
+        & (Q(date__lt=e.date()) | Q(date=e.date(), time__lte=e.time()))
+    )
+
+
+@transaction.atomic
+def backfill_shift_attribution(shift) -> dict:
+    """
+    Stamp transaksi tanpa shift yang jatuh di window shift ini:
+    transaksi kasir shift ini, plus transaksi user lain yang tidak punya
+    shift sendiri yang overlap (owner / manager yang bantu checkout).
+    Jalankan per shift urut opened_at.
     """
+    from pos.models import Expense, Order, ProductReturn, SalePayment
 
     time_end = shift.closed_at or timezone.now()
 
-    # ✅ only paid orders inside shift window
-    orders = OrderModel.objects.filter(
+    other_cashiers = list(
+        Shift.objects.filter(shop_id=shift.shop_id, opened_at__lte=time_end)
+        .filter(Q(closed_at__isnull=True) | Q(closed_at__gte=shift.opened_at))
+        .exclude(pk=shift.pk)
+        .exclude(cashier_id=shift.cashier_id)
+        .values_list("cashier_id", flat=True)
+        .distinct()
+    )
+
+    orders = Order.objects.filter(
+        shop_id=shift.shop_id,
+        shift__isnull=True,
         created_at__gte=shift.opened_at,
         created_at__lte=time_end,
-        is_paid=True,
     )
+    returns = ProductReturn.objects.filter(
+        shop_id=shift.shop_id,
+        shift__isnull=True,
+        returned_at__gte=shift.opened_at,
+        returned_at__lte=time_end,
+    )
+
+    stamped_orders = orders.exclude(served_by_id__in=other_cashiers).update(shift=shift)
+    stamped_returns = returns.exclude(returned_by_id__in=other_cashiers).update(shift=shift)
+
+    return {
+        "orders": stamped_orders,
+        "payments": SalePayment.objects.filter(shift__isnull=True, order__shift=shift).update(shift=shift),
+        "returns": stamped_returns,
+        "expenses": Expense.objects.filter(
+            _local_window_q(shift.opened_at, time_end),
+            shop_id=shift.shop_id,
+            shift__isnull=True,
+        ).update(shift=shift),
+    }
+
+
+def _cash_difference(shift) -> Decimal:
+    if shift.status == ShiftStatus.CLOSED and shift.closing_cash is not None:
+        return (shift.closing_cash or ZERO) - (shift.expected_cash or ZERO)
+    return ZERO
+
+
+@transaction.atomic
+def reconcile_shift(shift, *, fix: bool = True) -> dict:
+    """
+    Bandingkan counter incremental dengan hitung ulang penuh.
+    Return {field: (tersimpan, seharusnya)} untuk field yang beda.
+    fix=True -> counter yang drift ditimpa + cash_difference dihitung ulang.
+    """
+    shift = Shift.objects.select_for_update().get(pk=shift.pk)
+    expected = compute_shift_totals(shift)
+
+    drift = {
+        field: (getattr(shift, field), value)
+        for field, value in expected.items()
+        if _dec(getattr(shift, field)) != value
+    }
+
+    if drift:
+        logger.warning("Shift #%s totals drifted: %s", shift.pk, drift)
+
+    if fix:
+        for field, value in expected.items():
+            setattr(shift, field, value)
+        shift.cash_difference = _cash_difference(shift)
+        if drift or shift.status == ShiftStatus.CLOSED:
+            shift.save(update_fields=[*TOTAL_FIELDS, "cash_difference"])
+
+    return drift
+
+
+@transaction.atomic
+def close_shift(shift, *, closing_cash, note: str = ""):
+    """
+    Tutup shift: counter diverifikasi sekali (reconcile), lalu
+    cash_difference = closing_cash - expected_cash.
+    """
+    shift = Shift.objects.select_for_update().get(pk=shift.pk)
+    shift.status = ShiftStatus.CLOSED
+    shift.closed_at = timezone.now()
+    shift.closing_cash = closing_cash
+    if note:
+        shift.note = note
+    shift.save(update_fields=["status", "closed_at", "closing_cash", "note"])
+
+    reconcile_shift(shift, fix=True)
+    return Shift.objects.select_related("cashier").get(pk=shift.pk)
 
-    # ✅ total sales from Order.total (default) or another field if you pass it
-    total_sales = _sum_or_zero(orders, order_total_field)
-
-    # optional: refunds/expenses (keep 0 if not implemented yet)
-    total_refunds = Decimal("0.00")
-    total_expenses = Decimal("0.00")
-
-    expected_cash = (shift.opening_cash or Decimal("0.00")) + total_sales - total_refunds - total_expenses
-
-    shift.total_sales = total_sales
-    shift.total_refunds = total_refunds
-    shift.total_expenses = total_expenses
-    shift.expected_cash = expected_cash
-
-    if shift.status == "CLOSED" and shift.closing_cash is not None:
-        shift.cash_difference = (shift.closing_cash or Decimal("0.00")) - expected_cash
-    else:
-        shift.cash_difference = Decimal("0.00")
-
-    shift.save(update_fields=[
-        "total_sales",
-        "total_refunds",
-        "total_expenses",
-        "expected_cash",
-        "cash_difference",
-    ])
-    return shift
\ No newline at end of file
@@ -0,0 +1,115 @@
+# pos/services/shop_cache.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from pos.services.shared_cache import cache_is_shared, shared_timeout
+
+SHOP_KEY = "tenant:shop:{shop_id}"
+SHOP_CODE_KEY = "tenant:shop-code:{code}"
+
+
+def _timeout() -> int:
+    # tanpa shared cache, invalidation hanya sampai ke proses sendiri
+    return shared_timeout(
+        int(getattr(settings, "TENANT_SHOP_CACHE_TIMEOUT", 300)),
+        local_max=int(getattr(settings, "TENANT_SHOP_LOCAL_CACHE_SECONDS", 10)),
+    )
+
+
+def _load_shop(**lookup):
+    from pos.models import Shop
+
+    # ShopFeature (one-to-one) ikut di-cache bersama row Shop
+    return Shop.objects.select_related("features").filter(**lookup).first()
+
+
+def get_cached_shop(shop_id):
+    """
+    Row Shop (+ features) dari shared cache; miss -> 1 query.
+    Di-invalidate saat Shop / ShopFeature disimpan atau dihapus.
+    """
+    if not shop_id:
+        return None
+
+    key = SHOP_KEY.format(shop_id=shop_id)
+    shop = cache.get(key)
+    if shop is None:
+        shop = _load_shop(pk=shop_id)
+        if shop is not None:
+            cache.set(key, shop, _timeout())
+    return shop
+
+
+def get_cached_shop_by_code(code):
+    """Kode shop -> id di-cache terpisah; row-nya tetap lewat get_cached_shop()."""
+    code = (code or "").strip()
+    if not code:
+        return None
+
+    code_key = SHOP_CODE_KEY.format(code=code)
+    shop_id = cache.get(code_key)
+    if shop_id:
+        shop = get_cached_shop(shop_id)
+        # kode bisa sudah diganti sejak di-cache
+        if shop is not None and shop.code == code:
+            return shop
+
+    shop = _load_shop(code=code)
+    if shop is not None:
+        cache.set(code_key, shop.pk, _timeout())
+        cache.set(SHOP_KEY.format(shop_id=shop.pk), shop, _timeout())
+    return shop
+
+
+def shop_is_active(shop) -> bool:
+    """
+    is_active untuk jalur keamanan (resolve_shop_for_user, api_login).
+    Shared cache: row sudah di-invalidate lintas proses saat Shop disimpan.
+    Cache per proses: shop bisa dinonaktifkan lewat worker lain -> is_active
+    dibaca ulang dari DB (1 query exists).
+    """
+    if shop is None or not shop.is_active:
+        return False
+    if cache_is_shared():
+        return True
+
+    from pos.models import Shop
+
+    return Shop.objects.filter(pk=shop.pk, is_active=True).exists()
+
+
+def invalidate_shop(shop_id):
+    if not shop_id:
+        return
+
+    key = SHOP_KEY.format(shop_id=shop_id)
+    cache.delete(key)
+    # request lain bisa mengisi ulang cache sebelum transaksi ini commit
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+# =========================================================
+# SIGNALS
+# =========================================================
+def _shop_written(sender, instance, **kwargs):
+    invalidate_shop(instance.pk)
+
+
+def _shop_feature_written(sender, instance, **kwargs):
+    invalidate_shop(instance.shop_id)
+
+
+def connect_shop_cache_signals():
+    from pos.models import Shop, ShopFeature
+
+    hooks = (
+        (Shop, _shop_written),
+        (ShopFeature, _shop_feature_written),
+    )
+    for model, handler in hooks:
+        uid = f"shop-cache-{model.__name__}"
+        post_save.connect(handler, sender=model, dispatch_uid=f"{uid}-save")
+        post_delete.connect(handler, sender=model, dispatch_uid=f"{uid}-delete")
@@ -1,6 +1,7 @@
 from rest_framework.exceptions import ValidationError, PermissionDenied
 
-from pos.models import Shop
+from pos.models import CustomUser
+from pos.services.shop_cache import get_cached_shop, get_cached_shop_by_code, shop_is_active
 
 try:
     from pos.models import ShopStaff
@@ -10,6 +11,114 @@ except Exception:
 
 ALLOWED_OWNER_CHAT_ROLES = {"owner", "admin", "manager"}
 
+_UNRESOLVED = object()
+
+
+class TenantContext:
+    """
+    Konteks tenant per request (request.tenant), di-resolve sekali lalu dipakai
+    ulang oleh view, serializer, dan permission:
+    - shop: row Shop (+ features) dari shared cache, juga dipasang ke request.user.shop
+    - role, is_platform_admin, permissions (feature permission role user)
+
+    Resolve lazy: token auth DRF baru men-set request.user di dalam view,
+    jadi nilai dihitung ulang kalau user di request berganti.
+    """
+
+    def __init__(self, request):
+        self._request = request
+        self._user_pk = _UNRESOLVED
+        self._shop = _UNRESOLVED
+        self._permissions = None
+
+    @property
+    def user(self):
+        user = getattr(self._request, "user", None)
+        user_pk = getattr(user, "pk", None)
+        if user_pk != self._user_pk:
+            self._user_pk = user_pk
+            self._shop = _UNRESOLVED
+            self._permissions = None
+        return user
+
+    @property
+    def is_authenticated(self) -> bool:
+        user = self.user
+        return bool(user and user.is_authenticated)
+
+    @property
+    def is_platform_admin(self) -> bool:
+        return bool(self.is_authenticated and self.user.is_superuser)
+
+    @property
+    def role(self) -> str:
+        return _get_user_role(self.user)
+
+    @property
+    def shop(self):
+        user = self.user
+        if self._shop is _UNRESOLVED:
+            shop = get_cached_shop(getattr(user, "shop_id", None))
+            if shop is not None and isinstance(user, CustomUser):
+                # request.user.shop di kode lama tidak query lagi
+                CustomUser.shop.field.set_cached_value(user, shop)
+            self._shop = shop
+        return self._shop
+
+    @property
+    def shop_id(self):
+        shop = self.shop
+        return shop.pk if shop is not None else None
+
+    @property
+    def features(self):
+        """ShopFeature shop ini (None kalau belum dibuat)."""
+        shop = self.shop
+        if shop is None:
+            return None
+        return getattr(shop, "features", None)
+
+    @property
+    def permissions(self) -> frozenset:
+        user = self.user
+        if self._permissions is None:
+            getter = getattr(user, "get_feature_permissions", None)
+            self._permissions = frozenset(getter() if getter else ())
+        return self._permissions
+
+    def has_permission(self, code: str) -> bool:
+        return self.is_platform_admin or code in self.permissions
+
+
+def get_request_tenant(request):
+    """
+    request.tenant dari TenantMiddleware; request di luar middleware
+    (test, DRF Request tanpa middleware) dapat konteks baru yang disimpan di request.
+    """
+    tenant = getattr(request, "tenant", None)
+    if tenant is None:
+        tenant = TenantContext(getattr(request, "_request", request))
+        try:
+            request.tenant = tenant
+        except AttributeError:
+            pass
+    return tenant
+
+
+def resolve_request_shop_id(request):
+    """
+    shop_id untuk API per-shop (shift, finance) dari request.tenant:
+    - tenant user -> shop user sendiri
+    - platform admin -> ?shop_id (tanpa itu None)
+    """
+    tenant = get_request_tenant(request)
+    if tenant.is_platform_admin:
+        try:
+            return int(request.query_params.get("shop_id") or 0) or None
+        except (TypeError, ValueError):
+            return None
+    return tenant.shop_id
+
 
 def get_request_shop_code(request):
     return (
@@ -37,9 +146,8 @@ def resolve_shop_for_user(request):
 
     # 1) Explicit shop_code
     if shop_code:
-        try:
-            shop = Shop.objects.get(code=shop_code, is_active=True)
-        except Shop.DoesNotExist:
+        shop = get_cached_shop_by_code(shop_code)
+        if not shop_is_active(shop):
             raise ValidationError({"shop_code": "Shop tidak ditemukan / tidak aktif."})
 
         if getattr(user, "is_superuser", False):
@@ -64,10 +172,10 @@ def resolve_shop_for_user(request):
     # 2) fallback from user.shop_id
     user_shop_id = getattr(user, "shop_id", None)
     if user_shop_id:
-        try:
-            return Shop.objects.get(id=user_shop_id, is_active=True)
-        except Shop.DoesNotExist:
+        shop = get_request_tenant(request).shop
+        if not shop_is_active(shop):
             raise ValidationError({"shop": "Shop user tidak valid / tidak aktif."})
+        return shop
 
     # 3) fallback from ShopStaff if only one active shop
     if ShopStaff is not None:
@@ -54,6 +54,7 @@ router.register(r"stockmovements", StockMovementViewSet, basename="stockmovement
 urlpatterns = [
     path("auth/login/", views.api_login, name="api_login"),
     path("auth/login", views.api_login, name="api_login_noslash"),
+    path("auth/logout/", views.api_logout, name="api_logout"),
 
     path("shop/me/", MyShopAPIView.as_view(), name="my_shop"),
 
@@ -73,6 +74,8 @@ urlpatterns = [
     
     path("", include("pos.urls_import")),
 
+    path("", include("pos.urls_export")),
+
     path("", include("pos.api.urls")),
     path("", include(router.urls)),
 ]
\ No newline at end of file
@@ -8,6 +8,7 @@ from .views_backup import (
     BackupDownloadAPIView,
     BackupRestoreAPIView,
     RestoreHistoryListAPIView,
+    RestoreHistoryDetailAPIView,
 )
 
 urlpatterns = [
@@ -21,4 +22,5 @@ urlpatterns = [
     path("backups/<int:pk>/restore/", BackupRestoreAPIView.as_view(), name="backup_restore"),
 
     path("restores/", RestoreHistoryListAPIView.as_view(), name="restore_history_list"),
+    path("restores/<int:pk>/", RestoreHistoryDetailAPIView.as_view(), name="restore_history_detail"),
 ]
\ No newline at end of file
@@ -0,0 +1,13 @@
+# pos/urls_export.py
+
+from django.urls import path
+
+from .views_export import (
+    ExportJobDetailAPIView,
+    ExportJobDownloadAPIView,
+)
+
+urlpatterns = [
+    path("exports/<int:pk>/", ExportJobDetailAPIView.as_view(), name="export_job_detail"),
+    path("exports/<int:pk>/download/", ExportJobDownloadAPIView.as_view(), name="export_job_download"),
+]
@@ -9,6 +9,8 @@ from .views_import import (
     ImportJobDetailAPIView,
     ImportJobValidateAPIView,
     ImportJobConfirmAPIView,
+    ImportJobCancelAPIView,
+    ImportJobErrorReportAPIView,
 )
 
 urlpatterns = [
@@ -18,5 +20,7 @@ urlpatterns = [
     path("import-master-data/jobs/", ImportJobListCreateAPIView.as_view(), name="import_job_list_create"),
     path("import-master-data/jobs/<int:pk>/", ImportJobDetailAPIView.as_view(), name="import_job_detail"),
     path("import-master-data/jobs/<int:pk>/validate/", ImportJobValidateAPIView.as_view(), name="import_job_validate"),
+    path("import-master-data/jobs/<int:pk>/errors/download/", ImportJobErrorReportAPIView.as_view(), name="import_job_error_report"),
     path("import-master-data/jobs/<int:pk>/confirm/", ImportJobConfirmAPIView.as_view(), name="import_job_confirm"),
+    path("import-master-data/jobs/<int:pk>/cancel/", ImportJobCancelAPIView.as_view(), name="import_job_cancel"),
 ]
\ No newline at end of file
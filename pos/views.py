@@ -1,28 +1,25 @@
-import io
-import os
+import hashlib
 import json
 from datetime import date, timedelta
 from decimal import Decimal
 
-from django.conf import settings
 from django.contrib import admin as django_admin
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate
 from django.contrib.auth.decorators import login_required
 from django.db import models, transaction
-from django.db.models import Sum, Value, DecimalField, F, ExpressionWrapper
-from django.db.models.functions import Coalesce, TruncDate, TruncMonth
-from django.http import HttpResponse, Http404
+from django.db.models import Sum, DecimalField, F, ExpressionWrapper
+from django.db.models.functions import TruncDate, TruncMonth
+from django.http import FileResponse, HttpResponse, Http404, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.template import TemplateDoesNotExist
-from django.template.loader import get_template
 from django.utils import timezone
 from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags, quote_etag
 
 from rest_framework import status, viewsets
 from rest_framework.exceptions import ValidationError
-from rest_framework.authentication import TokenAuthentication, SessionAuthentication
-from rest_framework.authtoken.models import Token
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.decorators import api_view, permission_classes, authentication_classes, action
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -30,12 +27,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
-from reportlab.graphics.barcode import code128
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.pdfgen import canvas
-from xhtml2pdf import pisa
-
+from .authentication import CachedTokenAuthentication, issue_token, revoke_token
 from .decorators import role_required
 from .models import (
     Order, OrderItem, Customer, Supplier, Product, Category, Unit, Banner, Shop, Expense,
@@ -62,6 +54,28 @@ from .serializers import (
     StockTransferSerializer,
 )
 from .serializers_purchases import PurchaseSerializer, PurchaseCreateSerializer
+from .services.barcode_label_service import (
+    DEFAULT_LABEL_LAYOUT,
+    label_layout,
+    label_pdf_temp_file,
+    label_products,
+    label_sync_max_labels,
+    parse_label_ids,
+)
+from .services.export_service import queue_export
+from .services.finance_service import sales_expense_by_day
+from .services.receipt_service import (
+    RECEIPT_TEXT_FORMATS,
+    build_receipt,
+    receipt_order_queryset,
+    receipt_pdf_bytes,
+)
+from .services.report_cache import cached_day_rows
+from .services.shop_cache import get_cached_shop_by_code, shop_is_active
+from .services.shift_service import record_expense, record_order_sale, resolve_open_shift
+from .tenant import get_request_tenant
+from .report_views import sales_report_context
+from .views_export import export_job_payload
 
 
 # =========================
@@ -85,7 +99,7 @@ def _render_with_fallback(request, templates, context):
 
 
 def _user_shop(request):
-    return getattr(request.user, "shop", None)
+    return get_request_tenant(request).shop
 
 
 def _require_user_shop(request):
@@ -183,8 +197,32 @@ class TenantReadOnlyModelViewSet(RequestContextMixin, viewsets.ReadOnlyModelView
         return qs
 
 
-ORDER_TOTAL_FIELD = "total"
-EXPENSE_AMOUNT_FIELD = "amount"
+def _report_shop_id(request):
+    """
+    (shop_id, allowed) untuk report cache, sama dengan _shop_filter_or_all:
+    superuser -> (None, True) = semua shop; user tanpa shop -> (None, False) = kosong.
+    """
+    if request.user.is_superuser:
+        return None, True
+    shop = _user_shop(request)
+    if not shop:
+        return None, False
+    return shop.id, True
+
+
+def _sales_expense_rows(request, start, end):
+    """Baris per hari {date, sales, expense} (Decimal), di-cache per shop + range + versi data."""
+    shop_id, allowed = _report_shop_id(request)
+    if not allowed:
+        return []
+
+    return cached_day_rows(
+        dataset="sales_expense_by_day",
+        shop_id=shop_id,
+        start=start,
+        end=end,
+        compute=lambda s, e: sales_expense_by_day(shop_id=shop_id, start=s, end=e),
+    )
 
 
 # =========================
@@ -203,63 +241,21 @@ class DailyProfitReportAPIView(APIView):
         if not start:
             start = end - timedelta(days=13)
 
-        sales_qs = (
-            _shop_filter_or_all(
-                request,
-                Order.objects.filter(
-                    is_paid=True,
-                    created_at__date__gte=start,
-                    created_at__date__lte=end
-                )
-            )
-            .annotate(d=TruncDate("created_at"))
-            .values("d")
-            .annotate(
-                total=Coalesce(
-                    Sum("total"),
-                    Value(0),
-                    output_field=DecimalField(max_digits=18, decimal_places=2)
-                )
-            )
-            .order_by("d")
-        )
-
-        exp_qs = (
-            _shop_filter_or_all(
-                request,
-                Expense.objects.filter(date__gte=start, date__lte=end)
-            )
-            .values("date")
-            .annotate(
-                total=Coalesce(
-                    Sum("amount"),
-                    Value(0),
-                    output_field=DecimalField(max_digits=18, decimal_places=2)
-                )
-            )
-            .order_by("date")
-        )
-
-        sales_map = {row["d"]: row["total"] for row in sales_qs}
-        exp_map = {row["date"]: row["total"] for row in exp_qs}
-        all_days = sorted(set(list(sales_map.keys()) + list(exp_map.keys())))
-
         rows = []
         total_sales = Decimal("0")
         total_exp = Decimal("0")
 
-        for d in all_days:
-            s = sales_map.get(d, Decimal("0"))
-            e = exp_map.get(d, Decimal("0"))
-            p = s - e
+        for row in _sales_expense_rows(request, start, end):
+            s = row["sales"]
+            e = row["expense"]
             total_sales += s
             total_exp += e
 
             rows.append({
-                "date": d.isoformat(),
+                "date": row["date"].isoformat(),
                 "sales": float(s),
                 "expense": float(e),
-                "profit": float(p),
+                "profit": float(s - e),
             })
 
         return Response({
@@ -286,50 +282,20 @@ class MonthlyPLReportAPIView(APIView):
         if not end:
             end = today
 
-        sales_qs = (
-            _shop_filter_or_all(
-                request,
-                Order.objects.filter(
-                    is_paid=True,
-                    created_at__date__gte=start,
-                    created_at__date__lte=end
-                )
-            )
-            .annotate(d=TruncDate("created_at"))
-            .values("d")
-            .annotate(total=Sum("total"))
-            .order_by("d")
-        )
-
-        exp_qs = (
-            _shop_filter_or_all(
-                request,
-                Expense.objects.filter(date__gte=start, date__lte=end)
-            )
-            .values("date")
-            .annotate(total=Sum("amount"))
-            .order_by("date")
-        )
-
-        sales_map = {row["d"]: float(row["total"] or 0) for row in sales_qs}
-        exp_map = {row["date"]: float(row["total"] or 0) for row in exp_qs}
-        all_days = sorted(set(list(sales_map.keys()) + list(exp_map.keys())))
-
         rows = []
         total_sales = 0.0
         total_exp = 0.0
 
-        for d in all_days:
-            s = float(sales_map.get(d, 0))
-            e = float(exp_map.get(d, 0))
-            p = s - e
+        for row in _sales_expense_rows(request, start, end):
+            s = float(row["sales"])
+            e = float(row["expense"])
             total_sales += s
             total_exp += e
             rows.append({
-                "date": d.strftime("%Y-%m-%d"),
+                "date": row["date"].strftime("%Y-%m-%d"),
                 "sales": round(s, 2),
                 "expense": round(e, 2),
-                "profit": round(p, 2),
+                "profit": round(s - e, 2),
             })
 
         return Response({
@@ -344,27 +310,17 @@ class MonthlyPLReportAPIView(APIView):
 
 
 @api_view(["GET"])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsOwnerOrManagerOrPlatformAdmin])
 def net_income_today(request):
     today = timezone.localdate()
-    dec = DecimalField(max_digits=12, decimal_places=2)
 
-    sales = (
-        _shop_filter_or_all(
-            request,
-            Order.objects.filter(is_paid=True, created_at__date=today)
-        )
-        .aggregate(v=Coalesce(Sum(ORDER_TOTAL_FIELD), Value(0), output_field=dec))["v"]
-    )
-
-    expense = (
-        _shop_filter_or_all(
-            request,
-            Expense.objects.filter(date=today)
-        )
-        .aggregate(v=Coalesce(Sum(EXPENSE_AMOUNT_FIELD), Value(0), output_field=dec))["v"]
-    )
+    # bucket hari ini sama dengan yang dipakai daily-profit / monthly-pl
+    sales = Decimal("0")
+    expense = Decimal("0")
+    for row in _sales_expense_rows(request, today, today):
+        sales += row["sales"]
+        expense += row["expense"]
 
     net_income = sales - expense
 
@@ -512,6 +468,7 @@ def pos_checkout(request):
                 table_number="",
                 delivery_address="",
                 delivery_fee=Decimal("0.00"),
+                shift=resolve_open_shift(shop.id, request.user),
             )
 
             for product, qty in validated_items:
@@ -556,6 +513,7 @@ def pos_checkout(request):
             order.discount = discount
             order.total = total
             order.save(update_fields=["subtotal", "tax", "discount", "total"])
+            record_order_sale(order)
 
     except ValidationError as e:
         error_text = str(e.detail[0] if hasattr(e, "detail") and isinstance(e.detail, list) else e.detail if hasattr(e, "detail") else str(e))
@@ -619,34 +577,13 @@ def expense_chart_view(request):
 
 @role_required(["owner", "manager"])
 def sales_report_view(request):
-    month = request.GET.get("month")
-    rows = []
-
-    items = _shop_filter_or_all(
-        request,
-        OrderItem.objects.select_related("order", "product", "weight_unit").filter(order__is_paid=True),
-        shop_field="order__shop"
-    )
-
-    if month:
-        try:
-            year, month_number = month.split("-")
-            items = items.filter(order__created_at__year=year, order__created_at__month=month_number)
-        except ValueError:
-            pass
-
-    for item in items:
-        rows.append({
-            "product_name": item.product.name,
-            "invoice_id": item.order.invoice_number or f"INV{item.order.id:015d}",
-            "qty": item.quantity,
-            "weight": f"{item.product.weight} {item.weight_unit.name}" if item.weight_unit else "-",
-            "total_price": item.quantity * item.price,
-            "order_date": item.order.created_at.strftime("%d %B, %Y"),
-        })
+    try:
+        report = sales_report_context(request)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
 
     context = _admin_context(request, "Sales Report")
-    context.update({"rows": rows})
+    context.update(report)
     return render(request, "pos/sales_report.html", context)
 
 
@@ -974,6 +911,11 @@ class ExpenseViewSet(TenantModelViewSet):
     tenant_model = Expense
     tenant_ordering = ("-date", "-time", "-id")
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        record_expense(instance, sign=-1)
+        instance.delete()
+
 
 class BannerViewSet(ModelViewSet):
     serializer_class = BannerSerializer
@@ -1652,253 +1594,161 @@ class StockAdjustmentViewSet(RequestContextMixin, viewsets.ModelViewSet):
 # =========================
 # Receipt PDF
 # =========================
-def _link_callback(uri, rel):
-    if uri.startswith(settings.MEDIA_URL):
-        path = os.path.join(settings.MEDIA_ROOT, uri.replace(settings.MEDIA_URL, ""))
-        if os.path.isfile(path):
-            return path
-
-    if uri.startswith(settings.STATIC_URL):
-        path = os.path.join(settings.STATIC_ROOT, uri.replace(settings.STATIC_URL, ""))
-        if os.path.isfile(path):
-            return path
-
-    return uri
-
-
 @login_required
 def order_receipt_pdf(request, order_id):
-    qs = Order.objects.prefetch_related(
-        "items__product", "items__weight_unit"
-    ).select_related(
-        "served_by", "shop"
-    )
+    qs = receipt_order_queryset()
 
     if request.user.is_superuser:
         order = get_object_or_404(qs, id=order_id)
     else:
         order = get_object_or_404(qs, id=order_id, shop=_user_shop(request))
 
-    shop = order.shop
-
-    TYPE_META = {
-        "DINE_IN": {"label": "DINE IN", "icon": "■■"},
-        "TAKE_OUT": {"label": "TAKE OUT", "icon": "■"},
-        "DELIVERY": {"label": "DELIVERY", "icon": "▲"},
-        "GENERAL": {"label": "GENERAL", "icon": "•"},
-    }
-
-    receipt_items = []
-    for item in order.items.all():
-        unit_price = item.price or 0
-        qty = item.quantity or 0
-        line_total = qty * unit_price
-        meta = TYPE_META.get(item.order_type, {"label": (item.order_type or "-"), "icon": "•"})
-
-        receipt_items.append({
-            "name": item.product.name if item.product else "-",
-            "qty": qty,
-            "unit_price": unit_price,
-            "line_total": line_total,
-            "order_type": meta["label"],
-            "order_type_icon": meta["icon"],
-        })
-
-    template = get_template("pos/order_receipt.html")
-    html = template.render({
-        "order": order,
-        "shop": shop,
-        "receipt_items": receipt_items,
-    })
-
-    result = io.BytesIO()
-    pdf = pisa.pisaDocument(
-        io.BytesIO(html.encode("UTF-8")),
-        result,
-        link_callback=_link_callback
-    )
+    # ?format=pdf (default) | escpos | text ; ?paper=58|80 untuk escpos/text
+    fmt = (request.GET.get("format") or "pdf").strip().lower()
+    if fmt in RECEIPT_TEXT_FORMATS:
+        text_renderer, content_type, ext = RECEIPT_TEXT_FORMATS[fmt]
+        response = HttpResponse(text_renderer(build_receipt(order), request.GET.get("paper")), content_type=content_type)
+        response["Content-Disposition"] = f'inline; filename="receipt-{order.id}.{ext}"'
+        return response
+    if fmt != "pdf":
+        return HttpResponse("format must be pdf, escpos or text", status=400)
 
-    if not pdf.err:
-        return HttpResponse(result.getvalue(), content_type="application/pdf")
-    return HttpResponse("Error generating PDF", status=500)
+    try:
+        pdf_bytes = receipt_pdf_bytes(order, renderer=request.GET.get("engine"))
+    except ValueError:
+        return HttpResponse("Error generating PDF", status=500)
+    return HttpResponse(pdf_bytes, content_type="application/pdf")
 
 
 # =========================
 # Print barcodes (API) - PDF
 # =========================
-@api_view(["GET"])
-@authentication_classes([TokenAuthentication, SessionAuthentication])
-@permission_classes([IsAuthenticated])
-def api_print_barcodes(request):
-    ids = (request.GET.get("ids") or "").strip()
-    if not ids:
-        return Response({"detail": "ids is required. Example: ?ids=1,2,3"}, status=400)
-
+def _print_barcodes_response(request, params, error):
+    """
+    Shared oleh API & admin print-barcodes:
+    - ids=1,2,3 (atau list di body POST) / all=1 untuk semua produk shop
+    - layout=a4_70x35 (default) | a4_63x38 | roll_50x30
+    - batch > BARCODE_LABEL_SYNC_MAX_LABELS atau background=1 -> ExportJob (202 + download link)
+    """
+    print_all = str(params.get("all") or "").strip().lower() in {"1", "true", "yes"}
     try:
-        id_list = [int(x.strip()) for x in ids.split(",") if x.strip()]
-    except Exception:
-        return Response({"detail": "Invalid ids format"}, status=400)
+        id_list = None if print_all else parse_label_ids(params.get("ids"))
+        layout_name = (params.get("layout") or DEFAULT_LABEL_LAYOUT).strip().lower()
+        label_layout(layout_name)
+    except ValueError as e:
+        return error(str(e))
 
-    products = Product.objects.filter(id__in=id_list).order_by("name")
+    if id_list is not None and not id_list:
+        return error("ids is required. Example: ?ids=1,2,3")
+
+    shop = None
     if not request.user.is_superuser:
         shop = _user_shop(request)
         if not shop:
-            return Response({"detail": "User tidak memiliki shop."}, status=400)
-        products = products.filter(shop=shop)
-
-    resp = HttpResponse(content_type="application/pdf")
-    resp["Content-Disposition"] = 'inline; filename="product_barcodes.pdf"'
-    c = canvas.Canvas(resp, pagesize=A4)
-    width, height = A4
-
-    label_w = 70 * mm
-    label_h = 35 * mm
-    margin_x = 10 * mm
-    margin_y = 10 * mm
-    gap_x = 5 * mm
-    gap_y = 5 * mm
-    cols = int((width - 2 * margin_x + gap_x) // (label_w + gap_x)) or 1
-
-    x = margin_x
-    y = height - margin_y - label_h
-
-    def draw_label(prod, x0, y0):
-        c.roundRect(x0, y0, label_w, label_h, 6, stroke=1, fill=0)
-        c.setFont("Helvetica-Bold", 9)
-        c.drawString(x0 + 4 * mm, y0 + label_h - 7 * mm, (prod.name or "")[:26])
-
-        c.setFont("Helvetica", 8)
-        if getattr(prod, "sku", ""):
-            c.drawString(x0 + 4 * mm, y0 + label_h - 12 * mm, f"SKU: {(prod.sku or '')[:22]}")
-        c.drawString(x0 + 4 * mm, y0 + label_h - 17 * mm, f"Price: ${prod.sell_price}")
-
-        value = (prod.code or "").strip()
-        if value:
-            bc = code128.Code128(value, barHeight=12 * mm, humanReadable=True)
-            bc.drawOn(c, x0 + 4 * mm, y0 + 4 * mm)
-
-    prods = list(products)
-    for i, p in enumerate(prods):
-        if y < margin_y:
-            c.showPage()
-            y = height - margin_y - label_h
-            x = margin_x
-
-        draw_label(p, x, y)
-
-        if (i + 1) % cols == 0:
-            x = margin_x
-            y -= (label_h + gap_y)
-        else:
-            x += (label_w + gap_x)
-
-    c.showPage()
-    c.save()
-    return resp
+            return error("User tidak memiliki shop.")
 
+    products = label_products(ids=id_list, shop_id=shop.id if shop else None)
 
-@staff_member_required
-def admin_print_barcodes(request):
-    ids = (request.GET.get("ids") or "").strip()
-    if not ids:
-        return HttpResponse("Missing ids. Example: ?ids=1,2,3", status=400)
+    background = str(params.get("background") or "").strip().lower() in {"1", "true", "yes"}
+    max_labels = label_sync_max_labels()
+    if not background and max_labels and products.count() > max_labels:
+        background = True
 
-    try:
-        id_list = [int(x.strip()) for x in ids.split(",") if x.strip()]
-    except Exception:
-        return HttpResponse("Invalid ids format. Example: ?ids=1,2,3", status=400)
+    if background:
+        export_job = queue_export(
+            kind="barcode_labels",
+            shop=shop,
+            params={"ids": id_list, "layout": layout_name},
+            requested_by=request.user,
+        )
+        return JsonResponse(export_job_payload(request, export_job), status=202)
 
-    products = Product.objects.filter(id__in=id_list).order_by("name")
-    if not request.user.is_superuser:
-        shop = _user_shop(request)
-        if not shop:
-            return HttpResponse("User tidak memiliki shop.", status=400)
-        products = products.filter(shop=shop)
-
-    resp = HttpResponse(content_type="application/pdf")
-    resp["Content-Disposition"] = 'inline; filename="product_barcodes.pdf"'
-    c = canvas.Canvas(resp, pagesize=A4)
-    width, height = A4
-
-    label_w = 70 * mm
-    label_h = 35 * mm
-    margin_x = 10 * mm
-    margin_y = 10 * mm
-    gap_x = 5 * mm
-    gap_y = 5 * mm
-    cols = int((width - 2 * margin_x + gap_x) // (label_w + gap_x)) or 1
-
-    x = margin_x
-    y = height - margin_y - label_h
-
-    def draw_label(prod, x0, y0):
-        c.roundRect(x0, y0, label_w, label_h, 6, stroke=1, fill=0)
-        c.setFont("Helvetica-Bold", 9)
-        c.drawString(x0 + 4 * mm, y0 + label_h - 7 * mm, (prod.name or "")[:26])
-
-        c.setFont("Helvetica", 8)
-        if getattr(prod, "sku", ""):
-            c.drawString(x0 + 4 * mm, y0 + label_h - 12 * mm, f"SKU: {(prod.sku or '')[:22]}")
-        c.drawString(x0 + 4 * mm, y0 + label_h - 17 * mm, f"Price: ${getattr(prod, 'sell_price', '')}")
-
-        value = (getattr(prod, "code", "") or "").strip()
-        if value:
-            bc = code128.Code128(value, barHeight=12 * mm, humanReadable=True)
-            bc.drawOn(c, x0 + 4 * mm, y0 + 4 * mm)
-        else:
-            c.setFont("Helvetica-Oblique", 8)
-            c.drawString(x0 + 4 * mm, y0 + 6 * mm, "No barcode (code)")
-
-    prods = list(products)
-    for i, p in enumerate(prods):
-        if y < margin_y:
-            c.showPage()
-            y = height - margin_y - label_h
-            x = margin_x
-
-        draw_label(p, x, y)
-
-        if (i + 1) % cols == 0:
-            x = margin_x
-            y -= (label_h + gap_y)
-        else:
-            x += (label_w + gap_x)
-
-    c.showPage()
-    c.save()
-    return resp
+    return FileResponse(
+        label_pdf_temp_file(products, layout_name),
+        filename="product_barcodes.pdf",
+        content_type="application/pdf",
+    )
+
+
+@api_view(["GET", "POST"])
+@authentication_classes([CachedTokenAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def api_print_barcodes(request):
+    params = request.data if request.method == "POST" else request.query_params
+    return _print_barcodes_response(
+        request, params, lambda msg: Response({"detail": msg}, status=400)
+    )
+
+
+@staff_member_required
+def admin_print_barcodes(request):
+    return _print_barcodes_response(
+        request, request.GET, lambda msg: HttpResponse(msg, status=400)
+    )
 
 
 # =========================
 # Auth API
 # =========================
+SUPERUSER_EXTRA_PERMISSIONS = frozenset([
+    "reports.view",
+    "settings.manage",
+    "owner_chat.use",
+    "platform.manage_shops",
+    "platform.manage_users",
+])
+OWNER_EXTRA_PERMISSIONS = frozenset([
+    "reports.view",
+    "settings.manage",
+    "owner_chat.use",
+    "shop.manage_users",
+    "shop.manage_settings",
+])
+
+
+def _login_permissions(role, is_superuser):
+    perms = CustomUser.ROLE_FEATURE_PERMISSIONS.get(role, frozenset())
+    if is_superuser:
+        perms = perms | SUPERUSER_EXTRA_PERMISSIONS
+    if (role or "").lower().strip() == CustomUser.ROLE_OWNER:
+        perms = perms | OWNER_EXTRA_PERMISSIONS
+    return tuple(sorted(perms))
+
+
+# daftar permission login per (role, superuser), dihitung sekali saat import
+LOGIN_PERMISSIONS = {
+    (role, is_superuser): _login_permissions(role, is_superuser)
+    for role in ("", *CustomUser.ROLE_FEATURE_PERMISSIONS)
+    for is_superuser in (False, True)
+}
+
+
 def build_permissions_for_user(user):
-    perms = set(user.get_feature_permissions())
+    key = (user.role or "", bool(user.is_superuser))
+    perms = LOGIN_PERMISSIONS.get(key)
+    if perms is None:
+        perms = _login_permissions(*key)
+    return list(perms)
 
-    role = (getattr(user, "role", "") or "").lower().strip()
 
-    if user.is_superuser:
-        perms.update([
-            "reports.view",
-            "settings.manage",
-            "owner_chat.use",
-            "platform.manage_shops",
-            "platform.manage_users",
-        ])
-
-    if role == "owner":
-        perms.update([
-            "reports.view",
-            "settings.manage",
-            "owner_chat.use",
-            "shop.manage_users",
-            "shop.manage_settings",
-        ])
-
-    return sorted(perms)
+def compact_shop_payload(shop):
+    """
+    Data shop ringkas untuk response login (tanpa logo / icon / features);
+    data lengkap diambil dari /api/shop/me/ (ETag, bisa 304).
+    """
+    if shop is None:
+        return None
+    return {
+        "id": shop.id,
+        "name": shop.name,
+        "code": shop.code,
+        "slug": shop.slug,
+        "business_type": shop.business_type,
+    }
 
 
 @api_view(["POST"])
+@authentication_classes([])  # token lama / expired di header tidak boleh memblokir login ulang
 @permission_classes([AllowAny])
 def api_login(request):
     shop_code = (request.data.get("shop_code") or "").strip().upper()
@@ -1919,12 +1769,11 @@ def api_login(request):
         return Response({"detail": "User is inactive"}, status=403)
 
     role = (user.role or "").lower().strip()
-
-    Token.objects.filter(user=user).delete()
-    token = Token.objects.create(user=user)
     permissions = build_permissions_for_user(user)
 
     if user.is_superuser:
+        # login = rotasi token (token lama + cache auth-nya dibuang)
+        token = issue_token(user)
         return Response({
             "token": token.key,
             "user": {
@@ -1955,9 +1804,9 @@ def api_login(request):
             status=400
         )
 
-    try:
-        shop = Shop.objects.get(code=shop_code, is_active=True)
-    except Shop.DoesNotExist:
+    # row shop dari shared cache (login banyak kasir sekaligus saat buka shift)
+    shop = get_cached_shop_by_code(shop_code)
+    if not shop_is_active(shop):
         return Response({"detail": "Invalid shop code"}, status=401)
 
     if not user.shop_id:
@@ -1966,7 +1815,8 @@ def api_login(request):
     if user.shop_id != shop.id:
         return Response({"detail": "This user does not belong to the selected shop"}, status=403)
 
-    shop_data = ShopSerializer(user.shop, context={"request": request}).data if user.shop else None
+    CustomUser.shop.field.set_cached_value(user, shop)
+    token = issue_token(user)
 
     return Response({
         "token": token.key,
@@ -1978,8 +1828,8 @@ def api_login(request):
             "role": role,
             "role_label": user.role_label,
             "shop_id": user.shop_id,
-            "shop_name": user.shop.name if user.shop else "",
-            "shop_code": user.shop.code if user.shop else "",
+            "shop_name": shop.name,
+            "shop_code": shop.code,
             "is_staff": user.is_staff,
             "is_superuser": user.is_superuser,
             "is_platform_admin": False,
@@ -1988,11 +1838,35 @@ def api_login(request):
             "is_shop_manager": bool(user.shop_id and role == "manager"),
             "is_shop_cashier": bool(user.shop_id and role == "cashier"),
         },
-        "shop": shop_data,
+        "shop": compact_shop_payload(shop),
         "permissions": permissions
     }, status=200)
 
 
+@api_view(["POST"])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def api_logout(request):
+    if request.auth is not None:
+        revoke_token(request.auth.key)
+    return Response({"detail": "Logged out"}, status=200)
+
+
+def _shop_etag(data) -> str:
+    body = json.dumps(data, sort_keys=True, default=str, separators=(",", ":"))
+    return quote_etag(hashlib.sha256(body.encode()).hexdigest()[:32])
+
+
+def _shop_response(request, data):
+    """Data shop + ETag; If-None-Match cocok -> 304 tanpa body (client pakai cache sendiri)."""
+    etag = _shop_etag(data)
+    candidates = {tag.removeprefix("W/") for tag in parse_etags(request.headers.get("If-None-Match", ""))}
+    response = Response(status=304) if etag in candidates or "*" in candidates else Response(data)
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
 class MyShopAPIView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
@@ -2004,11 +1878,12 @@ class MyShopAPIView(APIView):
                 status=400
             )
 
-        if not request.user.shop:
+        shop = get_request_tenant(request).shop
+        if not shop:
             return Response({"detail": "No shop assigned."}, status=404)
 
-        data = ShopSerializer(request.user.shop, context={"request": request}).data
-        return Response(data)
+        data = ShopSerializer(shop, context={"request": request}).data
+        return _shop_response(request, data)
 
     def patch(self, request):
         if request.user.is_superuser:
@@ -2037,7 +1912,10 @@ class MyShopAPIView(APIView):
         )
         ser.is_valid(raise_exception=True)
         ser.save()
-        return Response(ser.data)
+
+        response = Response(ser.data)
+        response["ETag"] = _shop_etag(ser.data)
+        return response
 
 
 # =========================
@@ -1,14 +1,22 @@
 # pos/views_backup.py
 
-from django.http import FileResponse, Http404
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import reverse
+from django.utils.http import http_date, quote_etag
 
 from rest_framework import status
-from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .authentication import CachedTokenAuthentication
 from .models import Shop
 from .models_backup import BackupSetting, BackupHistory, RestoreHistory
 from .serializers_backup import (
@@ -29,19 +37,21 @@ from .permissions_backup import (
     RestoreHistoryPermission,
 )
 from .services.backup_service import (
+    backup_root,
     ensure_backup_setting,
     run_manual_backup,
 )
 from .services.restore_service import (
-    run_restore_validation,
+    queue_restore,
 )
+from .tenant import get_request_tenant
 
 
 # =========================================================
 # HELPERS
 # =========================================================
 def _user_shop(request):
-    return getattr(request.user, "shop", None)
+    return get_request_tenant(request).shop
 
 
 def _require_user_shop(request):
@@ -73,11 +83,116 @@ def _get_effective_shop(request):
     return _require_user_shop(request)
 
 
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range_header(header: str, file_size: int):
+    """
+    Return:
+    - None          -> header kosong / tidak didukung (multi-range), kirim full file
+    - (start, end)  -> byte range inklusif
+    - False         -> range tidak valid (416)
+    """
+    header = (header or "").strip()
+    if not header or "," in header:
+        return None
+
+    match = _RANGE_RE.match(header)
+    if not match:
+        return None
+
+    start_raw, end_raw = match.groups()
+    if not start_raw and not end_raw:
+        return False
+
+    if not start_raw:
+        # suffix range: bytes=-500 -> 500 byte terakhir
+        length = int(end_raw)
+        if length <= 0:
+            return False
+        return max(file_size - length, 0), file_size - 1
+
+    start = int(start_raw)
+    end = int(end_raw) if end_raw else file_size - 1
+    if start >= file_size or end < start:
+        return False
+
+    return start, min(end, file_size - 1)
+
+
+class _RangeFile:
+    """
+    File-like terbatas untuk response 206.
+
+    fileno() tetap diekspos supaya server WSGI yang mendukung
+    wsgi.file_wrapper (mis. gunicorn) bisa memakai sendfile zero-copy
+    mulai dari offset file saat ini sebanyak Content-Length.
+    """
+
+    def __init__(self, path: str, start: int, length: int):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def close(self):
+        self._file.close()
+
+
+def _backup_etag(obj: BackupHistory) -> str:
+    checksum = (obj.file_checksum or "").strip()
+    return quote_etag(checksum) if checksum else ""
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if not header or not etag:
+        return False
+    candidates = [item.strip() for item in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _offloaded_backup_response(file_path: str, filename: str):
+    """
+    Serahkan pengiriman file ke web server (nginx/apache) supaya
+    worker Python tidak tertahan selama download berjalan.
+    Web server sendiri yang menangani Range request.
+    """
+    mode = getattr(settings, "BACKUP_DOWNLOAD_OFFLOAD", "")
+
+    response = HttpResponse(content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    if mode == "x-accel":
+        try:
+            rel_path = Path(file_path).resolve().relative_to(backup_root().resolve())
+        except ValueError:
+            return None
+        prefix = getattr(settings, "BACKUP_DOWNLOAD_ACCEL_PREFIX", "/protected-backups/")
+        response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + rel_path.as_posix()
+    elif mode == "x-sendfile":
+        response["X-Sendfile"] = file_path
+    else:
+        return None
+
+    return response
+
+
 # =========================================================
 # SUMMARY
 # =========================================================
 class BackupSummaryAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, BackupSummaryPermission]
 
     def get(self, request):
@@ -96,7 +211,7 @@ class BackupSummaryAPIView(APIView):
 # SETTINGS
 # =========================================================
 class BackupSettingAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, BackupSettingPermission]
     parser_classes = [JSONParser, MultiPartParser, FormParser]
 
@@ -155,7 +270,7 @@ class BackupSettingAPIView(APIView):
 # RUN BACKUP
 # =========================================================
 class BackupRunAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, BackupRunPermission]
     parser_classes = [JSONParser, MultiPartParser, FormParser]
 
@@ -203,7 +318,7 @@ class BackupRunAPIView(APIView):
 # BACKUP HISTORY LIST
 # =========================================================
 class BackupHistoryListAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, BackupHistoryPermission]
 
     def get(self, request):
@@ -257,7 +372,7 @@ class BackupHistoryListAPIView(APIView):
 # BACKUP HISTORY DETAIL + DELETE
 # =========================================================
 class BackupHistoryDetailAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, BackupHistoryPermission]
 
     def get_object(self, request, pk):
@@ -307,7 +422,7 @@ class BackupHistoryDetailAPIView(APIView):
 # DOWNLOAD BACKUP
 # =========================================================
 class BackupDownloadAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, BackupHistoryPermission]
 
     def get_object(self, request, pk):
@@ -340,18 +455,69 @@ class BackupDownloadAPIView(APIView):
         except Exception:
             raise Http404("Backup file path not available.")
 
-        return FileResponse(
-            open(file_path, "rb"),
-            as_attachment=True,
-            filename=obj.file_name or "backup.zip",
-        )
+        try:
+            file_size = os.path.getsize(file_path)
+        except OSError:
+            raise Http404("Backup file not found.")
+
+        filename = obj.file_name or "backup.zip"
+        etag = _backup_etag(obj)
+        last_modified = obj.completed_at or obj.started_at
+
+        if _etag_matches(request.headers.get("If-None-Match", ""), etag):
+            response = HttpResponse(status=304)
+            response["ETag"] = etag
+            return response
+
+        response = _offloaded_backup_response(file_path, filename)
+
+        if response is None:
+            byte_range = _parse_range_header(request.headers.get("Range", ""), file_size)
+
+            # If-Range: kalau file sudah berubah, kirim ulang file utuh
+            if_range = request.headers.get("If-Range", "").strip()
+            if byte_range and if_range and if_range != etag:
+                byte_range = None
+
+            if byte_range is False:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{file_size}"
+                return response
+
+            if byte_range:
+                start, end = byte_range
+                length = end - start + 1
+                response = FileResponse(
+                    _RangeFile(file_path, start, length),
+                    status=206,
+                    as_attachment=True,
+                    filename=filename,
+                    content_type="application/zip",
+                )
+                response["Content-Length"] = str(length)
+                response["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+            else:
+                response = FileResponse(
+                    open(file_path, "rb"),
+                    as_attachment=True,
+                    filename=filename,
+                    content_type="application/zip",
+                )
+
+            response["Accept-Ranges"] = "bytes"
+
+        if etag:
+            response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        return response
 
 
 # =========================================================
 # RESTORE BACKUP
 # =========================================================
 class BackupRestoreAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, BackupRestorePermission]
     parser_classes = [JSONParser, MultiPartParser, FormParser]
 
@@ -380,40 +546,40 @@ class BackupRestoreAPIView(APIView):
         serializer = RestoreRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         mode = serializer.validated_data["mode"]
-
-        try:
-            restore = run_restore_validation(
-                shop=backup.shop,
-                backup=backup,
-                mode=mode,
-                user=request.user,
-            )
-
-            return Response(
-                {
-                    "message": f"Restore validation completed with mode: {mode}.",
-                    "restore_id": restore.id,
-                    "status": restore.status,
-                    "note": restore.note,
-                },
-                status=200,
-            )
-
-        except Exception as e:
-            return Response(
-                {
-                    "message": "Restore failed.",
-                    "error": str(e),
-                },
-                status=500,
-            )
+        dry_run = serializer.validated_data["dry_run"]
+
+        # restore besar bisa lebih lama dari timeout gunicorn -> worker background;
+        # client poll restores/<id>/ (progress di metadata.restore_progress)
+        restore = queue_restore(
+            shop=backup.shop,
+            backup=backup,
+            mode=mode,
+            user=request.user,
+            dry_run=dry_run,
+        )
+        restore.refresh_from_db()
+
+        return Response(
+            {
+                "message": (
+                    f"Restore dry run queued with mode: {mode}."
+                    if dry_run
+                    else f"Restore queued with mode: {mode}."
+                ),
+                "restore_id": restore.id,
+                "status": restore.status,
+                "dry_run": dry_run,
+                "status_url": request.build_absolute_uri(reverse("restore_history_detail", args=[restore.id])),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
 
 
 # =========================================================
 # RESTORE HISTORY LIST
 # =========================================================
 class RestoreHistoryListAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, RestoreHistoryPermission]
 
     def get(self, request):
@@ -433,4 +599,27 @@ class RestoreHistoryListAPIView(APIView):
             many=True,
             context={"request": request},
         )
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+# =========================================================
+# RESTORE HISTORY DETAIL (poll restore background)
+# =========================================================
+class RestoreHistoryDetailAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated, RestoreHistoryPermission]
+
+    def get(self, request, pk):
+        try:
+            shop = _get_effective_shop(request)
+        except ValueError as e:
+            raise Http404(str(e))
+
+        try:
+            obj = RestoreHistory.objects.select_related("shop", "backup", "restored_by").get(pk=pk, shop=shop)
+        except RestoreHistory.DoesNotExist:
+            raise Http404("Restore not found.")
+
+        self.check_object_permissions(request, obj)
+        serializer = RestoreHistorySerializer(obj, context={"request": request})
+        return Response(serializer.data)
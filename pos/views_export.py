@@ -0,0 +1,96 @@
+# pos/views_export.py
+
+import os
+
+from django.http import FileResponse, Http404
+from django.urls import reverse
+
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .authentication import CachedTokenAuthentication
+from .models_export import ExportJob
+
+
+def _user_role(user):
+    return (getattr(user, "role", "") or "").lower().strip()
+
+
+def _get_export_job(request, pk):
+    """
+    - platform admin: semua job
+    - owner / manager: semua job milik shop-nya
+    - user lain: hanya job yang dia minta sendiri
+    """
+    user = request.user
+    qs = ExportJob.objects.select_related("shop")
+
+    if not user.is_superuser:
+        if not getattr(user, "shop_id", None):
+            raise Http404("Export job not found.")
+        qs = qs.filter(shop_id=user.shop_id)
+        if _user_role(user) not in {"owner", "manager"}:
+            qs = qs.filter(requested_by=user)
+
+    try:
+        return qs.get(pk=pk)
+    except ExportJob.DoesNotExist:
+        raise Http404("Export job not found.")
+
+
+def export_job_payload(request, export_job: ExportJob):
+    return {
+        "id": export_job.id,
+        "kind": export_job.kind,
+        "status": export_job.status,
+        "status_label": export_job.status_label,
+        "shop_id": export_job.shop_id,
+        "params": export_job.params,
+        "file_name": export_job.file_name,
+        "file_size_bytes": export_job.file_size_bytes,
+        "row_count": export_job.row_count,
+        "error_message": export_job.error_message,
+        "created_at": export_job.created_at,
+        "started_at": export_job.started_at,
+        "completed_at": export_job.completed_at,
+        "status_url": request.build_absolute_uri(reverse("export_job_detail", args=[export_job.id])),
+        "download_url": (
+            request.build_absolute_uri(reverse("export_job_download", args=[export_job.id]))
+            if export_job.is_ready else None
+        ),
+    }
+
+
+class ExportJobDetailAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        export_job = _get_export_job(request, pk)
+        return Response(export_job_payload(request, export_job))
+
+
+class ExportJobDownloadAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        export_job = _get_export_job(request, pk)
+
+        if not export_job.is_ready:
+            return Response(
+                {"detail": f"Export is {export_job.status_label.lower()}.", "status": export_job.status},
+                status=409,
+            )
+
+        if not os.path.exists(export_job.file_path):
+            raise Http404("Export file not found.")
+
+        return FileResponse(
+            open(export_job.file_path, "rb"),
+            as_attachment=True,
+            filename=export_job.file_name,
+            content_type=export_job.content_type or "application/octet-stream",
+        )
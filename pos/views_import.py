@@ -1,15 +1,16 @@
 # pos/views_import.py
 
-from django.http import FileResponse, Http404
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.utils.text import slugify
 
 from rest_framework import status
-from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .authentication import CachedTokenAuthentication
 from .models import Shop
 from .models_import import ImportJob
 from .serializers_import import (
@@ -27,13 +28,18 @@ from .permissions_import import (
 from .services.import_service import (
     build_template_workbook,
     template_info,
+    import_file_format,
     validate_import_workbook,
-    run_import,
+    queue_import,
+    cancel_import,
+    iter_error_report_csv,
+    build_error_report_xlsx,
 )
+from .tenant import get_request_tenant
 
 
 def _user_shop(request):
-    return getattr(request.user, "shop", None)
+    return get_request_tenant(request).shop
 
 
 def _require_user_shop(request):
@@ -62,7 +68,7 @@ def _get_effective_shop(request):
 
 
 class ImportTemplateDownloadAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, ImportTemplatePermission]
 
     def get(self, request):
@@ -78,7 +84,7 @@ class ImportTemplateDownloadAPIView(APIView):
 
 
 class ImportTemplateInfoAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, ImportTemplatePermission]
 
     def get(self, request):
@@ -87,7 +93,7 @@ class ImportTemplateInfoAPIView(APIView):
 
 
 class ImportJobListCreateAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, ImportJobPermission]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
     action_name = "list_create"
@@ -112,6 +118,7 @@ class ImportJobListCreateAPIView(APIView):
         serializer.is_valid(raise_exception=True)
 
         upload = serializer.validated_data["file"]
+        original_filename = getattr(upload, "name", "") or "master_import.xlsx"
         upload.seek(0, 2)
         file_size_bytes = upload.tell()
         upload.seek(0)
@@ -119,11 +126,16 @@ class ImportJobListCreateAPIView(APIView):
         import_job = ImportJob.objects.create(
             shop=shop,
             file=upload,
-            original_filename=getattr(upload, "name", "") or "master_import.xlsx",
+            original_filename=original_filename,
             file_size_bytes=file_size_bytes,
             uploaded_by=request.user if not request.user.is_superuser else None,
             status=ImportJob.Status.UPLOADED,
-            metadata={},
+            metadata={
+                "source": {
+                    "format": import_file_format(original_filename),
+                    "sheet": serializer.validated_data.get("sheet_name") or "",
+                },
+            },
         )
 
         out = ImportJobDetailSerializer(import_job, context={"request": request})
@@ -131,7 +143,7 @@ class ImportJobListCreateAPIView(APIView):
 
 
 class ImportJobDetailAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, ImportJobPermission]
     action_name = "detail"
 
@@ -156,7 +168,7 @@ class ImportJobDetailAPIView(APIView):
 
 
 class ImportJobValidateAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, ImportJobPermission]
     action_name = "validate"
 
@@ -189,8 +201,49 @@ class ImportJobValidateAPIView(APIView):
                 status=500,
             )
 
+class ImportJobErrorReportAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated, ImportJobPermission]
+    action_name = "error_report"
+
+    def get_object(self, request, pk):
+        try:
+            shop = _get_effective_shop(request)
+        except ValueError as e:
+            raise Http404(str(e))
+
+        try:
+            obj = ImportJob.objects.get(pk=pk, shop=shop)
+        except ImportJob.DoesNotExist:
+            raise Http404("Import job not found.")
+        return obj
+
+    def get(self, request, pk):
+        obj = self.get_object(request, pk)
+        self.check_object_permissions(request, obj)
+
+        # "format" dipakai DRF untuk content negotiation, jadi pakai file_format
+        file_format = (request.query_params.get("file_format") or "csv").strip().lower()
+        filename = f"import_{obj.id}_errors.{file_format}"
+
+        if file_format == "xlsx":
+            return FileResponse(
+                build_error_report_xlsx(obj),
+                as_attachment=True,
+                filename=filename,
+                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+
+        if file_format != "csv":
+            return Response({"detail": "file_format must be csv or xlsx."}, status=400)
+
+        response = StreamingHttpResponse(iter_error_report_csv(obj), content_type="text/csv")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
 class ImportJobConfirmAPIView(APIView):
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated, ImportJobPermission]
     parser_classes = [JSONParser, MultiPartParser, FormParser]
     action_name = "confirm"
@@ -215,16 +268,51 @@ class ImportJobConfirmAPIView(APIView):
         serializer.is_valid(raise_exception=True)
 
         try:
-            job = run_import(
+            job = queue_import(
                 obj,
                 confirm_import=serializer.validated_data["confirm_import"],
                 skip_backup_check=serializer.validated_data.get("skip_backup_check", False),
             )
             out = ImportJobDetailSerializer(job, context={"request": request})
-            return Response(out.data)
+            return Response(out.data, status=status.HTTP_202_ACCEPTED)
+        except ValueError as e:
+            return Response(
+                {"message": "Import failed.", "error": str(e)},
+                status=400,
+            )
         except Exception as e:
             obj.mark_failed(str(e))
             return Response(
                 {"message": "Import failed.", "error": str(e)},
                 status=500,
-            )
\ No newline at end of file
+            )
+
+
+class ImportJobCancelAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated, ImportJobPermission]
+    action_name = "cancel"
+
+    def get_object(self, request, pk):
+        try:
+            shop = _get_effective_shop(request)
+        except ValueError as e:
+            raise Http404(str(e))
+
+        try:
+            obj = ImportJob.objects.get(pk=pk, shop=shop)
+        except ImportJob.DoesNotExist:
+            raise Http404("Import job not found.")
+        return obj
+
+    def post(self, request, pk):
+        obj = self.get_object(request, pk)
+        self.check_object_permissions(request, obj)
+
+        try:
+            job = cancel_import(obj)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+
+        out = ImportJobDetailSerializer(job, context={"request": request})
+        return Response(out.data)
@@ -15,6 +15,7 @@ from pos.api_owner_chat.utils import parse_date_range
 from pos.api_owner_chat import queries
 from pos.api_owner_chat.help_responses import HELP_TOPICS, HELP_FALLBACK_TEXT
 from pos.api_owner_chat import insight
+from pos.services.owner_chat_log_service import log_chat
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +46,22 @@ class OwnerChatAPIView(APIView):
         )
 
     def post(self, request):
+        response = self._answer(request)
+
+        data = response.data if isinstance(response.data, dict) else {}
+        if "reply_text" in data:
+            meta = data.get("meta") or {}
+            log_chat(
+                user=request.user,
+                shop=getattr(self, "shop", None),
+                message=request.data.get("message") or "",
+                response=data["reply_text"],
+                source="owner_chat",
+                intent=meta.get("intent") or "",
+            )
+        return response
+
+    def _answer(self, request):
         ser = OwnerChatRequestSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
 
@@ -65,6 +82,7 @@ class OwnerChatAPIView(APIView):
         # =========================================================
         shop = resolve_shop_for_user(request)
         validate_owner_chat_role(request.user, shop)
+        self.shop = shop
 
         intent_res = detect_intent(message)
         range_label, dr = parse_date_range(message)
@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from pos.models_shift import Shift, ShiftStatus
+from pos.services.shift_service import close_shift
 from .serializers_shift import ShiftSerializer, ShiftOpenSerializer, ShiftCloseSerializer
 
 
@@ -59,6 +60,7 @@ def shifts_open(request):
         shop_id=shop_id,
         cashier=request.user,
         opening_cash=opening_cash,
+        expected_cash=opening_cash,
         status=ShiftStatus.OPEN,
     )
     return Response(ShiftSerializer(shift).data, status=status.HTTP_201_CREATED)
@@ -87,9 +89,5 @@ def shifts_close(request, pk: int):
     ser = ShiftCloseSerializer(data=request.data)
     ser.is_valid(raise_exception=True)
 
-    shift.closing_cash = ser.validated_data["closing_cash"]
-    shift.status = ShiftStatus.CLOSED
-    shift.save(update_fields=["closing_cash", "status"])
-
-    shift.refresh_from_db()
+    shift = close_shift(shift, closing_cash=ser.validated_data["closing_cash"])
     return Response(ShiftSerializer(shift).data, status=status.HTTP_200_OK)
\ No newline at end of file